@@ -0,0 +1,116 @@
+# benchmarks/bench_booklets.py
+"""练习册 / 答案册 / 答案卡：每份各遍历、各转义一遍 vs TexWriter 一次遍历、每题只转义一次（question_ir）。
+
+合成 n 道题（部分带图片），分别计时：
+  single    只写练习册（一份的基准）
+  separate  三份各用一个 TexWriter 写出（每份都重新转义、重新计算图片相对路径）
+  shared    一个 TexWriter 同时写出三份
+并检查 separate 与 shared 的输出逐字节一致。
+--compile 时再用 compile_booklets 依次（workers=1）与同时（workers=3）编译三份；没有 TeX 时设置
+XELATEX=benchmarks/stub_xelatex.py（替身按页数 sleep，此时只反映调度开销）。
+
+用法: python benchmarks/bench_booklets.py [--questions 10000] [--repeat 3] [--compile]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from excel_to_pdf_fixed import TEX_VARIANTS, TexWriter, compile_booklets
+from bench_latex_emit import WORDS
+
+
+def synth_questions(n, img_dir, seed=0):
+    rnd = random.Random(seed)
+
+    def sentence(k):
+        return " ".join(rnd.choice(WORDS) for _ in range(k)) + "."
+
+    out = []
+    for i in range(n):
+        images = [os.path.join(img_dir, f"fig{rnd.randrange(500)}.png") for _ in range(rnd.choice((0, 0, 1, 2)))]
+        out.append({
+            "id": f"Q{i + 1:05d}",
+            "paper_type": rnd.choice(["Mechanics", "Electricity", "Waves", "2019PARTB"]),
+            "question": " ".join(sentence(rnd.randint(8, 30)) for _ in range(rnd.randint(1, 4)))
+                        + " v^2 = u^2 + 2as, 50% & $5" + " [IMAGE:1]" * bool(images),
+            "options": {k: sentence(rnd.randint(1, 6)) for k in "ABCDE"},
+            "answer": rnd.choice("ABCDE"),
+            "explanation": " ".join(sentence(rnd.randint(10, 40)) for _ in range(rnd.randint(1, 6))) + " ≤ √ →",
+            "images": images,
+            "image_sizes": [[rnd.randint(20, 600), rnd.randint(20, 400)] for _ in images],
+        })
+    return out
+
+
+def write(questions, paths):
+    with TexWriter(paths) as w:
+        for q in questions:
+            w.add(q)
+
+
+def best_of(repeat, fn):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Practice/answers/key booklets: one pass per booklet vs one shared pass")
+    parser.add_argument("--questions", type=int, default=10000, help="Number of synthetic questions")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per variant (best is reported)")
+    parser.add_argument("--compile", action="store_true", help="Also time serial vs concurrent compilation")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        questions = synth_questions(args.questions, str(tmp / "images"))
+        for mode in ("single", "separate", "shared"):
+            (tmp / mode).mkdir()
+        paths = {mode: {v: str(tmp / mode / f"questions_{v}.tex") for v in TEX_VARIANTS}
+                 for mode in ("single", "separate", "shared")}
+
+        # TexWriter 退出时为每份打印一行，计时期间不输出
+        stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+        try:
+            single = best_of(args.repeat, lambda: write(questions, {"practice": paths["single"]["practice"]}))
+            separate = best_of(args.repeat, lambda: [write(questions, {v: p}) for v, p in paths["separate"].items()])
+            shared = best_of(args.repeat, lambda: write(questions, paths["shared"]))
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+        print(f"{args.questions} 题，三份 .tex（{', '.join(TEX_VARIANTS)}）")
+        print(f"  single   （只写练习册） {single:6.2f} s")
+        print(f"  separate （每份一遍）   {separate:6.2f} s  = {separate / single:.2f} 份")
+        print(f"  shared   （一遍三份）   {shared:6.2f} s  = {shared / single:.2f} 份，比 separate 快 {separate / shared:.2f}x")
+        same = all(Path(paths["separate"][v]).read_bytes() == Path(paths["shared"][v]).read_bytes()
+                   for v in TEX_VARIANTS)
+        print(f"  输出一致: {same}")
+
+        if args.compile:
+            tex_files = list(paths["shared"].values())
+            out_dir = str(tmp / "shared")
+            timing = {}
+            for label, workers in (("serial", 1), ("concurrent", len(tex_files))):
+                t0 = time.perf_counter()
+                ok = compile_booklets(tex_files, out_dir, workers=workers)
+                timing[label] = time.perf_counter() - t0
+                if not ok:
+                    sys.exit(f"[FAIL] 编译失败，详见 {out_dir} 下的 .log")
+            print(f"  编译三份：依次 {timing['serial']:.2f} s，同时 {timing['concurrent']:.2f} s")
+        if not same:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
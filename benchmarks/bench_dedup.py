@@ -0,0 +1,82 @@
+# benchmarks/bench_dedup.py
+"""题目去重：用真实题库的题干合成 n 道题，其中一部分为改动少量字符的近似副本与完全副本，
+测量 find_duplicates 的耗时随 n 的增长（LSH 应接近线性），以及植入重复项的召回率与误判数。
+
+用法: python benchmarks/bench_dedup.py [n ...]（默认 2000 8000 32000）
+"""
+import os
+import sys
+import time
+import random
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+from html_text import clean_html_to_text
+from question_dedup import find_duplicates
+
+NEAR_RATE = 0.05     # 近似副本比例
+EXACT_RATE = 0.05    # 完全副本比例（空白、大小写不同）
+
+
+def corpus():
+    texts = []
+    for name in ("PracticeQuestions.xlsx", "Questionbank.xlsx"):
+        df = pd.read_excel(os.path.join(ROOT, name))
+        texts += [clean_html_to_text(h)[0] for h in df["题目"].dropna()]
+    return [t for t in texts if len(t) > 80]
+
+
+def mutate(rnd, text):
+    """改动约 1% 的字母（不动数字），模拟两个题库的排版/录入差异"""
+    chars = list(text)
+    for _ in range(max(1, len(chars) // 100)):
+        i = rnd.randrange(len(chars))
+        if chars[i].isalpha():
+            chars[i] = chars[i].swapcase()
+        elif chars[i] == " ":
+            chars[i] = "  "
+    chars.insert(rnd.randrange(len(chars)), " ")
+    return "".join(chars)
+
+
+def synth(base, n, seed=0):
+    """返回 (items, 植入的重复项 {下标: 原题下标})；原题之间互不相同（各自带唯一编号）"""
+    rnd = random.Random(seed)
+    items, planted = [], {}
+    for i in range(n):
+        r = rnd.random()
+        if items and r < NEAR_RATE + EXACT_RATE:
+            j = rnd.randrange(len(items))
+            while j in planted:
+                j = planted[j]
+            q, o, a, imgs = items[j]
+            q = mutate(rnd, q) if r < NEAR_RATE else "  " + q.upper()
+            items.append((q, o, a, imgs))
+            planted[i] = j
+        else:
+            text = f"[{i}] " + rnd.choice(base) + f" (variant {i})"
+            items.append((text, {"A": "1", "B": "2"}, rnd.choice("ABCD"), []))
+    return items, planted
+
+
+def main():
+    sizes = [int(x) for x in sys.argv[1:]] or [2000, 8000, 32000]
+    base = corpus()
+    ok = True
+    for n in sizes:
+        items, planted = synth(base, n)
+        t0 = time.perf_counter()
+        _, dup_of = find_duplicates(items)
+        dt = time.perf_counter() - t0
+        found = sum(1 for i in planted if i in dup_of)
+        false = sum(1 for i in dup_of if i not in planted)
+        print(f"n={n}: {dt:.2f} s（{dt / n * 1e6:.0f} µs/题）；植入重复 {len(planted)}，"
+              f"检出 {found}（{found / max(len(planted), 1):.1%}），误判 {false}")
+        ok &= false == 0 and found >= 0.95 * len(planted)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+# benchmarks/bench_escape.py
+"""LaTeX 转义：与旧实现/参考实现的一致性校验 + 全题库字段吞吐量。
+
+吞吐量另外对比 latex_escape 的正则替换与 str.translate 查表（同样先 search 跳过无特殊字符的字段），
+分别在全部字段、含特殊字符的字段与合成的中文长题干上计时。
+
+校验（任一失败则以非零状态退出）：
+  1. 语料：latex_escape 在不含反斜杠的字段上与旧实现逐字一致（旧实现会把
+     \\textbackslash{} 的花括号二次转义）；escape_latex_math 在不含 LaTeX 特殊字符
+     的字段上与旧实现逐字一致。
+  2. 随机属性：在随机字符串上与逐字符参考实现一致；正文转义结果中花括号配对、
+     不残留未转义的特殊字符。
+
+用法: python benchmarks/bench_escape.py [随机样本数，默认 20000]
+"""
+import os
+import re
+import sys
+import time
+import random
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+from excel_to_pdf_fixed import extract_columns, parse_table
+from tex_escape import (latex_escape, escape_latex_math, TEXT_SPECIALS, MATH_SYMBOLS,
+                        PAR_BREAK, LINE_BREAK, _TEXT_RE, _text_token)
+from html_text import supsub_to_latex
+
+BANKS = [os.path.join(ROOT, "PracticeQuestions.xlsx"), os.path.join(ROOT, "Questionbank.xlsx")]
+REPEAT = 3
+
+
+# ---------- 旧实现（基线版本，仅用于对比） ----------
+def legacy_latex_escape(s):
+    if not s:
+        return ""
+    for k, v in TEXT_SPECIALS.items():
+        s = s.replace(k, v)
+    s = s.replace("\r\n", "\n").replace("\r", "\n")
+    s = s.replace("\n\n", "\n\\medskip\n")
+    s = s.replace("\n", "\\\\\n")
+    return supsub_to_latex(s)
+
+
+def legacy_escape_latex_math(text):
+    if not text:
+        return ""
+    for k, v in MATH_SYMBOLS.items():
+        text = text.replace(k, v)
+    text = re.sub(r"[𝑎-𝑧𝐴-𝑍]", lambda m: f"${m.group(0)}$", text)
+    text = re.sub(r"([A-Za-z0-9]+[\^_][A-Za-z0-9]+)", r"$\1$", text)
+    return supsub_to_latex(text)
+
+
+# ---------- 特殊字符替换：正则（tex_escape 采用）与 str.translate ----------
+_TEXT_TABLE = str.maketrans(TEXT_SPECIALS)
+
+
+def regex_specials(s):
+    return _TEXT_RE.sub(_text_token, s) if _TEXT_RE.search(s) else s
+
+
+def translate_specials(s):
+    return s.translate(_TEXT_TABLE) if _TEXT_RE.search(s) else s
+
+
+CJK_FIELD = "压力为 50% 的物体 & 速度 v_0 = 10 m/s，求 {x} 的值。" * 8
+
+
+# ---------- 逐字符参考实现 ----------
+def oracle_text(s):
+    if not s:
+        return ""
+    s = s.replace("\r\n", "\n").replace("\r", "\n")
+    out, i = [], 0
+    while i < len(s):
+        if s.startswith("\n\n", i):
+            out.append(PAR_BREAK)
+            i += 2
+        elif s[i] == "\n":
+            out.append(LINE_BREAK)
+            i += 1
+        else:
+            out.append(TEXT_SPECIALS.get(s[i], s[i]))
+            i += 1
+    return supsub_to_latex("".join(out))
+
+
+_ITALIC = re.compile(r"[𝑎-𝑧𝐴-𝑍]")
+_SCRIPT = re.compile(r"[A-Za-z0-9]+[\^_][A-Za-z0-9]+")
+
+
+def oracle_math(s):
+    if not s:
+        return ""
+    table = dict(TEXT_SPECIALS, **MATH_SYMBOLS)
+    out, i = [], 0
+    while i < len(s):
+        m = _ITALIC.match(s, i) or _SCRIPT.match(s, i)
+        if m:
+            out.append("$" + m.group(0) + "$")
+            i = m.end()
+        else:
+            out.append(table.get(s[i], s[i]))
+            i += 1
+    return supsub_to_latex("".join(out))
+
+
+def load_fields():
+    fields = []
+    for path in BANKS:
+        table = extract_columns(pd.read_excel(path, sheet_name=0))
+        for (q, opts, expl, _), ans in zip(parse_table(table), table["answer"]):
+            fields.extend([q, expl, ans, *opts.values()])
+    return fields
+
+
+ALPHABET = list("ab xyZ09\n\r") + list(TEXT_SPECIALS) + list(MATH_SYMBOLS) + ["𝑥", "𝐴", "中", "<sup>", "</sup>"]
+
+
+def random_strings(n, seed=0):
+    rnd = random.Random(seed)
+    return ["".join(rnd.choice(ALPHABET) for _ in range(rnd.randint(0, 24))) for _ in range(n)]
+
+
+def unescaped_specials(s):
+    """去掉所有合法转义序列后，不应再有特殊字符"""
+    for v in sorted(TEXT_SPECIALS.values(), key=len, reverse=True):
+        s = s.replace(v, "")
+    s = s.replace(PAR_BREAK, "").replace(LINE_BREAK, "")
+    s = re.sub(r"\\text(super|sub)script\{", "", s)
+    return [c for c in "&%$#_~^" if c in s]
+
+
+def check(fields, samples):
+    failures = 0
+    no_bs = [f for f in fields if "\\" not in f]
+    bad = sum(latex_escape(f) != legacy_latex_escape(f) for f in no_bs)
+    print(f"  latex_escape      vs 旧实现（{len(no_bs)} 个无反斜杠字段）: 不一致 {bad}")
+    failures += bad
+    plain = [f for f in fields if not any(c in f for c in TEXT_SPECIALS)]
+    bad = sum(escape_latex_math(f) != legacy_escape_latex_math(f) for f in plain)
+    print(f"  escape_latex_math vs 旧实现（{len(plain)} 个无特殊字符字段）: 不一致 {bad}")
+    failures += bad
+
+    corpus = fields + samples
+    bad = sum(latex_escape(s) != oracle_text(s) for s in corpus)
+    print(f"  latex_escape      vs 参考实现（{len(corpus)} 个输入）: 不一致 {bad}")
+    failures += bad
+    bad = sum(escape_latex_math(s) != oracle_math(s) for s in corpus)
+    print(f"  escape_latex_math vs 参考实现（{len(corpus)} 个输入）: 不一致 {bad}")
+    failures += bad
+    bad = sum(bool(unescaped_specials(latex_escape(s))) for s in corpus if "<su" not in s)
+    print(f"  latex_escape 输出残留未转义特殊字符: {bad}")
+    failures += bad
+    return failures
+
+
+def timeit(fn, fields):
+    best = float("inf")
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        for f in fields:
+            fn(f)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    fields = load_fields()
+    print(f"{len(fields)} 个字段，{sum(len(f) for f in fields) / 1e6:.1f} M 字符")
+    failures = check(fields, random_strings(n))
+    for name, old, new in (("latex_escape", legacy_latex_escape, latex_escape),
+                           ("escape_latex_math", legacy_escape_latex_math, escape_latex_math)):
+        t_old, t_new = timeit(old, fields), timeit(new, fields)
+        print(f"  {name:<18}: old {t_old * 1e3:7.1f} ms  new {t_new * 1e3:7.1f} ms  ({t_old / t_new:.1f}x)")
+    special = [f for f in fields if _TEXT_RE.search(f)]
+    bad = sum(translate_specials(f) != regex_specials(f) for f in fields + [CJK_FIELD])
+    print(f"  特殊字符替换 regex vs translate（不一致 {bad}）:")
+    failures += bad
+    for label, subset in (("全部字段", fields), (f"含特殊字符的 {len(special)} 个字段", special),
+                          ("中文长题干 × 2000", [CJK_FIELD] * 2000)):
+        t_re, t_tr = timeit(regex_specials, subset), timeit(translate_specials, subset)
+        print(f"    {label:<24}: regex {t_re * 1e3:7.2f} ms  translate {t_tr * 1e3:7.2f} ms  ({t_tr / t_re:.1f}x)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# benchmarks/bench_format.py
+"""预编译导言区：同一模板的多份文档，每份普通编译 vs 载入预编译格式（tex_format.py）编译，报告每份文档省下的启动时间。
+
+两种模板各生成 --docs 份小文档（excel_to_pdf_fixed.build_tex 与 json2pdf.write_latex 的输出），
+先逐份普通编译，再清空 .formats/ 后逐份用格式编译（第一份包含生成格式的时间，单独列出）。
+两种方式得到的页数须一致，否则以非零状态退出。
+
+默认使用系统 xelatex（需要 mylatexformat 宏包）。没有 TeX 时设置 XELATEX=benchmarks/stub_xelatex.py：
+替身加载导言区与载入格式的耗时由 STUB_PREAMBLE_SECONDS / STUB_FORMAT_SECONDS 模拟（未设置时取 1.0 与 0.1），
+此时的数字只验证流程与计时口径，不代表真实 TeX 的收益。
+再设置 STUB_ERRORS=N 模拟真实题库的可恢复错误（退出码 1、PDF 照常写出）：用格式编译的耗时应与不设置时相同，
+只有格式没能载入才会再做一次普通编译。
+
+用法: python benchmarks/bench_format.py [--docs 6] [--questions 20] [--workdir DIR]
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tex_shards import LATEX_ENGINE, latex_output
+
+
+def questions(n, seed):
+    return [{"id": f"Q{seed}-{i}", "paper_type": f"Paper {i % 3}",
+             "question": f"A cart of mass {i + 2} kg moves at {seed + i} m/s. What is its momentum?",
+             "options": {k: f"{(i + 2) * (seed + i) + d} kg m/s" for d, k in enumerate("ABCD")},
+             "answer": "A", "explanation": "p = m v."} for i in range(n)]
+
+
+def write_docs(workdir, docs, per_doc):
+    from excel_to_pdf_fixed import build_tex
+    from json2pdf import write_latex
+    out = {"excel_to_pdf_fixed": [], "json2pdf": []}
+    images = workdir / "images"
+    images.mkdir(parents=True, exist_ok=True)
+    for k in range(docs):
+        qs = questions(per_doc, k)
+        tex = workdir / f"paper-{k + 1:02d}.tex"
+        build_tex(qs, str(tex), include_answers=bool(k % 2))
+        out["excel_to_pdf_fixed"].append(tex)
+        tex = workdir / f"sheet-{k + 1:02d}.tex"
+        write_latex(qs, tex, f"Sheet {k + 1}", images)
+        out["json2pdf"].append(tex)
+    return out
+
+
+def compile_one(tex, use_format):
+    from tex_format import run_latex
+    args = ["-interaction=nonstopmode", "-output-directory", str(tex.parent), str(tex)]
+    started, t0 = time.time(), time.perf_counter()
+    if use_format:
+        proc = run_latex(LATEX_ENGINE, args, tex, tex.parent, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    else:
+        proc = subprocess.run([LATEX_ENGINE] + args, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    elapsed = time.perf_counter() - t0
+    pages, _ = latex_output(tex, started)
+    if pages is None:
+        sys.exit(f"[FAIL] 编译失败（退出码 {proc.returncode}），详见 {tex.with_suffix('.log')}")
+    return elapsed, pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-document start-up saved by the precompiled preamble format")
+    parser.add_argument("--docs", type=int, default=6, help="Documents per template")
+    parser.add_argument("--questions", type=int, default=20, help="Questions per document")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "esat_bench_format"),
+                        help="Where the documents are written")
+    args = parser.parse_args()
+
+    stub = os.path.basename(LATEX_ENGINE).startswith("stub")
+    if stub:
+        os.environ.setdefault("STUB_PREAMBLE_SECONDS", "1.0")
+        os.environ.setdefault("STUB_FORMAT_SECONDS", "0.1")
+        print(f"[WARN] 使用替身引擎：导言区 {os.environ['STUB_PREAMBLE_SECONDS']} s、"
+              f"载入格式 {os.environ['STUB_FORMAT_SECONDS']} s 为模拟值")
+    elif shutil.which(LATEX_ENGINE) is None:
+        sys.exit(f"[FAIL] 找不到 {LATEX_ENGINE}；没有 TeX 时设置 XELATEX=benchmarks/stub_xelatex.py")
+
+    import tex_format
+    if not tex_format.ENABLED:
+        sys.exit("[FAIL] XELATEX_FORMAT=0 关闭了预编译导言区")
+    workdir = Path(args.workdir)
+    shutil.rmtree(workdir, ignore_errors=True)
+    docs = write_docs(workdir, args.docs, args.questions)
+    formats = tex_format.format_cache(workdir, LATEX_ENGINE)
+
+    print(f"{'template':<22}{'plain s/doc':>12}{'fmt s/doc':>11}{'saved':>8}{'dump s':>8}{'break-even':>12}")
+    failed = False
+    for template, texs in docs.items():
+        plain = [compile_one(t, False) for t in texs]
+        dump_before = formats.stats["dump_s"]
+        fmt = [compile_one(t, True) for t in texs]
+        dump_s = formats.stats["dump_s"] - dump_before
+        if [p for _, p in plain] != [p for _, p in fmt]:
+            print(f"[FAIL] {template}: 页数不一致 {[p for _, p in plain]} vs {[p for _, p in fmt]}")
+            failed = True
+        per_plain = statistics.median(t for t, _ in plain)
+        # 第一份的耗时含生成格式，其余各份才是稳定状态
+        per_fmt = statistics.median(t for t, _ in fmt[1:]) if len(fmt) > 1 else fmt[0][0] - dump_s
+        saved = per_plain - per_fmt
+        even = f"{dump_s / saved:.1f} docs" if saved > 0 else "never"
+        print(f"{template:<22}{per_plain:>12.2f}{per_fmt:>11.2f}{saved:>8.2f}{dump_s:>8.2f}{even:>12}")
+    print(f"格式: 生成 {formats.stats['built']} 个，载入 {formats.stats['used']} 次，回退 {formats.stats['fallback']} 次"
+          f"（{workdir / tex_format.FORMAT_DIR_NAME}）")
+    if failed or formats.stats["built"] != len(docs):
+        sys.exit(1)
+    print("[OK] 用格式编译的页数与普通编译一致")
+
+
+if __name__ == "__main__":
+    main()
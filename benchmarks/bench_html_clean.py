@@ -0,0 +1,79 @@
+# benchmarks/bench_html_clean.py
+"""HTML 清洗：语料一致性校验 + 吞吐量（cells/s）。
+
+一致性：对两个题库中全部 题目/选项/解题思路 单元格，快速路径的输出必须与 BeautifulSoup 路径逐字一致，
+keep_supsub=False（原实现 get_text）与 keep_supsub=True（生产默认，上标/下标内联）都要检查；
+存在差异时以非零状态退出。
+
+用法: python benchmarks/bench_html_clean.py [xlsx ...]
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+from html_text import clean_html_to_text, fast_html_to_text, soup_html_to_text, _Fallback
+
+DEFAULT_FILES = [os.path.join(ROOT, "PracticeQuestions.xlsx"), os.path.join(ROOT, "Questionbank.xlsx")]
+HTML_COLUMNS = ("题目", "选项", "解题思路")
+
+
+def load_cells(files):
+    cells = []
+    for path in files:
+        df = pd.read_excel(path, sheet_name=0)
+        for col in HTML_COLUMNS:
+            if col in df.columns:
+                cells.extend(v for v in df[col].tolist() if isinstance(v, str))
+    return cells
+
+
+def check_equivalence(cells, keep_supsub):
+    mismatches = fallbacks = 0
+    for html in cells:
+        try:
+            fast = fast_html_to_text(html, keep_supsub=keep_supsub, with_sizes=True)
+        except _Fallback:
+            fallbacks += 1
+            continue
+        soup = soup_html_to_text(html, keep_supsub=keep_supsub, with_sizes=True)
+        if fast != soup:
+            mismatches += 1
+            if mismatches <= 3:
+                print(f"[MISMATCH] keep_supsub={keep_supsub} {html[:200]!r}")
+                print(f"  fast: {fast[0][:200]!r}")
+                print(f"  soup: {soup[0][:200]!r}")
+    return mismatches, fallbacks
+
+
+def throughput(fn, cells):
+    t0 = time.perf_counter()
+    for html in cells:
+        fn(html)
+    dt = time.perf_counter() - t0
+    return len(cells) / dt, dt
+
+
+def main():
+    files = sys.argv[1:] or DEFAULT_FILES
+    cells = load_cells(files)
+    total_bytes = sum(len(c.encode("utf-8")) for c in cells)
+    print(f"{len(cells)} 个 HTML 单元格，{total_bytes / 1e6:.1f} MB")
+
+    mismatches = 0
+    for keep_supsub in (False, True):
+        bad, fallbacks = check_equivalence(cells, keep_supsub)
+        print(f"一致性（keep_supsub={keep_supsub}）：不一致 {bad}，回退 {fallbacks}")
+        mismatches += bad
+
+    for name, fn in (("BeautifulSoup + lxml", soup_html_to_text), ("html.parser fast path", clean_html_to_text)):
+        rate, dt = throughput(fn, cells)
+        print(f"  {name:<22}: {rate:10.0f} cells/s  ({dt:.2f} s, {total_bytes / dt / 1e6:.1f} MB/s)")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,30 @@
+# benchmarks/bench_html_render.py
+"""HTML 输出：对比旧的 generate_html（python_20250825_MRKfRn.py，原样收录于下方）与 json2html.write_html。
+
+旧实现读取 Excel 原始行（中文列名），逐题 questions_html += 拼接整份文件；新实现读取流水线的题目记录，
+分页写出并为图片加 loading="lazy"。题库复制若干倍以观察耗时随题数的增长，同时统计浏览器首屏要加载的
+HTML 字节数与立即加载的图片数。
+
+用法: python benchmarks/bench_html_render.py <questions.json|jsonl> [xlsx] [倍数 ...]（默认 1 4 16）
+"""
+import os
+import re
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+from question_io import iter_questions
+from json2html import write_html
+
+_IMG_RE = re.compile(r"<img\b[^>]*>")
+
+
+# ========== 旧实现（python_20250825_MRKfRn.py，未改动） ==========
 def generate_html(data):
     html_template = '''<!DOCTYPE html>
 <html lang="zh-CN">
@@ -197,44 +224,39 @@ def generate_html(data):
     
     return html_template.format(questions=questions_html)
 
-# 使用您提供的原始数据
-data = [
-    {
-        "题目类型": "单选",
-        "试卷类型": "Mechanics",
-        "难度": "适中",
-        "年份": "",
-        "题目": "<p class=\"MsoBodyText\"><span style=\"font-family: 'PingFang SC', 'Microsoft YaHei', sans-serif; font-size: 16px;\">A ball decelerates uniformly from +28.0m/s to +14.0m/s in 0.002s , then accelerates back to +20.0m/s in 0.003s . </span></p><p class=\"MsoBodyText\"><span style=\"font-family: 'PingFang SC', 'Microsoft YaHei', sans-serif; font-size: 16px;\">What is the total displacement during contact? </span></p>",
-        "标签": "",
-        "来源": "",
-        "简介": "",
-        "图片": "",
-        "视频": "",
-        "选项": "A、<p><span style=\"font-family: 'PingFang SC', 'Microsoft YaHei', sans-serif; font-size: 16px;\">0.042m</span></p>B、<p><span style=\"font-family: 'PingFang SC', 'Microsoft YaHei', sans-serif; font-size: 16px;\">0.056m</span></p>C、<p><span style=\"font-family: 'PingFang SC', 'Microsoft YaHei', sans-serif; font-size: 16px;\">0.070极速pdfm</span></p>D、极速pdf<p><span style=\"font-family: 'PingFang SC', 'Microsoft YaHei', sans-serif; font-size: 16px;\">0.084m</span></p>E、<p><span style=\"font-family: 'PingFang SC', 'Microsoft YaHei', sans-serif; font-size: 16极速pdfpx;\">0.093m</span></p>",
-        "解题思路": "<p class=\"MsoBodyText\"><span style=\"font-family: 'PingFang SC', 'Microsoft YaHei', sans-serif; font-size: 16px;\">Stage 1: <img src=\"https://xinghuan-website.oss-cn-shanghai.aliyuncs.com/uploadfiles/web/2025/05-24/sd13eq5qcpthcwyi.png\" width=\"219\" height=\"38\">. Stage 2: <img src=\"https://xinghuan-website.oss-cn-shanghai.aliyuncs.com/uploadfiles/web/2025/05-24/61aegfcw7ayxzmj2.png\" width=\"210\" height=\"38\">. Total <img src=\"https://xinghuan-website.oss-cn-shanghai.aliyuncs.com/uploadfiles/web/2025/05-24/zpjzgamjdnpzfaur.png\" width=\"93\" height=\"25\">. </span></p>",
-        "答案": "E"
-    },
-    {
-        "题目类型": "单选",
-        "试卷类型": "Mechanics",
-        "难度": "较易",
-        "年份": "",
-        "题目": "<p class=\"MsoBodyText\"><span style=\"font-family: 'PingFang SC', 'Microsoft YaHei', sans-serif; font-size: 16px;\">A ball（v=12.0m/s) compresses a racket string by 0.02m before rebounding at 10.0m/s. </span></p><p class=\"MsoBodyText\"><span style=\"font-family: 'PingFang SC', 'Microsoft YaHei', sans-serif; font-size: 16px;\">What is the peak deceleration? </span></p>",
-        "标签": "",
-        "来源": "",
-        "简介": "",
-        "图片": "",
-        "视频": "",
-        "选项": "A、<p><span style=\"font-family: 'PingFang SC', 'Microsoft YaHei', sans-serif; font-size: 16px;\">-1100m/s<sup>2</sup></span></p>B、<p><span style=\"font-family: 'PingFang SC', 'Microsoft YaHei', sans-serif; font-size: 16px;\">-2200m/s<sup>2</sup></span></p>C、<p><span style=\"font-family: 'PingFang SC', 'Microsoft YaHei', sans-serif; font-size: 16px;\">-3600m/s<sup>2</sup></span></p>D、<p><span style=\"font-family: 'PingFang SC', 'Microsoft YaHei', sans-serif; font-size: 16px;\">-4400m/s<sup>2</sup></span></p>E、<p><span style=\"font-family: 'PingFang SC', 'Microsoft YaHei', sans-serif; font-size: 16px;\">-5500m/s<sup>2</sup></span></p>",
-        "解题思路": "<p class=\"MsoNormal\"><span style=\"font-family: 'PingFang SC', 'Microsoft YaHei', sans-serif; font-size: 16px;\">Energy loss implies non-constant force, but assuming average deceleration:<img src=\"https://xinghuan-website.oss-cn-shanghai.aliyuncs.com/uploadfiles/web/2025/05-24/a9g6uqlfvvjp3zyd.png\" width=\"436\" height=\"29\"></span></p>",
-        "答案": "C"
-    }
-]
 
-# 生成HTML并保存
-html_content = generate_html(data)
-with open("physics_questions.html", "w", encoding="utf-8") as f:
-    f.write(html_content)
+# ========== 对比 ==========
+def img_stats(text):
+    tags = _IMG_RE.findall(text)
+    return len(tags), sum('loading="lazy"' not in t for t in tags)
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    records = list(iter_questions(sys.argv[1]))
+    xlsx = sys.argv[2] if len(sys.argv) > 2 and sys.argv[2].endswith(".xlsx") else os.path.join(ROOT, "PracticeQuestions.xlsx")
+    scales = [int(x) for x in sys.argv[2:] if not x.endswith(".xlsx")] or [1, 4, 16]
+    # 旧实现要求各列都是字符串（NaN 会在 split 处报错）
+    rows = pd.read_excel(xlsx).fillna("").astype(str).to_dict("records")
+    for k in scales:
+        old_rows, new_records = rows * k, records * k
+        t0 = time.perf_counter()
+        old = generate_html([dict(r) for r in old_rows])
+        t_old = time.perf_counter() - t0
+        with tempfile.TemporaryDirectory() as tmp:
+            t0 = time.perf_counter()
+            pages = write_html(iter(new_records), Path(tmp), "题目集")
+            t_new = time.perf_counter() - t0
+            first = pages[0].read_text(encoding="utf-8")
+            total, _ = img_stats("".join(p.read_text(encoding="utf-8") for p in pages))
+        n_img, eager = img_stats(old)
+        f_img, f_eager = img_stats(first)
+        print(f"{len(old_rows)} 行 / {len(new_records)} 题：旧 {t_old * 1000:.0f} ms，新 {t_new * 1000:.0f} ms "
+              f"({t_old / t_new:.1f}x)")
+        print(f"  首屏 HTML：旧 {len(old.encode()) / 1e6:.1f} MB（{n_img} 张图，{eager} 张立即加载）；"
+              f"新 {len(first.encode()) / 1e3:.0f} KB（{f_img} 张图，{f_eager} 张立即加载），共 {len(pages)} 页 {total} 张图")
+
 
-print("HTML文件已成功生成: physics_questions.html")
-print("图片现在应该能够正常显示了！")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# benchmarks/bench_image_prep.py
+"""图片预处理：合成一批题目图片（过大的 PNG、webp、gif、带 EXIF 的 JPEG），
+分别测量首次处理与缓存命中时的耗时，以及字节数 / 像素数的变化。
+
+与转换流水线（excel_to_pdf_fixed.ImageStage）相同，在线程池中逐张调用 ImagePrep.prepare_one。
+
+用法: python benchmarks/bench_image_prep.py [图片数，默认 300] [线程数，默认 CPU 数]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PIL import Image, ImageDraw
+from image_prep import ImagePrep, new_stats, tally
+
+KINDS = [("png", 80), ("webp", 10), ("gif", 5), ("jpg", 5)]
+
+
+def synth(n, dst, seed=0):
+    """返回 ({src: 路径}, {src: 显示宽度})；图片为显示尺寸的 2~6 倍，模拟服务器给出的高分辨率原图"""
+    rnd = random.Random(seed)
+    paths, widths = {}, {}
+    for i in range(n):
+        kind = rnd.choices([k for k, _ in KINDS], [w for _, w in KINDS])[0]
+        dw, dh = rnd.randint(20, 400), rnd.randint(15, 120)
+        scale = rnd.uniform(2, 6)
+        w, h = int(dw * scale), int(dh * scale)
+        im = Image.new("RGB" if kind == "jpg" else "RGBA", (w, h), "white")
+        d = ImageDraw.Draw(im)
+        for j in range(rnd.randint(3, 20)):
+            x, y = rnd.randrange(w), rnd.randrange(h)
+            d.text((x, y), f"x^{j}+1", fill="black")
+            d.line((x, y, rnd.randrange(w), rnd.randrange(h)), fill=(0, 0, 0), width=max(1, int(scale)))
+        path = os.path.join(dst, f"{i}.{kind}")
+        if kind == "jpg":
+            exif = Image.Exif()
+            exif[0x010E] = "camera notes " * 200
+            im.save(path, "JPEG", quality=95, exif=exif)
+        elif kind == "gif":
+            im.convert("P").save(path, "GIF")
+        else:
+            im.save(path, kind.upper())
+        src = f"https://example.invalid/{i}.{kind}"
+        paths[src] = path
+        widths[src] = dw
+    return paths, widths
+
+
+def pixels(path):
+    with Image.open(path) as im:
+        return im.size[0] * im.size[1]
+
+
+def prepare(prep, paths, widths, workers):
+    """逐张处理 {src: 路径}，返回 ({src: (路径, 像素尺寸或 None)}, 统计)"""
+    stats = new_stats()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(lambda src: prep.prepare_one(paths[src], widths.get(src)), paths))
+    out = {}
+    for src, (result, entry, cached) in zip(paths, results):
+        tally(stats, entry, cached)
+        out[src] = result
+    prep.save()
+    return out, stats
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        src_dir = os.path.join(tmp, "src")
+        os.makedirs(src_dir)
+        paths, widths = synth(n, src_dir)
+        for label in ("首次", "缓存命中"):
+            t0 = time.perf_counter()
+            out, stats = prepare(ImagePrep(os.path.join(tmp, "prepared")), paths, widths, workers)
+            dt = time.perf_counter() - t0
+            print(f"{label}: {dt:.2f} s（{n / dt:.0f} 张/s，{workers} 线程）")
+        px_in = sum(pixels(p) for p in paths.values())
+        px_out = sum(pixels(p) for p, _ in out.values())
+        print(f"  转换格式 {stats['converted']}，缩小 {stats['resized']}，失败 {stats['failed']}")
+        print(f"  字节: {stats['src_bytes'] / 1e6:.1f} MB → {stats['bytes'] / 1e6:.1f} MB "
+              f"({stats['bytes'] / stats['src_bytes']:.0%})")
+        print(f"  像素: {px_in / 1e6:.1f} M → {px_out / 1e6:.1f} M ({px_out / px_in:.0%})")
+        exts = {os.path.splitext(p)[1] for p, _ in out.values()}
+        print(f"  输出格式: {sorted(exts)}")
+        sys.exit(0 if exts <= {".png", ".jpg"} and not stats["failed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/bench_import.py
+"""命令行启动耗时：对 esat.py 的各个 --help 以及直接 import 各脚本模块，用 python -X importtime 统计本项目引入的导入时间，
+并测子进程的墙钟时间（取多次运行的中位数）。
+
+导入时间不含解释器自身启动（与 python -c pass 共有的模块不计）。
+任一命令导入了重依赖（pandas、numpy、requests、bs4、lxml、Pillow、pypdf、openpyxl），或导入时间超过 --budget-ms 时，
+退出码为 1，可用于检查启动是否变慢。
+
+用法: python benchmarks/bench_import.py [--repeat 5] [--budget-ms 150]
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import subprocess
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ("pandas", "numpy", "requests", "bs4", "lxml", "PIL", "pypdf", "PyPDF2", "openpyxl")
+TARGETS = (
+    ("esat.py --help", ["esat.py", "--help"]),
+    ("ingest --help", ["esat.py", "ingest", "--help"]),
+    ("render-tex --help", ["esat.py", "render-tex", "--help"]),
+    ("render-html --help", ["esat.py", "render-html", "--help"]),
+    ("compile --help", ["esat.py", "compile", "--help"]),
+    ("watch --help", ["esat.py", "watch", "--help"]),
+    ("import excel_to_pdf_fixed", ["-c", "import excel_to_pdf_fixed"]),
+    ("import json2pdf", ["-c", "import json2pdf"]),
+    ("import json2html", ["-c", "import json2html"]),
+)
+_LINE_RE = re.compile(r"^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|( *)(\S+)\s*$")
+
+
+def importtime(args):
+    """运行 python -X importtime <args>，返回 [(模块名, 嵌套层级, 自身 µs, 累计 µs)]"""
+    proc = subprocess.run([sys.executable, "-X", "importtime"] + args, cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        sys.exit(f"[FAIL] {' '.join(args)} 退出码 {proc.returncode}\n{proc.stderr[-2000:]}")
+    out = []
+    for line in proc.stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            out.append((m.group(4), len(m.group(3)) // 2, int(m.group(1)), int(m.group(2))))
+    return out
+
+
+def wall_ms(args, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=ROOT, capture_output=True)
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure CLI start-up and module import time")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per command for the wall-clock median")
+    parser.add_argument("--budget-ms", type=float, default=150,
+                        help="Fail when a command spends longer than this importing project code and its dependencies")
+    args = parser.parse_args()
+
+    startup = {name for name, *_ in importtime(["-c", "pass"])}
+    base_wall = wall_ms(["-c", "pass"], args.repeat)
+    print(f"python -c pass: {base_wall:.0f} ms（以下墙钟时间已减去）")
+    print(f"{'command':<28}{'wall ms':>9}{'import ms':>11}  slowest imports")
+    failed = []
+    for label, cmd in TARGETS:
+        entries = [e for e in importtime(cmd) if e[0] not in startup]
+        top = [e for e in entries if e[1] == 0]
+        total = sum(e[3] for e in top) / 1000
+        slowest = ", ".join(f"{name} {cum / 1000:.0f}" for name, _, _, cum in sorted(top, key=lambda e: -e[3])[:3])
+        heavy = sorted({name.split(".")[0] for name, *_ in entries} & set(HEAVY))
+        wall = wall_ms(cmd, args.repeat) - base_wall
+        print(f"{label:<28}{wall:>9.0f}{total:>11.1f}  {slowest}")
+        if heavy:
+            failed.append(f"{label}: imports {', '.join(heavy)}")
+        if total > args.budget_ms:
+            failed.append(f"{label}: {total:.0f} ms > {args.budget_ms:.0f} ms")
+    for msg in failed:
+        print(f"[FAIL] {msg}")
+    if failed:
+        sys.exit(1)
+    print("[OK] no heavy dependency imported at start-up")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# benchmarks/bench_ingest.py
+"""Excel 读取：对比每次 pd.read_excel 解析工作簿与加载 xlsx_snapshot 快照的耗时，并检查两者内容一致。
+
+用法: python benchmarks/bench_ingest.py [xlsx ...]
+"""
+import os
+import sys
+import time
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+from build_manifest import BuildManifest
+from xlsx_snapshot import load_workbook
+from excel_to_pdf_fixed import NEEDED_COLUMNS
+
+DEFAULT_FILES = [os.path.join(ROOT, "PracticeQuestions.xlsx"), os.path.join(ROOT, "Questionbank.xlsx")]
+REPEAT = 5
+
+
+def best_of(fn):
+    best, result = float("inf"), None
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    files = sys.argv[1:] or DEFAULT_FILES
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in files:
+            sheet = pd.ExcelFile(path).sheet_names[0]
+            t_old, df_old = best_of(lambda: pd.read_excel(path, sheet_name=sheet))
+            manifest = BuildManifest(tmp)
+            t0 = time.perf_counter()
+            load_workbook(path, sheet, tmp, manifest, NEEDED_COLUMNS)
+            t_cold = time.perf_counter() - t0
+            t_new, (df_new, _, hit) = best_of(
+                lambda: load_workbook(path, sheet, tmp, BuildManifest(tmp), NEEDED_COLUMNS))
+            cols = [c for c in df_old.columns if c in NEEDED_COLUMNS]
+            same = hit and df_old[cols].equals(df_new[cols])
+            ok &= same
+            print(f"{os.path.basename(path)}: {len(df_old)} 行，{len(df_old.columns)} → {len(df_new.columns)} 列")
+            print(f"  read_excel {t_old * 1000:.1f} ms | 首次（解析 + 写快照）{t_cold * 1000:.1f} ms | "
+                  f"快照 {t_new * 1000:.1f} ms（{t_old / t_new:.0f}x） | 内容一致: {same}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# benchmarks/bench_latex_emit.py
+"""json2pdf.py LaTeX 生成：旧实现（整体拼接 + 两次 % 替换）与流式写出的峰值 RSS / 耗时对比。
+
+每种实现在独立子进程中运行，用 ru_maxrss 读取峰值常驻内存。
+用法: python benchmarks/bench_latex_emit.py [题目数，默认 10000]
+"""
+import os
+import sys
+import json
+import time
+import random
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORDS = ("force mass velocity acceleration energy momentum wave current voltage field "
+         "particle charge lens angle friction gravity spring pendulum orbit density").split()
+
+
+def synth_bank(n, path, seed=0):
+    """生成与 excel_to_pdf_fixed.py 输出结构相同的合成题库"""
+    rnd = random.Random(seed)
+
+    def sentence(k):
+        return " ".join(rnd.choice(WORDS) for _ in range(k)) + "."
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        for i in range(n):
+            q = {
+                "id": f"Q{i+1:04d}",
+                "paper_type": rnd.choice(["Mechanics", "Electricity", "Waves", "2019PARTB"]),
+                "question": "\n".join(sentence(rnd.randint(8, 30)) for _ in range(rnd.randint(1, 4))) + " v^2 = u^2",
+                "options": {k: sentence(rnd.randint(1, 6)) for k in "ABCDE"},
+                "answer": rnd.choice("ABCDE"),
+                "explanation": "\n".join(sentence(rnd.randint(10, 40)) for _ in range(rnd.randint(1, 6))) + " ≤ √ →",
+                "images": [],
+            }
+            f.write((",\n" if i else "") + json.dumps(q, ensure_ascii=False, indent=2))
+        f.write("\n]")
+
+
+def run_old(input_path, outdir):
+    """旧实现：json.load 全量 + body_parts 列表 + LATEX_TEMPLATE 二次替换"""
+    import json2pdf
+    with open(input_path, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+    body_parts = []
+    for idx, item in enumerate(questions, start=1):
+        body_parts.append(json2pdf.QUESTION_BLOCK % {
+            "id": idx,
+            "question": json2pdf.escape_latex_math(item.get("question", "")),
+            "A": json2pdf.escape_latex_math(item.get("options", {}).get("A", "")),
+            "B": json2pdf.escape_latex_math(item.get("options", {}).get("B", "")),
+            "C": json2pdf.escape_latex_math(item.get("options", {}).get("C", "")),
+            "D": json2pdf.escape_latex_math(item.get("options", {}).get("D", "")),
+            "answer": json2pdf.escape_latex_math(item.get("answer", "")),
+            "explanation": json2pdf.escape_latex_math(item.get("explanation", "")),
+            "image_block": "",
+        })
+    latex_code = json2pdf.LATEX_TEMPLATE % {"title": "Questions", "body": "\n".join(body_parts)}
+    with open(Path(outdir) / "questions.tex", "w", encoding="utf-8") as f:
+        f.write(latex_code)
+
+
+def run_new(input_path, outdir):
+    import json2pdf
+    json2pdf.json_to_latex(Path(input_path), Path(outdir), "Questions")
+
+
+def child(mode, input_path, outdir):
+    import json2pdf  # noqa: F401  导入开销不计入
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    (run_old if mode == "old" else run_new)(input_path, outdir)
+    dt = time.perf_counter() - t0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"wall": dt, "peak_kb": peak, "base_kb": base}))
+
+
+def measure(mode, input_path, outdir):
+    out = subprocess.run([sys.executable, __file__, "--child", mode, input_path, outdir],
+                         check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(*sys.argv[2:5])
+        return
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    with tempfile.TemporaryDirectory() as tmp:
+        bank = os.path.join(tmp, "bank.json")
+        synth_bank(n, bank)
+        print(f"合成题库 {n} 题，{os.path.getsize(bank) / 1e6:.1f} MB")
+        results = {}
+        for mode in ("old", "new"):
+            outdir = os.path.join(tmp, mode)
+            os.makedirs(outdir)
+            results[mode] = r = measure(mode, bank, outdir)
+            print(f"  {mode}: {r['wall']:.2f} s, peak RSS {r['peak_kb'] / 1024:.1f} MB "
+                  f"(+{(r['peak_kb'] - r['base_kb']) / 1024:.1f} MB over import)")
+        same = Path(tmp, "old", "questions.tex").read_bytes() == Path(tmp, "new", "questions.tex").read_bytes()
+        print(f"  输出一致: {same}")
+
+
+if __name__ == "__main__":
+    main()
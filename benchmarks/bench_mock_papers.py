@@ -0,0 +1,75 @@
+# benchmarks/bench_mock_papers.py
+"""模拟卷抽题：对比逐卷遍历题库筛选 + random.sample 与 PaperSampler（预建分层下标 + NumPy 掩码）。
+
+合成 n 道题（12 个 paper_type × 5 个难度），按 blueprint 连续抽若干套互不重复的试卷，检查没有重复题。
+
+用法: python benchmarks/bench_mock_papers.py [题目数，默认 100000] [试卷数，默认 200]
+"""
+import os
+import sys
+import time
+import random
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mock_papers import ANY, PaperSampler
+
+PAPER_TYPES = [f"T{i}" for i in range(12)]
+DIFFICULTIES = ["容易", "较易", "适中", "较难", "困难"]
+BLUEPRINT = [("T0", ANY, 10), ("T1", "适中", 5), ("T2", "较难", 3), (ANY, "困难", 2)]
+
+
+def naive(keys, papers, seed):
+    """旧做法：每套试卷、每个条目都重新扫描整个题库"""
+    rnd = random.Random(seed)
+    used = set()
+    out = []
+    for _ in range(papers):
+        paper = []
+        for p, d, n in BLUEPRINT:
+            pool = [i for i, (kp, kd) in enumerate(keys)
+                    if p in (ANY, kp) and d in (ANY, kd) and i not in used]
+            pick = rnd.sample(pool, n)
+            used.update(pick)
+            paper += sorted(pick)
+        out.append(paper)
+    return out
+
+
+def _split(paper):
+    parts, pos = [], 0
+    for _, _, k in BLUEPRINT:
+        parts.append([int(i) for i in paper[pos:pos + k]])
+        pos += k
+    return parts
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    papers = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rnd = random.Random(0)
+    keys = [(rnd.choice(PAPER_TYPES), rnd.choice(DIFFICULTIES)) for _ in range(n)]
+
+    t0 = time.perf_counter()
+    old = naive(keys, papers, 1)
+    t_old = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    sampler = PaperSampler(keys, seed=1)
+    t_index = time.perf_counter() - t0
+    new = [sampler.draw(BLUEPRINT) for _ in range(papers)]
+    t_new = time.perf_counter() - t0
+
+    flat = [int(i) for p in new for i in p]
+    distinct = len(flat) == len(set(flat)) and len({i for p in old for i in p}) == len(flat)
+    valid = all(p in (ANY, keys[i][0]) and d in (ANY, keys[i][1])
+                for paper in new for (p, d, k), part in zip(BLUEPRINT, _split(paper)) for i in part)
+    print(f"{n} 题，{papers} 套 × {sum(k for _, _, k in BLUEPRINT)} 题")
+    print(f"  逐卷扫描: {t_old:.2f} s | PaperSampler: {t_new * 1000:.0f} ms（建分层 {t_index * 1000:.0f} ms，"
+          f"{t_old / t_new:.0f}x） | 无重复: {distinct} | 分层正确: {valid}")
+    sys.exit(0 if distinct and valid else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# benchmarks/bench_pipeline.py
+"""整条流水线的规模测试：合成 1k / 10k / 100k 行题库，图片由本地服务器提供，逐规模运行
+excel_to_pdf_fixed.py 与 json2pdf.py，记录各阶段耗时、内存与计数，并与上一次的结果比较。
+
+每个规模依次运行：
+  excel cold   全新输出目录（无快照、无图片缓存）
+  excel warm   同一目录加 --incremental 再跑一次（快照、图片缓存、行缓存全部命中）
+  json2pdf cold / warm   由上一步的 questions.json 生成 .tex（--compile 时编译），第二次应全部复用
+各脚本以 --profile 运行，阶段数据取自其 metrics.jsonl（见 metrics.py）；另记子进程的墙钟时间与 RSS 峰值。
+--tracemalloc 时子进程以 PYTHONTRACEMALLOC=1 运行，各阶段另有 py_peak_mb（明显变慢，只用来看内存）。
+
+结果每次运行每个脚本一行追加到 <workdir>/results.jsonl（含 git 提交、规模、各阶段数据），
+打印时与该文件中同规模、同脚本、同阶段的上一条结果对比。合成的题库按参数缓存在 workdir 中。
+
+用法: python benchmarks/bench_pipeline.py [--sizes 1000 10000 100000] [--workdir DIR] [--label TEXT]
+                                         [--compile] [--tracemalloc] [--latency-ms 0] [-w N]
+--compile 时若没有 xelatex 则使用 benchmarks/stub_xelatex.py（此时编译耗时不代表真实 TeX）。
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+from image_server import DEFAULT_PORT, ImageServer
+from synth_bank import FAIL_RATE, GENERATOR_VERSION, IMAGE_POOL, BankSynth, write_xlsx
+from metrics import METRICS_NAME
+
+SIZES = (1000, 10000, 100000)
+RESULTS_NAME = "results.jsonl"
+STUB = os.path.join(HERE, "stub_xelatex.py")
+
+
+def git_revision():
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                             text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return rev + ("+dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_script(args, log_path, env):
+    """运行一个流水线脚本，返回 (墙钟秒, 子进程 RSS 峰值 MB)；失败时打印日志末尾并退出"""
+    t0 = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        proc = subprocess.Popen([sys.executable] + args, cwd=ROOT, stdout=log, stderr=subprocess.STDOUT, env=env)
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            rss = round(usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+        else:
+            proc.wait()
+            rss = None
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+            print("".join(f.readlines()[-20:]))
+        sys.exit(f"[FAIL] {' '.join(args)} 退出码 {proc.returncode}，日志: {log_path}")
+    return wall, rss
+
+
+def last_report(outdir):
+    with open(os.path.join(outdir, METRICS_NAME), "r", encoding="utf-8") as f:
+        return json.loads(f.readlines()[-1])
+
+
+def load_results(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def previous(results, size, script, phase):
+    for r in reversed(results):
+        if r["size"] == size and r["script"] == script and r["phase"] == phase:
+            return r
+    return None
+
+
+def _delta(now, before):
+    if before in (None, 0) or now is None:
+        return ""
+    return f"{(now - before) / before:+.0%}"
+
+
+def print_run(rec, prev):
+    label = f"{rec['script']} {rec['phase']}"
+    rss = f"{rec['max_rss_mb']:.0f} MB" if rec["max_rss_mb"] is not None else "n/a"
+    vs = f"  (上次 {prev['git'] or '?'} {prev['started']}: {prev['wall_s']:.2f} s {_delta(rec['wall_s'], prev['wall_s'])})" \
+        if prev else ""
+    print(f"  {label:<16}{rec['wall_s']:>9.2f} s  RSS {rss}{vs}")
+    before = {st["name"]: st for st in prev["stages"]} if prev else {}
+    for st in rec["stages"]:
+        b = before.get(st["name"], {})
+        mem = f"  py {st['py_peak_mb']:.0f} MB" if st.get("py_peak_mb") is not None else ""
+        print(f"    {st['name']:<14}{st['wall_s']:>9.3f} s {_delta(st['wall_s'], b.get('wall_s')):>6}{mem}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic banks of several sizes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="Bank sizes (rows)")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "esat_bench"),
+                        help="Where banks, outputs and results.jsonl are kept")
+    parser.add_argument("--label", default="", help="Free-text note stored with the results")
+    parser.add_argument("--seed", type=int, default=1, help="Bank generator seed")
+    parser.add_argument("--image-pool", type=int, default=IMAGE_POOL, help="Distinct images referenced by the bank")
+    parser.add_argument("--fail-rate", type=float, default=FAIL_RATE, help="Fraction of image links that 404")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port of the local image server")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Simulated network delay per image request")
+    parser.add_argument("-w", "--workers", type=int, default=0, help="Passed to excel_to_pdf_fixed.py -w")
+    parser.add_argument("--compile", action="store_true", help="Also run xelatex (stub engine if TeX is missing)")
+    parser.add_argument("--tracemalloc", action="store_true", help="Trace Python allocations per stage (slow)")
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    results_path = os.path.join(args.workdir, RESULTS_NAME)
+    results = load_results(results_path)
+    env = dict(os.environ)
+    if args.tracemalloc:
+        env["PYTHONTRACEMALLOC"] = "1"
+    if args.compile and "XELATEX" not in env and shutil.which("xelatex") is None:
+        env["XELATEX"] = STUB
+        print("[WARN] 未找到 xelatex，使用替身 benchmarks/stub_xelatex.py")
+    common = {"git": git_revision(), "label": args.label, "python": platform.python_version(),
+              "platform": platform.platform(), "cpu_count": os.cpu_count(), "compile": args.compile,
+              "tracemalloc": args.tracemalloc, "image_pool": args.image_pool, "latency_ms": args.latency_ms}
+
+    with ImageServer(args.port, args.latency_ms / 1000) as server:
+        for size in args.sizes:
+            bank = os.path.join(args.workdir, f"bank-v{GENERATOR_VERSION}-{size}-s{args.seed}"
+                                              f"-p{args.image_pool}-f{args.fail_rate}-{args.port}.xlsx")
+            if not os.path.exists(bank):
+                t0 = time.perf_counter()
+                synth = BankSynth(args.seed, server.base_url, args.image_pool, args.fail_rate)
+                write_xlsx(bank, synth.rows(size))
+                print(f"合成题库 {size} 行: {time.perf_counter() - t0:.1f} s → {bank}")
+            out = os.path.join(args.workdir, f"out-{size}")
+            shutil.rmtree(out, ignore_errors=True)
+            os.makedirs(out)
+            pdf_out = os.path.join(out, "pdf")
+            excel_args = ["excel_to_pdf_fixed.py", "-i", bank, "-o", out, "--profile"]
+            if args.workers:
+                excel_args += ["-w", str(args.workers)]
+            pdf_args = ["json2pdf.py", "-i", os.path.join(out, "questions.json"), "-o", pdf_out, "--profile"]
+            if not args.compile:
+                pdf_args.append("--no-compile")
+            runs = (("excel_to_pdf_fixed", "cold", excel_args, out),
+                    ("excel_to_pdf_fixed", "warm", excel_args + ["--incremental"], out),
+                    ("json2pdf", "cold", pdf_args, pdf_out),
+                    ("json2pdf", "warm", pdf_args, pdf_out))
+
+            print(f"== {size} 行 ==")
+            for script, phase, script_args, metrics_dir in runs:
+                log = os.path.join(args.workdir, f"{script}-{size}-{phase}.log")
+                hits_before = dict(server.hits)
+                wall, rss = run_script(script_args, log, env)
+                report = last_report(metrics_dir)
+                rec = dict(common, started=report["started"], size=size, script=script, phase=phase,
+                           wall_s=round(wall, 3), max_rss_mb=rss, total=report["total"], meta=report["meta"],
+                           stages=report["stages"],
+                           server={k: v - hits_before.get(k, 0) for k, v in server.hits.items()})
+                print_run(rec, previous(results, size, script, phase))
+                with open(results_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    print(f"[DONE] 结果已追加到 {results_path}")
+
+
+if __name__ == "__main__":
+    main()
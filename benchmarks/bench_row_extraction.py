@@ -0,0 +1,63 @@
+# benchmarks/bench_row_extraction.py
+"""对比 df.iterrows() + row.get() 与列式抽取的逐行开销（不含 HTML 解析）。
+
+用法: python benchmarks/bench_row_extraction.py [xlsx ...]
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+from excel_to_pdf_fixed import extract_columns
+
+DEFAULT_FILES = [os.path.join(ROOT, "PracticeQuestions.xlsx"), os.path.join(ROOT, "Questionbank.xlsx")]
+REPEAT = 5
+
+
+def old_path(df):
+    """旧实现的取值方式：每行构造 Series，字段多次 row.get()"""
+    out = []
+    for idx, row in df.iterrows():
+        q_raw = row.get("题目", "") if "题目" in row else row.get("question", "")
+        opts_raw = row.get("选项", "")
+        expl = row.get("解题思路", "") if isinstance(row.get("解题思路", ""), str) else ""
+        out.append((q_raw, opts_raw, row.get("题目类型", ""), row.get("试卷类型", ""),
+                    row.get("难度", ""), row.get("年份", ""), str(row.get("答案", "")).strip(),
+                    row.get("解题思路", ""), expl))
+    return out
+
+
+def new_path(df):
+    """列式中间表：一次取整列，逐行只做 zip"""
+    t = extract_columns(df)
+    return list(zip(t["question_raw"], t["options_raw"], t["type"], t["paper_type"], t["difficulty"],
+                    t["year"], t["answer"], t["explanation_raw"]))
+
+
+def best_of(fn, df):
+    best = float("inf")
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        fn(df)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    files = sys.argv[1:] or DEFAULT_FILES
+    for path in files:
+        df = pd.read_excel(path, sheet_name=0)
+        n = len(df)
+        t_old = best_of(old_path, df)
+        t_new = best_of(new_path, df)
+        print(f"{os.path.basename(path)} ({n} 行)")
+        print(f"  iterrows + row.get : {t_old * 1e3:8.1f} ms  ({t_old / n * 1e6:6.1f} µs/行)")
+        print(f"  columnar           : {t_new * 1e3:8.1f} ms  ({t_new / n * 1e6:6.1f} µs/行)")
+        print(f"  speedup            : {t_old / t_new:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/bench_shards.py
+"""分片编译：整份编译 vs N 个分片并发编译 + 合并，并校验切分/页码的正确性。
+
+用法: python benchmarks/bench_shards.py questions.tex [分片数 ...]
+默认使用系统 xelatex；没有 TeX 时设置 XELATEX=benchmarks/stub_xelatex.py
+（替身按行数模拟页数与耗时，此时计时只反映调度与合并开销，不代表真实 TeX 的加速比）。
+再设置 STUB_ERRORS=N 时替身带可恢复错误退出（退出码 1，PDF 照常写出），与真实题库的编译一致，应照常合并。
+
+校验（失败则以非零状态退出）：
+  1. 各分片正文按顺序拼接后与原文档正文一致（不丢行、不重复）。
+  2. 合并后的页数等于各分片页数之和；使用替身时每页文字即页码，检查其从 1 连续递增。
+"""
+import os
+import re
+import sys
+import time
+import shutil
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tex_shards import (LATEX_ENGINE, PAGE_HOOK, FIRST_SHARD_ONLY, BEGIN_DOCUMENT, END_DOCUMENT,
+                        compile_shard, compile_sharded, shard_root, _pdf_reader)
+
+QUESTION_RE = re.compile(r"\\noindent\s*$|\\subsection\*\{")
+GROUP_RE = re.compile(r"\\section\*\{")
+
+
+def body_lines(path, first):
+    lines = Path(path).read_text(encoding="utf-8").splitlines()
+    b = next(i for i, l in enumerate(lines) if l.lstrip().startswith(BEGIN_DOCUMENT))
+    e = max(i for i, l in enumerate(lines) if l.lstrip().startswith(END_DOCUMENT))
+    out = [l for l in lines[b + 1:e] if l + "\n" != PAGE_HOOK]
+    return out if first else [l for l in out if l.strip() not in FIRST_SHARD_ONLY]
+
+
+def check(tex, parts, pdf):
+    failures = 0
+    orig = [l for l in body_lines(tex, False)]
+    joined = []
+    for i, p in enumerate(parts):
+        lines = body_lines(p, False)
+        if i:
+            # 去掉各分片重复携带的 \begin{document} 到第一题之间的内容
+            k = next(j for j, l in enumerate(lines) if QUESTION_RE.match(l) or GROUP_RE.match(l))
+            lines = lines[k:]
+        joined.extend(lines)
+    ok = joined == orig
+    print(f"  切分拼接一致: {ok}")
+    failures += not ok
+    reader = _pdf_reader()(str(pdf))
+    labels = [(pg.extract_text() or "").strip() for pg in reader.pages]
+    if all(l.startswith("page ") for l in labels):
+        ok = labels == [f"page {i}" for i in range(1, len(labels) + 1)]
+        print(f"  合并后 {len(labels)} 页，页码连续: {ok}")
+        failures += not ok
+    else:
+        print(f"  合并后 {len(labels)} 页")
+    return failures
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    tex = Path(sys.argv[1]).resolve()
+    counts = [int(a) for a in sys.argv[2:]] or [2, 4]
+    print(f"引擎: {LATEX_ENGINE}")
+    t0 = time.perf_counter()
+    rc, _, pages = compile_shard(tex, 1, tex.parent)
+    single = time.perf_counter() - t0
+    print(f"整份编译: {single:.2f} s，{pages} 页（返回码 {rc}）")
+    failures = int(pages is None)
+    for n in counts:
+        shutil.rmtree(shard_root(tex), ignore_errors=True)
+        for label in ("首次", "再次"):
+            t0 = time.perf_counter()
+            pdf = compile_sharded(tex, n, QUESTION_RE, GROUP_RE, workers=n)
+            dt = time.perf_counter() - t0
+            print(f"{n} 个分片（{label}）: {dt:.2f} s  ({single / dt:.1f}x)")
+        if pdf is None:
+            failures += 1
+            continue
+        parts = sorted(shard_root(tex).glob("*/*.tex"))
+        failures += check(tex, parts, pdf)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# benchmarks/bench_store.py
+"""专题小册子的取题开销：JSON Lines 逐条读取 + Python 筛选 与 SQLite 题库（索引 / FTS5）查询对比。
+
+把已有的题目文件复制若干份（改写 id）合成大题库，测量几种典型筛选的耗时，并检查两种方式选出的题目一致。
+
+用法: python benchmarks/bench_store.py <questions.json|jsonl> [题目数，默认 20000]
+"""
+import os
+import sys
+import time
+import tempfile
+import itertools
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from question_io import iter_questions, write_questions
+from question_store import QuestionQuery, build_store, select_questions
+
+QUERIES = {
+    "Mechanics / 适中 / 2019-2023": QuestionQuery(paper_types=["Mechanics"], difficulties=["适中"], years=(2019, 2023)),
+    "较难 / 2022, 前 50 题": QuestionQuery(difficulties=["较难"], years=(2022, 2022), limit=50),
+    "全文检索 \"kinetic energy\"": QuestionQuery(search="kinetic energy"),
+    "全文检索 \"F=ma\"（查询语法字符）": QuestionQuery(search="F=ma"),
+    "全文检索 \"m/s kg\"（含不足 3 个字符的词）": QuestionQuery(search="m/s kg"),
+}
+
+
+def synth(src, n):
+    base = list(iter_questions(src))
+    for i, q in zip(range(n), itertools.cycle(base)):
+        yield dict(q, id=f"S{i:06d}")
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - t0, out
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    src = sys.argv[1]
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        jsonl = os.path.join(tmp, "bank.jsonl")
+        db = os.path.join(tmp, "bank.db")
+        write_questions(synth(src, n), jsonl, "jsonl")
+        dt, _ = timed(lambda: build_store(iter_questions(jsonl), db))
+        print(f"{n} 题：JSONL {os.path.getsize(jsonl) / 1e6:.0f} MB；建库 {dt:.2f} s，{os.path.getsize(db) / 1e6:.0f} MB")
+        for label, query in QUERIES.items():
+            def scan():
+                hits = (q["id"] for q in iter_questions(jsonl) if query.matches(q))
+                return list(itertools.islice(hits, query.limit))
+            t_json, a = timed(scan)
+            t_db, b = timed(lambda: [q["id"] for q in select_questions(db, query)])
+            same = a == b
+            ok &= same
+            print(f"  {label}: {len(b)} 题 | JSONL {t_json * 1000:.0f} ms | SQLite {t_db * 1000:.1f} ms "
+                  f"({t_json / t_db:.0f}x) | 一致: {same}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_watch.py
+"""修改一道题之后多久能看到新的输出：比较每次启动新进程的命令行重建与 watch 模式的常驻进程。
+
+合成题库（图片由本地服务器提供）先完整转换一次，然后每轮改动一行题干并重新写出 .xlsx：
+  cli     python excel_to_pdf_fixed.py --incremental，再 python json2html.py（新进程，磁盘缓存都已命中）
+  watch   watch.WatchBuild 在同一进程中重建（--html），不含轮询与 debounce 的等待
+两者的输出与从头转换的结果一致。
+
+用法: python benchmarks/bench_watch.py [--rows 10000] [--edits 3] [--workdir DIR]
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from image_server import DEFAULT_PORT, ImageServer
+from synth_bank import BankSynth, write_xlsx
+
+
+def run_cli(args):
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable] + args, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Edit-to-output latency: fresh CLI processes vs watch mode")
+    parser.add_argument("--rows", type=int, default=10000, help="Bank size")
+    parser.add_argument("--edits", type=int, default=3, help="Edit/rebuild rounds")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "esat_bench_watch"),
+                        help="Where the bank and outputs are written")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port of the local image server")
+    args = parser.parse_args()
+
+    from watch import WatchBuild, build_watch_parser
+    shutil.rmtree(args.workdir, ignore_errors=True)
+    os.makedirs(args.workdir)
+    bank = os.path.join(args.workdir, "bank.xlsx")
+    out_cli, out_watch = os.path.join(args.workdir, "cli"), os.path.join(args.workdir, "watch")
+
+    with ImageServer(args.port) as server:
+        rows = list(BankSynth(1, server.base_url).rows(args.rows))
+        write_xlsx(bank, rows)
+        excel = ["excel_to_pdf_fixed.py", "-i", bank, "-o", out_cli]
+        html = ["json2html.py", "-i", os.path.join(out_cli, "questions.json"), "-o", out_cli]
+        cold = run_cli(excel) + run_cli(html)
+        print(f"{args.rows} 行，首次完整转换（含 HTML）: {cold:.2f} s")
+
+        builder = WatchBuild(build_watch_parser().parse_args(["-i", bank, "-o", out_watch, "--html"]))
+        t0 = time.perf_counter()
+        builder.build()
+        print(f"watch 首次构建: {time.perf_counter() - t0:.2f} s")
+
+        print(f"{'edit':<6}{'cli s':>9}{'watch s':>10}")
+        for k in range(args.edits):
+            row = rows[(k * 7919) % len(rows)]
+            row["题目"] = row["题目"].replace("</span></p>", f" (edit {k})</span></p>", 1)
+            write_xlsx(bank, rows)
+            cli = run_cli(excel + ["--incremental"]) + run_cli(html)
+            t0 = time.perf_counter()
+            builder.build()
+            warm = time.perf_counter() - t0
+            print(f"{k + 1:<6}{cli:>9.2f}{warm:>10.2f}")
+
+    same = all(open(os.path.join(out_cli, name), "rb").read().replace(out_cli.encode(), b"X")
+               == open(os.path.join(out_watch, name), "rb").read().replace(out_watch.encode(), b"X")
+               for name in ("questions.json", "questions_practice.tex", "questions_answers.tex",
+                            "questions_key.tex", "questions-001.html"))
+    print("[OK] watch 输出与命令行输出一致" if same else "[FAIL] watch 输出与命令行输出不同")
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
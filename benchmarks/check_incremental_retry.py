@@ -0,0 +1,85 @@
+# benchmarks/check_incremental_retry.py
+"""增量模式补下载：首次转换时图床不可用（图片全部下载失败），第二次 --incremental 须重新处理这些行并补上图片，
+第三次则全部复用。
+
+合成题库的图片由本地图片服务器提供：第一次运行时服务器对所有地址返回 404（offline），之后恢复。
+任一步不符合预期时以非零状态退出。
+
+用法: python benchmarks/check_incremental_retry.py [--rows 200] [--workdir DIR]
+"""
+import os
+import re
+import sys
+import json
+import shutil
+import argparse
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from image_server import DEFAULT_PORT, ImageServer
+from synth_bank import BankSynth, write_xlsx
+
+
+def convert(bank, out_dir):
+    """运行一次 --incremental 转换，返回 (复用行数, 解析行数, 各题记录)"""
+    proc = subprocess.run([sys.executable, "excel_to_pdf_fixed.py", "-i", bank, "-o", out_dir, "--incremental"],
+                          cwd=ROOT, check=True, capture_output=True, text=True, encoding="utf-8")
+    m = re.search(r"解析 (\d+)，复用 (\d+)", proc.stdout)
+    if not m:
+        sys.exit(f"[FAIL] 无法从输出中读出复用行数：\n{proc.stdout}")
+    with open(os.path.join(out_dir, "questions.json"), "r", encoding="utf-8") as f:
+        questions = json.load(f)
+    return int(m.group(2)), int(m.group(1)), questions
+
+
+def missing(questions):
+    """image_refs 中含下载失败图片（None）的题目数"""
+    return sum(any(i is None for row in (q.get("image_refs") or {}).values() for i in row) for q in questions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that --incremental retries rows whose images failed to download")
+    parser.add_argument("--rows", type=int, default=200, help="Bank size")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "esat_check_retry"),
+                        help="Where the bank and outputs are written")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port of the local image server")
+    args = parser.parse_args()
+
+    shutil.rmtree(args.workdir, ignore_errors=True)
+    os.makedirs(args.workdir)
+    bank = os.path.join(args.workdir, "bank.xlsx")
+    out_dir = os.path.join(args.workdir, "out")
+    write_xlsx(bank, BankSynth(1, f"http://127.0.0.1:{args.port}", fail_rate=0).rows(args.rows))
+
+    failed = False
+    with ImageServer(args.port) as server:
+        server.offline = True
+        reused, parsed, questions = convert(bank, out_dir)
+        broken = missing(questions)
+        print(f"图床不可用：解析 {parsed}，复用 {reused}，缺图的题 {broken}")
+        if broken == 0:
+            sys.exit("[FAIL] 图床不可用时没有题目缺图，无法检查补下载")
+
+        server.offline = False
+        reused, parsed, questions = convert(bank, out_dir)
+        print(f"图床恢复后：解析 {parsed}，复用 {reused}，缺图的题 {missing(questions)}")
+        if parsed < broken or missing(questions):
+            print(f"[FAIL] 上次缺图的 {broken} 题没有全部重新下载")
+            failed = True
+
+        reused, parsed, questions = convert(bank, out_dir)
+        print(f"再次运行：解析 {parsed}，复用 {reused}")
+        if parsed:
+            print("[FAIL] 图片齐全后仍有行被重新解析")
+            failed = True
+
+    if failed:
+        sys.exit(1)
+    print("[OK] 下载失败的行在下一次增量运行时重试，补齐后直接复用")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# benchmarks/image_server.py
+"""本地图片服务器：代替 OSS 图床，为合成题库（synth_bank.py）中的图片地址返回 PNG。
+
+- /img/<编号>-<宽>x<高>.png → 该尺寸的灰度 PNG（内容由编号决定，生成后留在内存中）；
+  响应带 ETag / Last-Modified，If-None-Match 命中时返回 304，可以测到图片缓存的条件 GET。
+- /missing/... → 404，用来测下载失败的统计；offline 为 True 时所有地址都返回 404（图床暂时不可用）。
+- latency 为每个请求的额外延迟（秒），模拟网络往返。
+- HTTP/1.1 keep-alive，与 image_fetcher 的连接池行为一致。
+
+单独运行: python benchmarks/image_server.py [--port 18765] [--latency-ms 0]
+"""
+import re
+import sys
+import time
+import zlib
+import struct
+import hashlib
+import argparse
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 18765
+_IMG_RE = re.compile(r"^/img/(\d+)-(\d+)x(\d+)\.png$")
+_LAST_MODIFIED = formatdate(0, usegmt=True)
+
+
+def make_png(seed, width, height):
+    """编号 seed 决定条纹图案的灰度 PNG（无依赖：zlib + struct）"""
+    shade = 64 + seed % 160
+    stripe = bytes(255 if i % 7 == 0 else shade for i in range(width + 7))
+    rows = [b"\x00" + stripe[(y + seed) % 7:][:width] for y in range(height)]   # 每行 filter 类型 0
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)   # 8 位灰度
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(b"".join(rows), 6)) + chunk(b"IEND", b""))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True   # 头部与正文分两次写出，keep-alive 下否则每个请求都要等延迟 ACK
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        path = self.path.split("?", 1)[0]
+        m = _IMG_RE.match(path)
+        if not m or server.offline:
+            server.count("404")
+            self._reply(404, b"not found", "text/plain")
+            return
+        body, etag = server.image(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+        if self.headers.get("If-None-Match") == etag:
+            server.count("304")
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        server.count("200")
+        self._reply(200, body, "image/png", etag)
+
+    def _reply(self, status, body, content_type, etag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", _LAST_MODIFIED)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ImageServer(ThreadingHTTPServer):
+    """with ImageServer(port) as srv: ...；srv.base_url 为根地址，srv.hits 为各状态码的请求数，
+    srv.offline = True 时所有请求都返回 404"""
+
+    daemon_threads = True
+
+    def __init__(self, port=DEFAULT_PORT, latency=0.0, host="127.0.0.1"):
+        super().__init__((host, port), _Handler)
+        self.latency = latency
+        self.offline = False
+        self.hits = {}
+        self._images = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, status):
+        with self._lock:
+            self.hits[status] = self.hits.get(status, 0) + 1
+
+    def image(self, seed, width, height):
+        key = (seed, width, height)
+        found = self._images.get(key)
+        if found is None:
+            body = make_png(seed, max(1, min(width, 2000)), max(1, min(height, 2000)))
+            found = self._images[key] = (body, '"%s"' % hashlib.sha256(body).hexdigest()[:16])
+        return found
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve synthetic question-bank images locally")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Extra delay per request")
+    args = parser.parse_args()
+    with ImageServer(args.port, args.latency_ms / 1000) as srv:
+        print(f"serving images at {srv.base_url}/img/<n>-<w>x<h>.png (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            print(srv.hits)
+            sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# benchmarks/stub_xelatex.py
+"""xelatex 替身：没有安装 TeX 时用于测试分片编译流程。
+
+接受与 xelatex 相同的参数（-output-directory / -jobname / 文件名或 "\\def...\\input{...}"），
+按正文行数生成页数（每 STUB_LINES_PER_PAGE 行一页）的最小 PDF，每页写入其页码，
+并在 .log 中写出 "Output written on ... (N pages)."。用 STUB_SECONDS_PER_PAGE 模拟编译耗时。
+
+预编译导言区（见 tex_format.py）：
+  -ini ... mylatexformat.ltx "name.tex"  把 \csname endofdump\endcsname 之前的导言区写入 <jobname>.fmt；
+                                          STUB_NO_INI=1 时失败（模拟没有 mylatexformat）
+  -fmt=NAME                               在 TEXFORMATS 列出的目录中查找 NAME.fmt，其导言区须与文档一致，否则失败
+STUB_PREAMBLE_SECONDS 模拟普通编译加载导言区的耗时，STUB_FORMAT_SECONDS 模拟载入格式的耗时（默认都为 0）。
+STUB_ERRORS=N 模拟 nonstopmode 下的可恢复错误：照常写出 PDF，.log 中多出 N 行 "! Missing $ inserted."，退出码为 1
+（与真实题库的编译一致）。
+
+用法: XELATEX=benchmarks/stub_xelatex.py python json2pdf.py -i ... --shards 4
+"""
+import os
+import re
+import sys
+import time
+
+LINES_PER_PAGE = int(os.environ.get("STUB_LINES_PER_PAGE", "40"))
+SECONDS_PER_PAGE = float(os.environ.get("STUB_SECONDS_PER_PAGE", "0.01"))
+PREAMBLE_SECONDS = float(os.environ.get("STUB_PREAMBLE_SECONDS", "0"))
+FORMAT_SECONDS = float(os.environ.get("STUB_FORMAT_SECONDS", "0"))
+ERRORS = int(os.environ.get("STUB_ERRORS", "0"))
+DUMP_MARKER = "\\csname endofdump\\endcsname"
+
+
+def minimal_pdf(page_labels):
+    """生成每页只有一行文字（页码）的合法 PDF"""
+    n = len(page_labels)
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>",
+            "<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{4 + 2 * i} 0 R" for i in range(n)), n),
+            "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    for i, label in enumerate(page_labels):
+        stream = f"BT /F1 12 Tf 72 72 Td (page {label}) Tj ET"
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                    f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>")
+        objs.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for no, body in enumerate(objs, start=1):
+        offsets.append(len(out))
+        out += f"{no} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    for off in offsets:
+        out += f"{off:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def dumped_part(text):
+    """导言区中 DUMP_MARKER 之前的部分（含标记行）；没有标记时返回 None"""
+    head, sep, _ = text.partition(DUMP_MARKER)
+    return head + sep if sep and "\\begin{document}" not in head else None
+
+
+def find_format(name):
+    for d in os.environ.get("TEXFORMATS", "").split(os.pathsep):
+        path = os.path.join(d, name + ".fmt")
+        if d and os.path.isfile(path):
+            return path
+    return None
+
+
+def dump(outdir, jobname, source):
+    log = os.path.join(outdir, jobname + ".log")
+    with open(source, "r", encoding="utf-8") as f:
+        part = dumped_part(f.read())
+    if os.environ.get("STUB_NO_INI") == "1" or part is None:
+        with open(log, "w", encoding="utf-8") as f:
+            f.write("! I can't find file `mylatexformat.ltx'.\n" if part is not None else "! No \\endofdump.\n")
+        return 1
+    time.sleep(PREAMBLE_SECONDS)
+    with open(os.path.join(outdir, jobname + ".fmt"), "w", encoding="utf-8") as f:
+        f.write(part)
+    with open(log, "w", encoding="utf-8") as f:
+        f.write(f"This is stub XeTeX, INITEX\nBeginning to dump on file {jobname}.fmt\n")
+    return 0
+
+
+def main(argv):
+    outdir, jobname, source, fmt, ini = ".", None, None, None, False
+    it = iter(argv)
+    for a in it:
+        if a == "-output-directory":
+            outdir = next(it)
+        elif a == "-jobname":
+            jobname = next(it)
+        elif a == "-ini":
+            ini = True
+        elif a.startswith("-fmt="):
+            fmt = a[len("-fmt="):]
+        elif not a.startswith("-"):
+            source = a
+    if ini:
+        return dump(outdir, jobname, source.strip('"'))
+    first = 1
+    m = re.search(r"\\def\\ShardFirstPage\{(\d+)\}\\input\{(.+?)\}", source or "")
+    if m:
+        first, source = int(m.group(1)), m.group(2)
+    jobname = jobname or os.path.splitext(os.path.basename(source))[0]
+    with open(source, "r", encoding="utf-8") as f:
+        text = f.read()
+    log = os.path.join(outdir, jobname + ".log")
+    if "\\end{document}" not in text:
+        with open(log, "w", encoding="utf-8") as f:
+            f.write("! Emergency stop.\n")
+        return 1
+    if fmt is not None:
+        path = find_format(fmt)
+        loaded = open(path, "r", encoding="utf-8").read() if path else None
+        if loaded is None or loaded != dumped_part(text):
+            with open(log, "w", encoding="utf-8") as f:
+                f.write(f"! I can't find the format file `{fmt}.fmt'!\n" if loaded is None
+                        else f"! Format {fmt} does not match the preamble.\n")
+            return 1
+        time.sleep(FORMAT_SECONDS)
+    else:
+        time.sleep(PREAMBLE_SECONDS)
+    body = text.split("\\begin{document}", 1)[1]
+    pages = max(1, -(-body.count("\n") // LINES_PER_PAGE))
+    time.sleep(pages * SECONDS_PER_PAGE)
+    pdf = os.path.join(outdir, jobname + ".pdf")
+    with open(pdf, "wb") as f:
+        f.write(minimal_pdf(range(first, first + pages)))
+    with open(log, "w", encoding="utf-8") as f:
+        f.write("This is stub XeTeX\n" + "! Missing $ inserted.\n" * ERRORS
+                + f"Output written on {pdf} ({pages} pages).\n")
+    return 1 if ERRORS else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
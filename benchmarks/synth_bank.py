@@ -0,0 +1,194 @@
+# benchmarks/synth_bank.py
+"""合成题库：按真实导出表的列（题目类型、试卷类型、难度、年份、题目、选项、解题思路、答案 …）生成任意行数的
+.xlsx，或直接生成转换后的 .json / .jsonl 题目记录。
+
+单元格 HTML 仿照 PracticeQuestions.xlsx：<p class="MsoBodyText"><span style=…> 段落、&nbsp;、单位上标 <sup>、
+随文公式图片（带 width/height）、独立插图、整段图片的选项（不带尺寸）；试卷类型、难度、答案的分布取自真实数据，
+少数题目特别长。图片地址指向本地图片服务器（image_server.py），从 image_pool 张不同的图片中抽取；
+fail_rate 比例的地址指向 404。同一组参数（含 seed）生成的内容完全相同。
+
+.json / .jsonl 输出经与 excel_to_pdf_fixed.py 相同的解析函数得到（图片视为下载失败，不含图片），
+用于单独测 json2pdf.py / json2html.py / 题库等下游步骤。
+
+用法: python benchmarks/synth_bank.py <行数> -o bank.xlsx|bank.json|bank.jsonl [--seed 1] [--image-pool 5000]
+"""
+import os
+import sys
+import random
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from image_server import DEFAULT_PORT
+
+GENERATOR_VERSION = 1   # 生成逻辑变化时递增（bench_pipeline.py 用它命名缓存的题库）
+SHEET = "导出结果"
+COLUMNS = ["题目类型", "试卷类型", "难度", "年份", "题目", "标签", "来源", "简介", "图片", "视频", "选项", "解题思路", "答案"]
+IMAGE_POOL = 5000
+FAIL_RATE = 0.002
+
+# 取自 PracticeQuestions.xlsx 的分布
+PAPER_TYPES = (("Mechanics", 813), ("Geometry", 218), ("Electricity", 115), ("Thermal Physics", 89),
+               ("Matter", 72), ("Radioactivity", 46), ("Ratio and Proportion", 36), ("Waves", 33),
+               ("Algebra", 30), ("Probability", 25))
+DIFFICULTIES = (("适中", 825), ("容易", 444), ("较易", 151), ("较难", 70), ("困难", 7))
+OPTION_COUNTS = ((4, 1000), (5, 160), (6, 87), (7, 33), (8, 4))
+YEARS = list(range(2016, 2025))
+
+SPAN = "<span style=\"font-family: 'PingFang SC', 'Microsoft YaHei', sans-serif; font-size: 16px;\">"
+PARA = '<p class="MsoBodyText">' + SPAN + "%s</span></p>"
+OPTION_PARA = "<p>" + SPAN + "%s</span></p>"
+
+SUBJECTS = ("A tennis ball", "A cyclist", "A uniform rod", "A 2.0 kg trolley", "A charged sphere", "A gas sample",
+            "A wave on a string", "A radioactive source", "A lens", "A spring", "A circuit", "A satellite")
+ACTIONS = ("accelerates uniformly from rest", "strikes the surface at", "is heated at constant pressure to",
+           "is connected across a supply of", "oscillates with an amplitude of", "decays with a half-life of",
+           "moves in a circle of radius", "is compressed by", "travels a distance of", "is released from a height of")
+QUESTIONS = ("What is the magnitude of the average acceleration?", "Which statement is correct?",
+             "What is the final speed?", "How much energy is transferred?", "What is the resistance of the wire?",
+             "What fraction of the nuclei remain?", "Which graph shows the relationship?", "What is the ratio?")
+UNITS = (("m/s", ""), ("m/s", "2"), ("J", ""), ("N", ""), ("Ω", ""), ("m", "3"), ("kg m/s", ""), ("Hz", ""),
+         ("s", "-1"), ("cm", "2"))
+STEPS = ("Stage 1:", "Stage 2:", "Using conservation of energy,", "Resolving vertically,", "Substituting,",
+         "Therefore", "From the graph,", "Total")
+
+
+def _weighted(rng, table):
+    values, weights = zip(*table)
+    return rng.choices(values, weights)[0]
+
+
+class BankSynth:
+    """逐行生成源表单元格；base_url 为图片服务器根地址"""
+
+    def __init__(self, seed=1, base_url=f"http://127.0.0.1:{DEFAULT_PORT}", image_pool=IMAGE_POOL,
+                 fail_rate=FAIL_RATE):
+        self.rng = random.Random(seed)
+        self.base_url = base_url.rstrip("/")
+        self.image_pool = max(1, image_pool)
+        self.fail_rate = fail_rate
+
+    # ---------- 片段 ----------
+    def _number(self):
+        return f"{self.rng.uniform(0.1, 500):.{self.rng.choice((1, 2, 3))}f}"
+
+    def _quantity(self):
+        unit, power = self.rng.choice(UNITS)
+        return self._number() + unit + (f"<sup>{power}</sup>" if power else "")
+
+    def _image(self, inline=True, sized=True):
+        """图片编号决定尺寸（同一地址处处一致）：每 10 张中有 1 张为插图，其余为公式"""
+        k = self.rng.randrange(self.image_pool)
+        if self.rng.random() < self.fail_rate:
+            return f'<img src="{self.base_url}/missing/{k:06d}.png">'
+        shape = random.Random(k)
+        if k % 10 == 0 and not inline:
+            w, h = shape.randint(250, 600), shape.randint(150, 400)
+        else:
+            w, h = shape.randint(20, 250), shape.randint(18, 40)
+        src = f"{self.base_url}/img/{k:06d}-{w}x{h}.png"
+        return f'<img src="{src}" width="{w}" height="{h}">' if sized else f'<img src="{src}">'
+
+    def _sentence(self):
+        s = f"{self.rng.choice(SUBJECTS)} {self.rng.choice(ACTIONS)} {self._quantity()}"
+        if self.rng.random() < 0.3:
+            s += f"&nbsp;over {self._quantity()}"
+        if self.rng.random() < 0.15:
+            s += f" at a {self._image()} angle"
+        return s + ".&nbsp;"
+
+    # ---------- 单元格 ----------
+    def question(self):
+        paras = 2 if self.rng.random() < 0.98 else self.rng.randint(8, 40)   # 少数长题
+        out = [PARA % " ".join(self._sentence() for _ in range(self.rng.randint(1, 3))) for _ in range(paras - 1)]
+        last = self.rng.choice(QUESTIONS)
+        if self.rng.random() < 0.2:
+            last += " " + self._image()
+        out.append(PARA % last)
+        if self.rng.random() < 0.1:
+            out.insert(1, "<p>%s</p>" % self._image(inline=False))
+        return "\n".join(out)
+
+    def options(self, n):
+        letters = [chr(65 + i) for i in range(n)]
+        if self.rng.random() < 0.3:   # 整段图片的选项
+            return "\n".join(f"{c}、<p>{self._image(sized=False)}</p>" for c in letters)
+        return "\n".join(f"{c}、" + OPTION_PARA % self._quantity() for c in letters)
+
+    def explanation(self):
+        if self.rng.random() < 0.4:   # 整段只有一张公式图
+            return "<p>%s</p>" % self._image()
+        parts = [f"{self.rng.choice(STEPS)} {self._image() if self.rng.random() < 0.6 else self._quantity()}."
+                 for _ in range(self.rng.randint(1, 4))]
+        return PARA % " ".join(parts)
+
+    def row(self):
+        n = _weighted(self.rng, OPTION_COUNTS)
+        letters = [chr(65 + i) for i in range(n)]
+        multi = self.rng.random() < 0.01
+        answer = ", ".join(sorted(self.rng.sample(letters, 2))) if multi else self.rng.choice(letters)
+        return {
+            "题目类型": "多选" if multi else "单选",
+            "试卷类型": _weighted(self.rng, PAPER_TYPES),
+            "难度": _weighted(self.rng, DIFFICULTIES),
+            "年份": self.rng.choice(YEARS) if self.rng.random() < 0.6 else None,
+            "题目": self.question(),
+            "标签": None, "来源": None, "简介": None, "图片": None, "视频": None,
+            "选项": self.options(n),
+            "解题思路": self.explanation() if self.rng.random() < 0.9 else None,
+            "答案": answer,
+        }
+
+    def rows(self, n):
+        for _ in range(n):
+            yield self.row()
+
+
+def write_xlsx(path, rows):
+    """openpyxl 只写模式逐行写出（不在内存中保留整张表）"""
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(SHEET)
+    ws.append(COLUMNS)
+    n = 0
+    for n, row in enumerate(rows, start=1):
+        ws.append([row[c] for c in COLUMNS])
+    tmp = f"{path}.{os.getpid()}.tmp"
+    wb.save(tmp)
+    os.replace(tmp, path)
+    return n
+
+
+def write_records(path, rows):
+    """经转换脚本的解析函数得到题目记录（图片视为下载失败），写成 .json / .jsonl"""
+    import pandas as pd
+    from excel_to_pdf_fixed import extract_columns, make_question, parse_table
+    from question_io import write_questions
+
+    df = pd.DataFrame(list(rows), columns=COLUMNS)
+    table = extract_columns(df)
+    parsed = parse_table(table, workers=1)
+    fmt = "jsonl" if path.endswith(".jsonl") else "json"
+    return write_questions((make_question(i, table, p, {}) for i, p in enumerate(parsed)), path, fmt)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic question bank (.xlsx, .json or .jsonl)")
+    parser.add_argument("rows", type=int, help="Number of questions")
+    parser.add_argument("-o", "--output", required=True, help="Output path; the suffix selects the format")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed (same seed = same bank)")
+    parser.add_argument("--base-url", default=f"http://127.0.0.1:{DEFAULT_PORT}",
+                        help="Root URL of the image server (see image_server.py)")
+    parser.add_argument("--image-pool", type=int, default=IMAGE_POOL, help="Number of distinct images referenced")
+    parser.add_argument("--fail-rate", type=float, default=FAIL_RATE, help="Fraction of image links that return 404")
+    args = parser.parse_args()
+
+    synth = BankSynth(args.seed, args.base_url, args.image_pool, args.fail_rate)
+    writer = write_xlsx if args.output.lower().endswith(".xlsx") else write_records
+    n = writer(args.output, synth.rows(args.rows))
+    print(f"[DONE] {n} 道题 → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
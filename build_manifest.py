@@ -0,0 +1,76 @@
+# build_manifest.py
+"""构建清单：记录每个产物（.tex / 分片 PDF / 合并 PDF）的输入摘要，输入未变化时直接复用已有产物。
+
+图片等输入文件按 (大小, mtime) 缓存其 sha256，未改动的文件不必每次重新读取。
+"""
+import os
+import json
+import hashlib
+import threading
+
+MANIFEST_NAME = ".build_manifest.json"
+
+
+class BuildManifest:
+    """线程安全；entries 为 {产物名: {"digest": 输入摘要, ...}}，files 为输入文件摘要缓存"""
+
+    def __init__(self, root):
+        self.root = str(root)
+        self.path = os.path.join(self.root, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        self.entries, self.files = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data.get("entries", {}), data.get("files", {})
+        except (OSError, ValueError):
+            return {}, {}
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with self._lock:
+            payload = {"version": 1, "entries": self.entries, "files": self.files}
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+
+    def file_digest(self, path):
+        """文件内容的 sha256；文件不存在时返回 None"""
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            cached = self.files.get(path)
+        if cached and cached["size"] == st.st_size and cached["mtime_ns"] == st.st_mtime_ns:
+            return cached["sha256"]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        with self._lock:
+            self.files[path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+        return digest
+
+    def get(self, name):
+        with self._lock:
+            return self.entries.get(name)
+
+    def up_to_date(self, name, digest, outputs=()):
+        """name 上次构建的输入摘要与 digest 相同，且产物文件都还在"""
+        entry = self.get(name)
+        return (entry is not None and entry.get("digest") == digest
+                and all(os.path.exists(p) for p in outputs))
+
+    def record(self, name, digest, **extra):
+        with self._lock:
+            self.entries[name] = dict(extra, digest=digest)
+
+    def forget(self, name):
+        with self._lock:
+            self.entries.pop(name, None)
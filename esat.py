@@ -0,0 +1,97 @@
+# esat.py
+"""统一命令行入口：python esat.py <子命令> [参数]
+
+  ingest       Excel 题库 → questions.json / .jsonl 与 .tex（即 excel_to_pdf_fixed.py）
+  render-tex   JSON / JSONL / SQLite 题库 → LaTeX，不编译（即 json2pdf.py --no-compile）
+  render-html  JSON / JSONL / SQLite 题库 → 分页 HTML（即 json2html.py）
+  compile      用 XeLaTeX 编译已生成的 .tex；可分片并发，构建清单未变化时复用上次的 PDF
+  watch        常驻进程监视 .xlsx / .json 输入，保存后只重建受影响的部分（即 watch.py）
+  mock         模拟卷与答案卷（即 mock_papers.py）
+
+子命令的模块在选中后才导入，各模块又只在用到时才导入 pandas / requests / numpy / bs4 / Pillow / pypdf，
+所以 --help 与只渲染 JSON 的命令启动很快（benchmarks/bench_import.py 检查导入耗时）。
+原来的各脚本照常可用，参数与对应子命令相同；其中的函数也可以直接 import 使用。
+"""
+import sys
+import argparse
+import importlib
+
+# 子命令 -> (模块, 说明)；compile 由本文件实现
+COMMANDS = {
+    "ingest": ("excel_to_pdf_fixed", "Convert Excel question banks to JSON and LaTeX"),
+    "render-tex": ("json2pdf", "Render JSON/JSONL/SQLite questions to LaTeX (no compile)"),
+    "render-html": ("json2html", "Render JSON/JSONL/SQLite questions to paginated HTML"),
+    "compile": (None, "Compile generated .tex files with XeLaTeX (optionally sharded)"),
+    "watch": ("watch", "Rebuild the outputs whenever the input workbook or JSON is saved"),
+    "mock": ("mock_papers", "Generate mock papers and answer keys"),
+}
+
+
+def split_points(tex_path):
+    """分片编译的切分点：(题目起始行, 分组标题)；按生成该 .tex 的脚本选择"""
+    with open(tex_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    # excel_to_pdf_fixed.py 每题以 \subsection*{ 开头、按 \section*{ 分组；json2pdf.py 每题以 \noindent 行开头
+    if "\\subsection*{" in text:
+        from excel_to_pdf_fixed import TEX_GROUP_RE, TEX_QUESTION_RE
+        return TEX_QUESTION_RE, TEX_GROUP_RE
+    from json2pdf import QUESTION_START_RE
+    return QUESTION_START_RE, None
+
+
+def compile_main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description=COMMANDS["compile"][1])
+    parser.add_argument("tex", nargs="+", help=".tex files to compile (PDFs are written next to them)")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="Split each document into N shards, compile them concurrently and merge the PDFs")
+    parser.add_argument("-w", "--workers", type=int, default=0, help="Concurrent xelatex runs per document (0 = CPU count)")
+    parser.add_argument("--force", action="store_true", help="Ignore the build manifest and recompile everything")
+    args = parser.parse_args(argv)
+
+    from pathlib import Path
+    from build_manifest import BuildManifest
+    from json2pdf import compile_latex
+    from tex_shards import compile_sharded
+
+    failed = 0
+    for tex in map(Path, args.tex):
+        if not tex.is_file():
+            print(f"[FAIL] {tex} not found")
+            failed += 1
+            continue
+        # 清单与 json2pdf.py 相同，放在 .tex 所在目录
+        manifest = None if args.force else BuildManifest(tex.parent)
+        if args.shards > 1:
+            question_re, group_re = split_points(tex)
+            ok = compile_sharded(tex, args.shards, question_re, group_re, workers=args.workers or None,
+                                 manifest=manifest) is not None
+        else:
+            ok = compile_latex(tex, manifest) != "failed"
+        failed += not ok
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parser = argparse.ArgumentParser(
+        prog="esat.py", description="ESAT question bank toolchain",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="commands:\n" + "\n".join(f"  {name:<13}{desc}" for name, (_, desc) in COMMANDS.items())
+               + "\n\nRun 'esat.py <command> -h' for the options of a command.")
+    parser.add_argument("command", choices=COMMANDS, metavar="command", help="One of the commands below")
+    if not argv or argv[0] not in COMMANDS:
+        parser.parse_args(argv[:1])   # -h 打印帮助；缺少或未知的子命令报错退出
+        parser.error(f"unrecognized arguments: {' '.join(argv)}")
+
+    command, rest = argv[0], argv[1:]
+    prog = f"esat.py {command}"
+    if command == "compile":
+        return compile_main(rest, prog)
+    module = importlib.import_module(COMMANDS[command][0])
+    if command == "render-tex":
+        rest.append("--no-compile")
+    return module.main(rest, prog=prog)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
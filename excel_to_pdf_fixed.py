@@ -1,226 +1,919 @@
 # excel_to_pdf_fixed.py
+import io
 import os
 import re
 import json
+import shutil
 import subprocess
-import pandas as pd
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse, unquote
+import hashlib
+import argparse
+import tempfile
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from html_text import clean_html_to_text, img_sizes
+from tex_escape import latex_escape
+from image_fetcher import DEFAULT_WORKERS, ImageFetcher, make_session, unique_srcs
+from image_cache import ImageCache
+from image_prep import PREP_DIR_NAME, new_stats as new_prep_stats, open_prep, parse_px, tally
+from image_refs import collect_images, legacy_refs, resolve, tex_graphic, unplaced
+from question_io import FORMATS, QuestionWriter, iter_questions, record_key
+from tex_shards import LATEX_ENGINE, compile_sharded, latex_output, report_errors
+from tex_format import run_latex
+from build_manifest import BuildManifest
+from xlsx_snapshot import load_snapshot, read_workbooks, save_snapshot
+from question_store import STORE_NAME, build_store
+from question_dedup import NEAR_DUP_THRESHOLD, IdAssigner, exact_key, find_duplicates, image_keys
+from metrics import Metrics, add_profile_argument
 
 # ========== 配置 ==========
 INPUT_XLSX = r"D:\Downloads\PracticeQuestions.xlsx"  # 改成你的路径
 SHEET_NAME = "导出结果"   # 若失败脚本会回退到第一个 sheet
 OUT_DIR = r"D:\Downloads\output"  # 改成你想要的输出目录
-IMG_DIR = os.path.join(OUT_DIR, "images")
-JSON_FILE = os.path.join(OUT_DIR, "questions.json")
-TEX_PRACTICE = os.path.join(OUT_DIR, "questions_practice.tex")
-TEX_ANS = os.path.join(OUT_DIR, "questions_answers.tex")
-os.makedirs(OUT_DIR, exist_ok=True)
-os.makedirs(IMG_DIR, exist_ok=True)
+IMG_CACHE_MAX_MB = 512     # 图片缓存上限（MB），超出后按最近最少使用淘汰
+IMG_CACHE_MAX_AGE = 24 * 3600  # 该时间（秒）内抓取过的图片不再请求；过期后发条件 GET
+ROW_CACHE_NAME = ".questions_rows.json"  # 增量模式使用的行指纹缓存（位于输出目录）
+DEDUP_REPORT_NAME = "duplicates.json"  # 去重时被删去的题目及其保留项（位于输出目录）
+PARSER_VERSION = 5  # 解析逻辑变化时递增，使旧的行缓存全部失效
+PARSE_CHUNK_ROWS = 64  # 多进程解析时每个任务包含的行数
+PIPELINE_QUEUE_ROWS = 256  # 流水线相邻阶段之间最多积压的行数（限制内存，见 RowPipeline）
+TEX_QUESTION_RE = re.compile(r"\\subsection\*\{")  # 分片编译时的切分点：每道题的起始行
+TEX_GROUP_RE = re.compile(r"\\section\*\{")        # paper_type 分组标题，优先在此处切分
+
+# 参与行指纹计算的源单元格
+FINGERPRINT_COLUMNS = ("题目", "question", "选项", "解题思路", "答案", "题目类型", "试卷类型", "难度", "年份")
 
 # ========== 工具函数 ==========
-def clean_html_to_text(html):
-    """把 HTML 字段转成纯文本，保留 <img> 的 src 列表"""
-    if pd.isna(html) or html is None:
-        return "", []
-    soup = BeautifulSoup(html, "lxml")
-    imgs = []
-    for img in soup.find_all("img"):
-        src = img.get("src")
-        if src:
-            imgs.append(src)
-        # 用占位符替代 img 元素，便于后续替换
-        img.replace_with(f"[IMAGE:{len(imgs)-1}]")
-    text = soup.get_text(separator="\n", strip=True)
-    return text, imgs
-
-def download_img(src, dst_dir, idx_prefix="img"):
-    """下载图片 src（支持 http(s) 与 data URI），返回本地路径或 None"""
-    if not src:
-        return None
-    # data URI
-    if src.startswith("data:"):
-        try:
-            header, b64 = src.split(",", 1)
-            ext = "png"
-            m = re.search(r"data:(image/[^;]+);base64", header)
+def parse_options(opt_text):
+    """把选项文本解析为 {字母: 内容}（稳健版）"""
+    options = {}
+    if not opt_text:
+        return options
+    # 方法1：按块匹配 A) / A. / A、 ... 到下一个字母或文本结尾
+    pattern = re.compile(r'([A-F])[、\.\)]\s*(.*?)(?=(?:\n+[A-F][、\.\)]|\Z))', re.S | re.M)
+    matches = pattern.findall(opt_text)
+    if matches:
+        for k, v in matches:
+            options[k.strip()] = v.strip()
+    else:
+        # 方法2：按行匹配
+        lines = [line.strip() for line in opt_text.splitlines() if line.strip()]
+        for line in lines:
+            m = re.match(r'^([A-F])[、\.\)]\s*(.*)$', line)
             if m:
-                ext = m.group(1).split("/")[1]
-            filename = f"{idx_prefix}_{len(os.listdir(dst_dir))+1}.{ext}"
-            path = os.path.join(dst_dir, filename)
-            import base64
-            with open(path, "wb") as f:
-                f.write(base64.b64decode(b64))
-            return path
-        except Exception:
-            return None
-    # http/https
-    try:
-        resp = requests.get(src, timeout=15)
-        resp.raise_for_status()
-        up = urlparse(src)
-        fn = os.path.basename(unquote(up.path)) or f"{idx_prefix}_{len(os.listdir(dst_dir))+1}.png"
-        fn = re.sub(r"[^0-9A-Za-z._-]", "_", fn)
-        path = os.path.join(dst_dir, fn)
-        with open(path, "wb") as f:
-            f.write(resp.content)
-        return path
-    except Exception:
-        return None
-
-def latex_escape(s):
-    """对常见 LaTeX 特殊字符做转义，保留换行处理"""
-    if not s:
-        return ""
-    replacements = {
-        '\\': r'\textbackslash{}',
-        '&': r'\&', '%': r'\%', '$': r'\$',
-        '#': r'\#', '_': r'\_', '{': r'\{', '}': r'\}',
-        '~': r'\textasciitilde{}', '^': r'\^{}'
-    }
-    for k, v in replacements.items():
-        s = s.replace(k, v)
-    s = s.replace("\r\n", "\n").replace("\r", "\n")
-    s = s.replace("\n\n", "\n\\medskip\n")
-    s = s.replace("\n", "\\\\\n")
-    return s
-
-# ========== 读取 Excel ==========
-def read_excel_safe(path, sheet_name):
-    try:
-        df = pd.read_excel(path, sheet_name=sheet_name)
-        return df
-    except Exception as e:
-        print(f"[WARN] 无法按 sheet 名 `{sheet_name}` 读取：{e}，尝试读取第一个 sheet。")
-        try:
-            df = pd.read_excel(path, sheet_name=0)
-            return df
-        except Exception as e2:
-            raise RuntimeError(f"读取 Excel 失败：{e2}")
+                options[m.group(1)] = m.group(2).strip()
+        # 方法3：回退 — 如果仍为空且行数合理，按行序号分配 A,B,C...
+        if not options and 0 < len(lines) <= 8:
+            for i, line in enumerate(lines):
+                options[chr(65 + i)] = line
+    return options
 
-print("开始读取 Excel...")
-df = read_excel_safe(INPUT_XLSX, SHEET_NAME)
-print(f"读取表 {SHEET_NAME if SHEET_NAME in df.keys() else '第一个 sheet'}，共 {len(df)} 行")
+# ========== 列式抽取 ==========
+# 中间表字段 -> 源列名（按优先顺序）；缺列时整列取空字符串
+SOURCE_COLUMNS = {
+    "type": ("题目类型",),
+    "paper_type": ("试卷类型",),
+    "difficulty": ("难度",),
+    "year": ("年份",),
+    "question_raw": ("题目", "question"),
+    "options_raw": ("选项",),
+    "answer": ("答案",),
+    "explanation_raw": ("解题思路",),
+}
 
-questions = []
-for idx, row in df.iterrows():
+# 读取 Excel 时只保留这些列（也是列式快照中保存的列）
+NEEDED_COLUMNS = sorted({n for names in SOURCE_COLUMNS.values() for n in names} | set(FINGERPRINT_COLUMNS))
+
+def _source_column(df, names):
+    for name in names:
+        if name in df.columns:
+            return df[name]
+    return None
+
+def extract_columns(df):
+    """把 DataFrame 转成列式中间表 {字段: list}，每个单元格只读取一次"""
+    n = len(df)
+    table = {}
+    for field, names in SOURCE_COLUMNS.items():
+        col = _source_column(df, names)
+        if col is None:
+            table[field] = [""] * n
+        elif field == "answer":
+            # 答案统一为去掉首尾空白的字符串，缺失视为空
+            table[field] = col.fillna("").astype(str).str.strip().tolist()
+        else:
+            table[field] = col.tolist()
+    # 题干只对非空单元格做 HTML 清洗（向量化 isna）
+    q_col = _source_column(df, SOURCE_COLUMNS["question_raw"])
+    table["question_notna"] = q_col.notna().tolist() if q_col is not None else [False] * n
+    return table
+
+def _field_images(imgs, sizes):
+    """[(src, (宽, 高))]，尺寸为 HTML width/height 属性换算的 CSS px"""
+    return [(src, (parse_px(w), parse_px(h))) for src, (w, h) in zip(imgs, sizes)]
+
+def clean_cells(q_raw, q_notna, opts_raw, expl_raw):
+    """清洗一行的三个 HTML 单元格：返回 (题干文本, 选项文本, 解析文本, {字段: [(图片 src, HTML 尺寸)]})"""
     # 解析题目 HTML -> 文本 + 图片 list
-    q_raw = row.get("题目", "") if "题目" in row else row.get("question", "")
-    q_text, q_imgs = clean_html_to_text(q_raw)
+    q_text, q_imgs, q_sizes = clean_html_to_text(q_raw, with_sizes=True) if q_notna else ("", [], [])
 
     # 解析选项字段（可能是 HTML 或纯文本）
-    opts_raw = row.get("选项", "")
-    opt_text, opt_imgs = ("", [])
+    opt_text, opt_imgs, opt_sizes = ("", [], [])
     if isinstance(opts_raw, str):
-        opt_text, opt_imgs = clean_html_to_text(opts_raw)
+        opt_text, opt_imgs, opt_sizes = clean_html_to_text(opts_raw, with_sizes=True)
 
-    # --- 选项解析（稳健版） ---
-    options = {}
-    if opt_text:
-        # 方法1：按块匹配 A) / A. / A、 ... 到下一个字母或文本结尾
-        pattern = re.compile(r'([A-F])[、\.\)]\s*(.*?)(?=(?:\n+[A-F][、\.\)]|\Z))', re.S | re.M)
-        matches = pattern.findall(opt_text)
-        if matches:
-            for k, v in matches:
-                options[k.strip()] = v.strip()
-        else:
-            # 方法2：按行匹配
-            lines = [line.strip() for line in opt_text.splitlines() if line.strip()]
-            for line in lines:
-                m = re.match(r'^([A-F])[、\.\)]\s*(.*)$', line)
-                if m:
-                    options[m.group(1)] = m.group(2).strip()
-            # 方法3：回退 — 如果仍为空且行数合理，按行序号分配 A,B,C...
-            if not options and 0 < len(lines) <= 8:
-                for i, line in enumerate(lines):
-                    options[chr(65 + i)] = line
-
-    # 合并图片来源（题干+选项）
-    imgs = (q_imgs or []) + (opt_imgs or [])
-    local_imgs = []
-    for s in imgs:
-        p = download_img(s, IMG_DIR)
-        if p:
-            local_imgs.append(p)
-
-    questions.append({
+    expl_text, expl_imgs, expl_sizes = ("", [], [])
+    if isinstance(expl_raw, str):
+        expl_text, expl_imgs, expl_sizes = clean_html_to_text(expl_raw, with_sizes=True)
+
+    field_imgs = {
+        "question": _field_images(q_imgs, q_sizes),
+        "options": _field_images(opt_imgs, opt_sizes),
+        "explanation": _field_images(expl_imgs, expl_sizes),
+    }
+    return q_text, opt_text, expl_text, field_imgs
+
+def parse_cells(q_raw, q_notna, opts_raw, expl_raw):
+    """解析一行的三个 HTML 单元格：返回 (题干文本, 选项 dict, 解析文本, {字段: [(图片 src, HTML 尺寸)]})
+
+    各字段文本中的 [IMAGE:n] 按字段各自从 0 编号，与该字段的图片列表一一对应。
+    """
+    q_text, opt_text, expl_text, field_imgs = clean_cells(q_raw, q_notna, opts_raw, expl_raw)
+    return q_text, parse_options(opt_text), expl_text, field_imgs
+
+def _parse_chunk(rows):
+    """子进程入口：解析一批 (题干, 题干非空, 选项, 解析) 行。
+
+    返回 (结果列表, 计时)；计时为 {"html_parse" / "option_parse": [墙钟秒, CPU 秒]}，在子进程内累计。
+    """
+    out = []
+    html_wall = html_cpu = opt_wall = opt_cpu = 0.0
+    for r in rows:
+        t0, c0 = time.perf_counter(), time.process_time()
+        q_text, opt_text, expl_text, field_imgs = clean_cells(*r)
+        t1, c1 = time.perf_counter(), time.process_time()
+        options = parse_options(opt_text)
+        html_wall += t1 - t0
+        html_cpu += c1 - c0
+        opt_wall += time.perf_counter() - t1
+        opt_cpu += time.process_time() - c1
+        out.append((q_text, options, expl_text, field_imgs))
+    return out, {"html_parse": [html_wall, html_cpu], "option_parse": [opt_wall, opt_cpu]}
+
+def parse_table(table, workers=1, chunk_rows=PARSE_CHUNK_ROWS, metrics=None):
+    """逐行解析中间表，返回与行一一对应的解析结果列表。
+
+    workers > 1 时按块分发到进程池；pool.map 按提交顺序返回，结果与串行路径完全一致。
+    进程池不可用（如受限环境）时回退为串行解析。
+    metrics 不为 None 时记录 html_parse / option_parse 两个阶段（各进程耗时之和）。
+    """
+    rows = list(zip(table["question_raw"], table["question_notna"],
+                    table["options_raw"], table["explanation_raw"]))
+    if workers <= 1 or len(rows) <= chunk_rows:
+        parts = [_parse_chunk(rows)]
+    else:
+        chunks = [rows[i:i + chunk_rows] for i in range(0, len(rows), chunk_rows)]
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parts = list(pool.map(_parse_chunk, chunks))
+        except (OSError, BrokenProcessPool) as e:
+            print(f"[WARN] 多进程解析不可用（{e}），回退为串行解析。")
+            parts = [_parse_chunk(rows)]
+    if metrics is not None:
+        for name in ("html_parse", "option_parse"):
+            metrics.record(name, wall_s=sum(t[name][0] for _, t in parts),
+                           cpu_s=sum(t[name][1] for _, t in parts), items=len(rows))
+    return [r for part, _ in parts for r in part]
+
+def make_question(idx, table, parsed, img_map):
+    """按固定字段顺序组装最终题目记录；img_map 为 {src: (本地路径, 像素尺寸)}"""
+    q_text, options, explanation, field_imgs = parsed
+    images, image_sizes, image_refs = collect_images(field_imgs, img_map)
+    return {
         "id": f"Q{idx+1:04d}",
-        "type": row.get("题目类型", ""),
-        "paper_type": row.get("试卷类型", ""),
-        "difficulty": row.get("难度", ""),
-        "year": row.get("年份", ""),
-        "question_raw": q_raw,
+        "type": table["type"][idx],
+        "paper_type": table["paper_type"][idx],
+        "difficulty": table["difficulty"][idx],
+        "year": table["year"][idx],
+        "question_raw": table["question_raw"][idx],
         "question": q_text,
         "options": options,
-        "answer": str(row.get("答案", "")).strip(),
-        "explanation_raw": row.get("解题思路", ""),
-        "explanation": (clean_html_to_text(row.get("解题思路", ""))[0] if isinstance(row.get("解题思路", ""), str) else ""),
-        "images": local_imgs
-    })
-
-# 保存标准 JSON
-with open(JSON_FILE, "w", encoding="utf-8") as f:
-    json.dump(questions, f, ensure_ascii=False, indent=2)
-print(f"[DONE] 已写出标准 JSON: {JSON_FILE} （共 {len(questions)} 道题）")
-
-# ========== 生成 LaTeX（练习册 + 答案册） ==========
-def build_tex(questions, tex_path, include_answers=False):
-    with open(tex_path, "w", encoding="utf-8") as f:
-        f.write(r"""\documentclass[12pt]{article}
+        "answer": table["answer"][idx],
+        "explanation_raw": table["explanation_raw"][idx],
+        "explanation": explanation,
+        "images": images,
+        "image_sizes": image_sizes,
+        "image_refs": image_refs,
+    }
+
+# ========== 增量模式：行指纹缓存 ==========
+def row_fingerprints(df):
+    """对每行的源单元格计算 sha256 指纹（NaN 统一视为空）"""
+    n = len(df)
+    cols = []
+    for name in FINGERPRINT_COLUMNS:
+        if name in df.columns:
+            isna = df[name].isna().tolist()
+            cols.append([None if na else str(v) for v, na in zip(df[name].tolist(), isna)])
+        else:
+            cols.append([None] * n)
+    out = []
+    for cells in zip(*cols):
+        payload = json.dumps([PARSER_VERSION, *cells], ensure_ascii=False)
+        out.append(hashlib.sha256(payload.encode("utf-8")).hexdigest())
+    return out
+
+def load_row_cache(path):
+    """读取上一次运行留下的 {指纹: 记录} 与按行顺序的指纹列表"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return [], {}
+    if data.get("parser_version") != PARSER_VERSION:
+        return [], {}
+    return data.get("rows", []), data.get("records", {})
+
+def save_row_cache(path, fingerprints, questions, record_fps=None):
+    """逐条写出行缓存（questions 可为流式迭代器），格式与 json.load 兼容。
+
+    record_fps 为 questions 各条对应的行指纹（去重后少于全部行时传入），默认与 fingerprints 相同。
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"parser_version": %d, "rows": %s, "records": {' % (PARSER_VERSION, json.dumps(fingerprints)))
+        for i, (fp, q) in enumerate(zip(record_fps or fingerprints, questions)):
+            # id 与来源由本次运行决定（相同内容可能出现在别的工作簿），不进缓存
+            rec = {k: v for k, v in q.items() if k not in ("id", "source")}
+            f.write((", " if i else "") + json.dumps(fp) + ": " + json.dumps(rec, ensure_ascii=False))
+        f.write("}}")
+
+def reusable(rec):
+    """旧记录能否直接复用：引用的图片都还在，且上次没有下载失败的图片。
+
+    HTML 中每个图片地址在 image_refs 中占一项，下载失败的记为 None（应有的图片多于已下载的）；
+    这样的行每次运行都重新处理，图床恢复后即可补上。
+    """
+    if not all(os.path.exists(p) for p in rec.get("images", [])):
+        return False
+    return all(i is not None for row in (rec.get("image_refs") or {}).values() for i in row)
+
+def diff_counts(prev_rows, fingerprints, reused):
+    """统计新增/修改/删除行数：同位置的旧行消失即视为修改，其余新指纹为新增"""
+    current = set(fingerprints)
+    known = set(prev_rows)
+    gone = {fp for fp in prev_rows if fp not in current}
+    changed = added = 0
+    for i, fp in enumerate(fingerprints):
+        # 未改动但需重新解析的行（图片被清理或下载失败、上次作为重复项被删去）不计入
+        if i in reused or fp in known:
+            continue
+        if i < len(prev_rows) and prev_rows[i] in gone:
+            changed += 1
+        else:
+            added += 1
+    return added, changed, max(len(gone) - changed, 0)
+
+# ========== 多工作簿合并与去重 ==========
+def load_tables(inputs, sheet_name, out_dir, manifest, metrics=None):
+    """读取各工作簿（快照未命中的在进程池中并行解析），按输入顺序拼接为一张中间表；
+    返回 (中间表, 行指纹, 各行来源文件名)"""
+    # 快照未命中时解析 xlsx 最慢；各工作簿互不依赖，一起交给 read_workbooks，快照由本进程写出
+    unique = list(dict.fromkeys(inputs))
+    loaded = {path: load_snapshot(path, sheet_name, out_dir, manifest, NEEDED_COLUMNS) for path in unique}
+    misses = [path for path in unique if loaded[path] is None]
+    for path, (df, sheet) in zip(misses, read_workbooks(misses, sheet_name, NEEDED_COLUMNS)):
+        save_snapshot(path, sheet_name, out_dir, manifest, NEEDED_COLUMNS, df, sheet)
+        loaded[path] = df, sheet
+
+    def load(path):
+        (df, sheet), hit = loaded[path], path not in misses
+        print(f"读取 {os.path.basename(path)} 表 {sheet}，共 {len(df)} 行{'（快照）' if hit else ''}")
+        if metrics is not None:
+            metrics.record("excel_read", items=len(df), bytes=os.path.getsize(path),
+                           cache_hits=int(hit), cache_misses=int(not hit))
+        return extract_columns(df), row_fingerprints(df), len(df)
+
+    parts = [load(path) for path in inputs]
+    table = {k: [v for t, _, _ in parts for v in t[k]] for k in parts[0][0]}
+    fingerprints = [fp for _, fps, _ in parts for fp in fps]
+    sources = [os.path.basename(path) for path, (_, _, n) in zip(inputs, parts) for _ in range(n)]
+    return table, fingerprints, sources
+
+def dedup_item(table, idx, q_text, options):
+    """去重时比较的 (题干, 选项, 答案, 图片地址)"""
+    imgs = image_keys(table["question_raw"][idx], table["options_raw"][idx])
+    return q_text, options, table["answer"][idx], imgs
+
+def dedup_rows(table, parsed, reused, near):
+    """按规范化的题干 + 选项 + 答案（+ 图片地址）去重；返回 (各行 exact_key, {重复行: (保留行, 类型, 相似度)})"""
+    items = []
+    for idx in range(len(table["answer"])):
+        if idx in reused:
+            q_text, options = reused[idx]["question"], reused[idx]["options"]
+        else:
+            q_text, options = parsed[idx][0], parsed[idx][1]
+        items.append(dedup_item(table, idx, q_text, options))
+    return find_duplicates(items, near)
+
+def write_dedup_report(path, dup_of, ids, sources):
+    """把被删去的重复题目写成 {保留题 id: [{source, row, match, similarity}]}；row 为该工作簿内的行号（从 0 起）"""
+    first_row = {}
+    for i, name in enumerate(sources):
+        first_row.setdefault(name, i)
+    report = {}
+    for i in sorted(dup_of):
+        j, kind, sim = dup_of[i]
+        report.setdefault(ids[j], []).append(
+            {"source": sources[i], "row": i - first_row[sources[i]], "match": kind, "similarity": sim})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+# ========== 流水线：解析 → 去重/编号 → 图片下载与预处理 → 组装记录 ==========
+def display_widths(table, rows):
+    """预先扫描各行 HTML 中 <img> 的 width（CSS px），供图片预处理限制分辨率。
+
+    同一图片多处引用时取最大显示宽度；任一处没有宽度则为 None（不按显示宽度缩小）。
+    图片在所在行解析完成前就可能开始处理，所以直接从源单元格取，而不是等解析结果。
+    """
+    widths = {}
+    for idx in rows:
+        for field in ("question_raw", "options_raw", "explanation_raw"):
+            for src, w, _ in img_sizes(table[field][idx]):
+                w = parse_px(w)
+                prev = widths.get(src, 0)
+                widths[src] = None if prev is None or w is None else max(prev, w)
+    return widths
+
+class ImageStage:
+    """图片阶段：每个 src 先由 ImageFetcher 下载，完成后立即在预处理线程池中处理（Pillow 编解码时释放 GIL）。
+
+    get(src) 返回 Future，结果为 (本地路径, 像素尺寸或 None)，下载失败时为 None；同一 src 只处理一次。
+    prep 为 None（--no-image-prep 或未安装 Pillow）时直接使用下载的原图。
+    """
+
+    def __init__(self, fetcher, prep=None, widths=None, workers=1):
+        self.fetcher = fetcher
+        self.prep = prep
+        self.widths = widths or {}
+        self.pool = ThreadPoolExecutor(max_workers=max(1, workers)) if prep is not None else None
+        self.stats = new_prep_stats()
+        self.prep_s = 0.0   # 各线程预处理耗时之和
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def get(self, src):
+        fut = self._futures.get(src)
+        if fut is None:
+            fut = self._futures[src] = Future()
+            self.fetcher.submit(src).add_done_callback(lambda f: self._fetched(src, f, fut))
+        return fut
+
+    def _fetched(self, src, fetched, out):
+        # 在下载线程中回调；任何异常都要交给 out，否则等待它的行会一直阻塞
+        try:
+            path = fetched.result()[1]
+            if path is None:
+                out.set_result(None)
+            elif self.pool is None:
+                out.set_result((path, None))
+            else:
+                self.pool.submit(self._prepare, src, path, out)
+        except BaseException as e:
+            out.set_exception(e)
+
+    def _prepare(self, src, path, out):
+        t0 = time.perf_counter()
+        try:
+            result, entry, cached = self.prep.prepare_one(path, self.widths.get(src))
+        except BaseException as e:
+            out.set_exception(e)
+            return
+        with self._lock:
+            tally(self.stats, entry, cached)
+            self.prep_s += time.perf_counter() - t0
+        out.set_result(result)
+
+    def close(self, keep=()):
+        """等待下载与预处理结束，保存图片缓存与预处理索引；keep 为输出引用的图片路径，不从缓存中淘汰"""
+        self.fetcher.close(keep)
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.prep.save()
+
+def _make_parse_pool(workers):
+    """解析阶段的执行器：workers > 1 时为进程池，否则（或进程池不可用时）为一个后台线程"""
+    if workers > 1:
+        pool = None
+        try:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            pool.submit(int).result()
+            return pool
+        except (OSError, BrokenProcessPool) as e:
+            print(f"[WARN] 多进程解析不可用（{e}），回退为串行解析。")
+            if pool is not None:
+                pool.shutdown(wait=False)
+    return ThreadPoolExecutor(max_workers=1)
+
+class RowPipeline:
+    """按行流水线：run() 按行序逐条产出题目记录，各阶段同时进行。
+
+    - 解析：每 PARSE_CHUNK_ROWS 行一个任务提交到进程池（-w 1 时为一个后台线程）；
+    - 去重与编号：按行序取回解析结果，exact 去重与内容 id 都是流式的；保留的行随即为其图片调用 ImageStage.get；
+    - 组装：按行序等待该行的图片，组装记录交给调用方写出。
+    相邻阶段之间是按提交顺序排列的有界队列（各 queue_rows 行）：下游跟不上时上游暂停（背压），
+    内存占用与题库大小无关；各队列都按行序取出，输出与逐步串行处理完全一致。
+    --dedup near 需要全部题目两两比较，此时先解析全部行再去重（这一步的内存随题库增长），之后同样流式处理。
+
+    运行结束后 keep 为保留的行号，ids 为 {行号: 题目 id}，dup_of 为 {重复行: (保留行, 类型, 相似度)}。
+    """
+
+    def __init__(self, table, sources, reused, images, parse_workers=1, queue_rows=PIPELINE_QUEUE_ROWS,
+                 id_scheme="row", dedup="off", near_threshold=NEAR_DUP_THRESHOLD, batch=False, metrics=None):
+        self.table = table
+        self.sources = sources
+        self.reused = reused
+        self.images = images
+        self.parse_workers = parse_workers
+        self.queue_rows = max(1, queue_rows)
+        self.id_scheme = id_scheme
+        self.dedup = dedup
+        self.near_threshold = near_threshold
+        self.batch = batch
+        self.metrics = metrics or Metrics("excel_to_pdf_fixed")
+        self.keep = []
+        self.ids = {}
+        self.dup_of = {}
+        self.wait_s = {"parse": 0.0, "images": 0.0}   # 主线程等待上游的时间
+        self._first = {}
+        self._assign = IdAssigner()
+        self._keys = None
+
+    def run(self):
+        n = len(self.table["answer"])
+        pre = None
+        if self.dedup == "near":
+            # 近似去重需要全部题目：先解析全部行并去重（屏障），流水线中直接取用这些结果
+            todo = [i for i in range(n) if i not in self.reused]
+            sub = {k: [v[i] for i in todo] for k, v in self.table.items()} if self.reused else self.table
+            with self.metrics.stage("parse", items=len(todo)):
+                pre = dict(zip(todo, parse_table(sub, self.parse_workers, metrics=self.metrics)))
+            with self.metrics.stage("dedup", items=n):
+                self._keys, self.dup_of = dedup_rows(self.table, pre, self.reused, self.near_threshold)
+
+        pool = _make_parse_pool(self.parse_workers) if pre is None else None
+        parse_q, image_q = deque(), deque()
+        max_chunks = max(2, -(-self.queue_rows // PARSE_CHUNK_ROWS))
+        try:
+            for start in range(0, n, PARSE_CHUNK_ROWS):
+                rows = range(start, min(n, start + PARSE_CHUNK_ROWS))
+                parse_q.append((rows, self._submit_parse(pool, rows, pre)))
+                if len(parse_q) >= max_chunks:
+                    self._sequence(*parse_q.popleft(), image_q)
+                while len(image_q) > self.queue_rows:
+                    yield self._emit(image_q.popleft())
+            while parse_q:
+                self._sequence(*parse_q.popleft(), image_q)
+                while len(image_q) > self.queue_rows:
+                    yield self._emit(image_q.popleft())
+            while image_q:
+                yield self._emit(image_q.popleft())
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+    def _submit_parse(self, pool, rows, pre):
+        todo = [i for i in rows if i not in self.reused]
+        if pre is not None or not todo:
+            fut = Future()
+            fut.set_result(([pre[i] for i in todo] if pre else [], None))
+            return fut
+        t = self.table
+        return pool.submit(_parse_chunk, [(t["question_raw"][i], t["question_notna"][i], t["options_raw"][i],
+                                           t["explanation_raw"][i]) for i in todo])
+
+    def _sequence(self, rows, fut, image_q):
+        """按行序处理一块解析结果：去重、分配 id，为保留的行提交图片"""
+        t0 = time.perf_counter()
+        results, timings = fut.result()
+        self.wait_s["parse"] += time.perf_counter() - t0
+        if timings is not None:
+            for name in ("html_parse", "option_parse"):
+                self.metrics.record(name, wall_s=timings[name][0], cpu_s=timings[name][1], items=len(results))
+        results = iter(results)
+        for idx in rows:
+            if idx in self.reused:
+                parsed = None
+                q_text, options = self.reused[idx]["question"], self.reused[idx]["options"]
+            else:
+                parsed = next(results)
+                q_text, options = parsed[0], parsed[1]
+            key = None
+            if self._keys is not None:
+                key = self._keys[idx]
+            elif self.dedup == "exact" or self.id_scheme == "content":
+                key = exact_key(*dedup_item(self.table, idx, q_text, options))
+            if self.dedup == "exact":
+                j = self._first.setdefault(key, idx)
+                if j != idx:
+                    self.dup_of[idx] = (j, "exact", 1.0)
+            if idx in self.dup_of:
+                continue
+            self.keep.append(idx)
+            self.ids[idx] = self._assign(key) if self.id_scheme == "content" else f"Q{idx+1:04d}"
+            srcs = unique_srcs([src for src, _ in imgs] for imgs in parsed[3].values()) if parsed else []
+            image_q.append((idx, parsed, [(src, self.images.get(src)) for src in srcs]))
+
+    def _emit(self, item):
+        idx, parsed, pending = item
+        t0 = time.perf_counter()
+        img_map = {}
+        for src, fut in pending:
+            found = fut.result()
+            if found is not None:
+                img_map[src] = found
+        self.wait_s["images"] += time.perf_counter() - t0
+        if parsed is None:
+            q = {"id": self.ids[idx]}
+            q.update(self.reused[idx])
+        else:
+            q = make_question(idx, self.table, parsed, img_map)
+            q["id"] = self.ids[idx]
+        if self.batch:
+            q = {"id": q.pop("id"), "source": self.sources[idx], **q}
+        return q
+
+# ========== 生成 LaTeX（练习册 + 答案册 + 答案卡） ==========
+def _image_renderer(q, tex_dir):
+    """返回 images 下标 → \\includegraphics 的函数（路径相对 .tex 所在目录）"""
+    images = q.get("images") or []
+    sizes = q.get("image_sizes") or [None] * len(images)
+
+    def render(i):
+        rel = os.path.relpath(images[i], tex_dir)
+        return tex_graphic(rel.replace("\\","/"), sizes[i])
+    return render
+
+def _write_unplaced(g, refs, used, render):
+    """字段中没有占位符位置的图片（如选项解析时丢失的行）单独成段附在字段后"""
+    for i in unplaced(refs, used):
+        used.add(i)
+        g.write(render(i) + "\n\n")
+
+# \csname endofdump\endcsname 之前的宏包转储为格式复用（见 tex_format.py）；字体不能转储，放在其后
+TEX_PREAMBLE = r"""\documentclass[12pt]{article}
 \usepackage{xeCJK}
-\setCJKmainfont{SimSun} % 根据你系统替换字体
 \usepackage{graphicx}
 \usepackage{enumitem}
 \usepackage{geometry}
 \geometry{a4paper,margin=1in}
+\csname endofdump\endcsname
+\setCJKmainfont{SimSun} % 根据你系统替换字体
 \begin{document}
-""")
-        f.write("\n")
-        from collections import defaultdict
-        groups = defaultdict(list)
+"""
+
+TEX_VARIANTS = ("practice", "answers", "key")   # 练习册、答案册、只列答案的答案卡
+TEX_BLOCK_END = "\n\\bigskip\n"
+
+def question_ir(q, tex_dir):
+    """一道题转义、排版一次得到的中间表示：(题干与选项, 答案与解析, 答案卡行)；各份 .tex 都由它拼出"""
+    # [IMAGE:n] 按 image_refs 原位替换为图片
+    render = _image_renderer(q, tex_dir)
+    refs = q.get("image_refs") or legacy_refs(q.get("images") or [])
+    used = set()
+    g = io.StringIO()
+    qid = latex_escape(q["id"])
+    g.write(r"\subsection*{" + qid + "}\n")
+    g.write(resolve(latex_escape(q["question"]), refs.get("question"), render, used) + "\n\n")
+    _write_unplaced(g, refs.get("question"), used, render)
+    if q.get("options"):
+        g.write(r"\begin{enumerate}[label=\Alph*.]" + "\n")
+        for k in sorted(q["options"].keys()):
+            g.write(r"\item " + resolve(latex_escape(q["options"][k]), refs.get("options"), render, used) + "\n")
+        g.write(r"\end{enumerate}" + "\n\n")
+    _write_unplaced(g, refs.get("options"), used, render)
+    head = g.getvalue()
+    g = io.StringIO()
+    answer = latex_escape(q["answer"]) if q.get("answer") else ""
+    if answer:
+        g.write(r"\textbf{Answer:} " + answer + "\n\n")
+    if q.get("explanation"):
+        expl = resolve(latex_escape(q["explanation"]), refs.get("explanation"), render, used)
+        g.write(r"\textit{Explanation:} " + expl + "\n\n")
+        _write_unplaced(g, refs.get("explanation"), used, render)
+    key = r"\noindent\textbf{" + qid + r"}\quad " + (answer or "--") + "\\par\n"
+    return head, g.getvalue(), key
+
+def tex_block(ir, variant):
+    """由 question_ir 的结果拼出某一份 .tex 中的题块"""
+    head, solution, key = ir
+    if variant == "key":
+        return key
+    return head + (solution if variant == "answers" else "") + TEX_BLOCK_END
+
+class TexWriter:
+    """一次遍历写出同一批题目的几份 .tex：with TexWriter({"practice": p1, "answers": p2, "key": p3}) as w: w.add(q)
+
+    每道题只转义、排版一次（question_ir），各份从中取用；几份 .tex 须在同一目录（图片相对路径相同）。
+    按 paper_type 分组：各组各份的内容先写入临时文件，退出时按首次出现顺序拼接，避免整体驻留内存。
+    fragments 为跨次构建保留的 {记录键: 中间表示} 缓存（watch 模式）：内容未变的题目直接取用上次的结果，
+    退出时只留下本次用到的条目。
+    """
+
+    def __init__(self, paths, fragments=None):
+        unknown = set(paths) - set(TEX_VARIANTS)
+        if unknown:
+            raise ValueError(f"unknown LaTeX variant(s): {', '.join(sorted(unknown))}")
+        dirs = {os.path.dirname(p) for p in paths.values()}
+        if len(dirs) != 1:
+            raise ValueError("all .tex files of one TexWriter must be in the same directory")
+        self.paths = dict(paths)
+        self.tex_dir = dirs.pop()
+        self.spools = {}   # 分组 -> {variant: 临时文件}
+        self.fragments = fragments
+        self._used = {}
+
+    def __enter__(self):
+        return self
+
+    def add(self, q):
+        group = q.get("paper_type") or "General"
+        spools = self.spools.get(group)
+        if spools is None:
+            spools = self.spools[group] = {v: tempfile.TemporaryFile("w+", encoding="utf-8") for v in self.paths}
+        if self.fragments is None:
+            ir = question_ir(q, self.tex_dir)
+        else:
+            key = record_key(q)
+            ir = self.fragments.get(key)
+            if ir is None:
+                ir = question_ir(q, self.tex_dir)
+            self._used[key] = ir
+        for variant, g in spools.items():
+            g.write(tex_block(ir, variant))
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.fragments is not None and exc_type is None:
+            self.fragments.clear()
+            self.fragments.update(self._used)
+        try:
+            if exc_type is None:
+                for variant, tex_path in self.paths.items():
+                    with open(tex_path, "w", encoding="utf-8") as f:
+                        f.write(TEX_PREAMBLE)
+                        f.write("\n")
+                        for group_name, spools in self.spools.items():
+                            f.write(r"\section*{" + latex_escape(str(group_name)) + "}\n")
+                            g = spools[variant]
+                            g.seek(0)
+                            shutil.copyfileobj(g, f)
+                        f.write(r"\end{document}")
+                    print(f"[DONE] LaTeX 文件已生成: {tex_path}")
+        finally:
+            for spools in self.spools.values():
+                for g in spools.values():
+                    g.close()
+        return False
+
+def build_tex(questions, tex_path, include_answers=False):
+    with TexWriter({"answers" if include_answers else "practice": tex_path}) as w:
         for q in questions:
-            key = q.get("paper_type") or "General"
-            groups[key].append(q)
-
-        for group_name, qlist in groups.items():
-            f.write(r"\section*{" + latex_escape(str(group_name)) + "}\n")
-            for q in qlist:
-                f.write(r"\subsection*{" + latex_escape(q["id"]) + "}\n")
-                f.write(latex_escape(q["question"]) + "\n\n")
-                if q.get("images"):
-                    for imgpath in q["images"]:
-                        rel = os.path.relpath(imgpath, os.path.dirname(tex_path))
-                        f.write(r"\begin{center}" + "\n")
-                        f.write(r"\includegraphics[width=0.7\linewidth]{" + rel.replace("\\","/") + "}\n")
-                        f.write(r"\end{center}" + "\n\n")
-                if q.get("options"):
-                    f.write(r"\begin{enumerate}[label=\Alph*.]" + "\n")
-                    for k in sorted(q["options"].keys()):
-                        f.write(r"\item " + latex_escape(q["options"][k]) + "\n")
-                    f.write(r"\end{enumerate}" + "\n\n")
-                if include_answers and q.get("answer"):
-                    f.write(r"\textbf{Answer:} " + latex_escape(q["answer"]) + "\n\n")
-                if include_answers and q.get("explanation"):
-                    f.write(r"\textit{Explanation:} " + latex_escape(q["explanation"]) + "\n\n")
-                f.write("\n\\bigskip\n")
-        f.write(r"\end{document}")
-    print(f"[DONE] LaTeX 文件已生成: {tex_path}")
-
-build_tex(questions, TEX_PRACTICE, include_answers=False)
-build_tex(questions, TEX_ANS, include_answers=True)
+            w.add(q)
 
 # ========== 可选：自动调用 xelatex（若系统配置了 xelatex） ==========
-def compile_tex(texfile, outdir=OUT_DIR):
+def compile_tex(texfile, outdir=OUT_DIR, quiet=False):
+    """写出了新的 PDF 即返回 True（可恢复的 LaTeX 错误只报警告，见 tex_shards.latex_output）；
+    quiet 时不显示 xelatex 的控制台输出（几份同时编译时会交错），只留 .log"""
+    output = {"stdout": subprocess.DEVNULL, "stderr": subprocess.STDOUT} if quiet else {}
+    started = time.time()
     try:
-        subprocess.run(["xelatex", "-interaction=nonstopmode", "-output-directory", outdir, texfile], check=True)
-        return True
-    except Exception as e:
+        run_latex(LATEX_ENGINE, ["-interaction=nonstopmode", "-output-directory", outdir, texfile],
+                  texfile, outdir, **output)
+    except OSError as e:
         print("编译失败：", e)
         return False
+    pages, errors = latex_output(texfile, started)
+    if pages is None:
+        print(f"编译失败：没有生成 PDF（详见 {os.path.splitext(texfile)[0]}.log）")
+        return False
+    report_errors(texfile, errors)
+    return True
+
+def compile_booklets(tex_files, out_dir, shards=1, workers=None, manifest=None, metrics=None):
+    """同时编译练习册、答案册与答案卡，返回是否全部成功；shards > 1 时各份再分片并发编译，
+    未改动的分片（输入摘要不变）直接复用上次的 PDF。workers 为 xelatex 的总并发数，由各份均分"""
+    metrics = metrics or Metrics("excel_to_pdf_fixed")
+    tex_files = list(tex_files)
+    workers = workers or os.cpu_count() or 1
+    concurrent = max(1, min(len(tex_files), workers))
+
+    def one(tex):
+        if shards > 1:
+            return compile_sharded(tex, shards, TEX_QUESTION_RE, TEX_GROUP_RE, workers=max(1, workers // concurrent),
+                                   manifest=manifest) is not None
+        return compile_tex(tex, out_dir, quiet=concurrent > 1)
+
+    # xelatex 是子进程，其 CPU 时间记入 child_cpu_s
+    with metrics.stage("xelatex", items=len(tex_files)) as st, ThreadPoolExecutor(max_workers=concurrent) as pool:
+        results = list(pool.map(one, tex_files))
+        st.add("failed", results.count(False))
+    return all(results)
+
+# ========== 主流程 ==========
+class WarmState:
+    """watch 模式在多次构建之间保留在内存中的状态（见 watch.py）"""
+
+    def __init__(self):
+        self.rows = []          # 上次构建的行指纹（按行序）
+        self.records = None     # {行指纹: 记录（不含 id / source）}；None 表示首次构建，此时读取行缓存文件
+        self.questions = []     # 上次构建输出的全部题目（按输出顺序）
+        self.fragments = {}     # {"tex" / "html": {记录键: 中间表示 / 题块}}，见 TexWriter / json2html.write_html
+        self._objects = {}
+
+    def keep(self, name, factory):
+        """同名对象只创建一次：图片缓存与预处理的索引、HTTP 连接池"""
+        if name not in self._objects:
+            self._objects[name] = factory()
+        return self._objects[name]
+
+def build_parser(prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Convert an Excel question bank to JSON and LaTeX")
+    parser.add_argument("-i", "--input", nargs="+", default=[INPUT_XLSX],
+                        help="Path(s) to .xlsx question banks; several workbooks are merged into one output")
+    parser.add_argument("-s", "--sheet", default=SHEET_NAME, help="Sheet name (falls back to the first sheet)")
+    parser.add_argument("-o", "--outdir", default=OUT_DIR, help="Output directory")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Reuse records of rows whose source cells are unchanged since the last run")
+    parser.add_argument("-w", "--workers", type=int, default=0,
+                        help="Processes for HTML/option parsing and concurrent xelatex shards (0 = CPU count, 1 = serial)")
+    parser.add_argument("--parse-workers", type=int, default=0,
+                        help="Parsing processes in the row pipeline (0 = same as -w; 1 = one background thread)")
+    parser.add_argument("--fetch-workers", type=int, default=DEFAULT_WORKERS, help="Concurrent image downloads")
+    parser.add_argument("--prep-workers", type=int, default=0,
+                        help="Threads for image preprocessing (0 = same as -w)")
+    parser.add_argument("--queue-rows", type=int, default=PIPELINE_QUEUE_ROWS,
+                        help="Rows buffered between pipeline stages; bounds memory on large banks")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="json",
+                        help="Question output: indented JSON array (questions.json) or JSON Lines (questions.jsonl)")
+    parser.add_argument("--ids", choices=("row", "content"), default=None,
+                        help="Question ids: row position (Q0001; default for one workbook) "
+                             "or a hash of the normalised content (default for several)")
+    parser.add_argument("--dedup", choices=("off", "exact", "near"), default=None,
+                        help="Drop duplicate questions: off (default for one workbook), exact normalised matches "
+                             "(default for several), or near (also MinHash/LSH near-duplicates; review duplicates.json)")
+    parser.add_argument("--near-threshold", type=float, default=NEAR_DUP_THRESHOLD,
+                        help="Jaccard similarity above which --dedup near treats two questions as duplicates")
+    parser.add_argument("--no-image-prep", action="store_true",
+                        help="Use downloaded images as-is (skip PNG/JPEG conversion and downscaling)")
+    parser.add_argument("--store", action="store_true",
+                        help=f"Also write the questions into an indexed SQLite store ({STORE_NAME}) for json2pdf.py filters")
+    parser.add_argument("--compile", action="store_true", help="Run xelatex on the generated .tex files")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="With --compile: split each .tex into N shards, compile them concurrently and merge the PDFs")
+    add_profile_argument(parser)
+    return parser
+
+def main(argv=None, prog=None):
+    run(build_parser(prog).parse_args(argv))
+
+def run(args, warm=None):
+    """按解析好的参数执行一次转换；warm（WarmState）不为 None 时复用并更新其中的内存状态"""
+    metrics = Metrics("excel_to_pdf_fixed", args.profile)
+
+    out_dir = args.outdir
+    batch = len(args.input) > 1
+    id_scheme = args.ids or ("content" if batch else "row")
+    dedup = args.dedup or ("exact" if batch else "off")
+    img_dir = os.path.join(out_dir, "images")
+    json_file = os.path.join(out_dir, "questions." + args.format)
+    tex_practice = os.path.join(out_dir, "questions_practice.tex")
+    tex_ans = os.path.join(out_dir, "questions_answers.tex")
+    tex_key = os.path.join(out_dir, "questions_key.tex")
+    row_cache_file = os.path.join(out_dir, ROW_CACHE_NAME)
+    os.makedirs(out_dir, exist_ok=True)
+    os.makedirs(img_dir, exist_ok=True)
+
+    print("开始读取 Excel...")
+    # 工作簿只在内容变化后解析一次，之后直接加载输出目录中的列式快照
+    manifest = BuildManifest(out_dir)
+    with metrics.stage("excel_read"):
+        table, fingerprints, sources = load_tables(args.input, args.sheet, out_dir, manifest, metrics)
+
+    if warm is not None and warm.records is not None:
+        prev_rows, prev_records = warm.rows, warm.records
+    else:
+        prev_rows, prev_records = load_row_cache(row_cache_file) if args.incremental or warm else ([], {})
+
+    reused = {}   # 行号 -> 可直接复用的旧记录
+    todo = []     # 需要重新解析的行号
+    for idx, fp in enumerate(fingerprints):
+        old = prev_records.get(fp)
+        # 旧记录引用的图片已被清理或上次下载失败时，重新处理该行
+        if old is not None and reusable(old):
+            reused[idx] = old
+        else:
+            todo.append(idx)
+    workers = args.workers or os.cpu_count() or 1
+    parse_workers = args.parse_workers or workers
+    prep_workers = args.prep_workers or workers
+
+    if args.incremental or warm:
+        added, changed, removed = diff_counts(prev_rows, fingerprints, reused)
+        print(f"增量模式：复用 {len(reused)} 行，新增 {added}，修改 {changed}，删除 {removed}")
+
+    # ========== 流水线：解析、去重、图片下载/预处理与写出同时进行 ==========
+    keep = warm.keep if warm is not None else lambda name, factory: factory()
+    prep = None if args.no_image_prep else keep("prep", lambda: open_prep(os.path.join(img_dir, PREP_DIR_NAME)))
+    img_cache = keep("img_cache", lambda: ImageCache(img_dir, max_bytes=IMG_CACHE_MAX_MB * 1024 * 1024,
+                                                     max_age=IMG_CACHE_MAX_AGE))
+    session = keep("session", lambda: make_session(args.fetch_workers)) if warm is not None else None
+    fetcher = ImageFetcher(img_cache, workers=args.fetch_workers, session=session)
+    images = ImageStage(fetcher, prep, display_widths(table, todo) if prep else None, prep_workers)
+    pipeline = RowPipeline(table, sources, reused, images, parse_workers=parse_workers, queue_rows=args.queue_rows,
+                           id_scheme=id_scheme, dedup=dedup, near_threshold=args.near_threshold, batch=batch,
+                           metrics=metrics)
+    print(f"开始处理 {len(fingerprints)} 行（解析 {len(todo)}，复用 {len(reused)}）：解析 {parse_workers} 进程，"
+          f"下载 {args.fetch_workers} 线程，图片预处理 {prep_workers if prep else 0} 线程，队列 {args.queue_rows} 行")
+    # 逐题写出 JSON / JSON Lines 与三份 .tex；后续步骤都从 JSON 文件流式读取
+    json_s = tex_s = 0.0
+    # 三份 .tex 由同一份逐题中间表示一次写出；watch 模式下缓存中间表示，单次运行不缓存
+    tex_paths = {"practice": tex_practice, "answers": tex_ans, "key": tex_key}
+    questions = []
+    used = set()   # 输出引用的图片路径（含复用行的），缓存淘汰时保留
+    with metrics.stage("pipeline", items=len(fingerprints), cache_hits=len(reused), cache_misses=len(todo)) as st, \
+            QuestionWriter(json_file, args.format) as out, \
+            TexWriter(tex_paths, warm.fragments.setdefault("tex", {}) if warm is not None else None) as booklets:
+        for q in pipeline.run():
+            if warm is not None:
+                questions.append(q)
+            used.update(q.get("images") or ())
+            t0 = time.perf_counter()
+            out.write(q)
+            t1 = time.perf_counter()
+            booklets.add(q)
+            json_s += t1 - t0
+            tex_s += time.perf_counter() - t1
+        images.close(used)
+        st.update({"wait_parse_s": round(pipeline.wait_s["parse"], 4),
+                   "wait_images_s": round(pipeline.wait_s["images"], 4)})
+    n = out.count
+    if warm is not None:
+        warm.rows = fingerprints
+        warm.records = {fingerprints[idx]: {k: v for k, v in q.items() if k not in ("id", "source")}
+                        for idx, q in zip(pipeline.keep, questions)}
+        warm.questions = questions
+    metrics.record("json_write", wall_s=json_s, items=n, bytes=os.path.getsize(json_file))
+    metrics.record("latex_emit", wall_s=tex_s, items=len(tex_paths),
+                   bytes=sum(os.path.getsize(p) for p in tex_paths.values()))
+
+    dup_of = pipeline.dup_of
+    if dedup != "off":
+        near_count = sum(kind == "near" for _, kind, _ in dup_of.values())
+        print(f"去重：{len(fingerprints)} 行 → {len(pipeline.keep)} 道题（完全重复 {len(dup_of) - near_count}，"
+              f"近似重复 {near_count}）")
+        if dedup == "exact":
+            metrics.record("dedup", items=len(fingerprints), duplicates=len(dup_of))
+        else:
+            metrics.record("dedup", duplicates=len(dup_of))
+        write_dedup_report(os.path.join(out_dir, DEDUP_REPORT_NAME), dup_of, pipeline.ids, sources)
+
+    fetch_stats = fetcher.stats
+    metrics.record("image_fetch", wall_s=fetcher.fetch_s, **fetch_stats)
+    failures = "，".join(f"{reason} {k}" for reason, k in sorted(fetch_stats["failures"].items()))
+    fetched = fetch_stats["requested"] - fetch_stats["failed"]
+    print(f"图片下载完成：成功 {fetched} / {fetch_stats['requested']}（去重后）"
+          + (f"（失败：{failures}）" if failures else ""))
+    stats = images.stats if prep else None
+    if stats:
+        metrics.record("image_prep", wall_s=images.prep_s, items=stats["images"], cache_hits=stats["cached"],
+                       cache_misses=stats["images"] - stats["cached"], failed=stats["failed"],
+                       src_bytes=stats["src_bytes"], bytes=stats["bytes"])
+        saved = stats["src_bytes"] - stats["bytes"]
+        print(f"图片预处理：{stats['images']} 张（缓存命中 {stats['cached']}，转换格式 {stats['converted']}，"
+              f"缩小 {stats['resized']}，失败 {stats['failed']}）；"
+              f"{stats['src_bytes'] / 1e6:.1f} MB → {stats['bytes'] / 1e6:.1f} MB，节省 {saved / 1e6:.1f} MB")
+    print(f"[DONE] 已写出标准 JSON: {json_file} （共 {n} 道题）")
+
+    with metrics.stage("row_cache"):
+        save_row_cache(row_cache_file, fingerprints, iter_questions(json_file),
+                       [fingerprints[idx] for idx in pipeline.keep])
+    if args.store:
+        store_file = os.path.join(out_dir, STORE_NAME)
+        with metrics.stage("store") as st:
+            st.add("items", build_store(iter_questions(json_file), store_file))
+        print(f"[DONE] 已写出 SQLite 题库: {store_file}")
+
+    if args.compile:
+        compile_booklets(tex_paths.values(), out_dir, args.shards, workers, manifest, metrics)
+
+    metrics.meta.update({"inputs": [os.path.basename(p) for p in args.input], "rows": len(fingerprints),
+                         "questions": n, "images": fetch_stats["requested"], "workers": workers,
+                         "parse_workers": parse_workers, "fetch_workers": args.fetch_workers,
+                         "prep_workers": prep_workers, "queue_rows": args.queue_rows})
+    metrics.finish(out_dir)
+    print("完成。请到 output 目录查看生成的 .tex、.json 与 images 文件夹。")
 
-# 若你希望脚本自动编译，把下面注释取消
-# compile_tex(TEX_PRACTICE)
-# compile_tex(TEX_ANS)
 
-print("完成。请到 output 目录查看生成的 .tex、.json 与 images 文件夹。")
+if __name__ == "__main__":
+    main()
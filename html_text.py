@@ -0,0 +1,255 @@
+# html_text.py
+"""HTML 单元格 → 纯文本 + 图片 src 列表。
+
+快速路径基于标准库 html.parser 单遍扫描，不构建文档树；遇到无法保证与
+BeautifulSoup 结果一致的输入（<script>/<style> 等）时回退到 BeautifulSoup。
+两条路径输出语义相同（共用 _Lines）：每个文本节点 strip 后以 "\\n" 连接，<img> 替换为 [IMAGE:n]。
+keep_supsub=True 时 <sup>/<sub> 以原样标记内联保留（如 "m/s<sup>2</sup>"），只与紧邻的文本相连，不再拆行。
+with_sizes=True 时额外返回与 src 列表一一对应的 (width, height) 原始属性值（缺失为 None）。
+"""
+import math
+import re
+from html import unescape
+from html.parser import HTMLParser
+
+# 出现这些标签时内容是否计入文本与 lxml/BeautifulSoup 的处理有差异，直接回退
+FALLBACK_TAGS = {"script", "style", "template", "textarea", "title", "noscript", "xmp", "plaintext", "iframe"}
+SUPSUB_TAGS = ("sup", "sub")
+# 上标与其前后文本之间允许隔着的行内标签
+INLINE_TAGS = {"span", "font", "em", "i", "b", "strong", "u", "a", "small", "big", "s", "strike", "code"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+
+_SUPSUB_RE = re.compile(r"<(sup|sub)>(.*?)</\1>", re.S)
+_IMG_TAG_RE = re.compile(r"<img\b([^>]*)>", re.I)
+_ATTR_RE = re.compile(r"""([^\s=/>]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?""")
+
+
+class _Fallback(Exception):
+    """快速路径无法处理，交给 BeautifulSoup"""
+
+
+class _Lines:
+    """两条路径共用的输出规则：文本节点 strip 后各占一行，<img> 替换为 [IMAGE:n]。
+
+    keep_supsub=True 时 <sup>/<sub> 元素以原样标记内联：贴到前一个文本节点之后（中间只隔着行内标签），
+    紧跟在 </sup> 之后、中间没有任何标签的文本（该元素的尾部文本）接在其后。
+    此外任何标签都照常分行，所以上标不会吞并后面的块、<br> 或另一个 <span>。
+    """
+
+    def __init__(self, keep_supsub):
+        self.keep_supsub = keep_supsub
+        self.segs = []            # 文本段（每段为若干片段，最终 strip 后以换行连接）
+        self.imgs = []
+        self.sizes = []
+        self.last_was_data = False  # 连续的文本属于同一个文本节点
+        self.attach = False         # 上标/下标可以贴到上一段末尾（中间只隔着行内标签）
+        self.tail = False           # 刚闭合上标/下标，紧随的文本接到上一段
+        self.depth = 0              # 当前 sup/sub 嵌套深度
+
+    def data(self, text):
+        if self.segs and (self.last_was_data or self.depth or self.tail):
+            self.segs[-1].append(text)
+        else:
+            self.segs.append([text])
+        self.last_was_data = True
+        self.attach = True
+
+    def boundary(self, tag=None):
+        """标签/注释打断文本节点；sup/sub 内部不打断，行内标签不打断上标与前文的粘连"""
+        self.last_was_data = False
+        if self.depth:
+            return
+        self.tail = False
+        if tag not in INLINE_TAGS:
+            self.attach = False
+
+    def img(self, src, size):
+        if src:
+            self.imgs.append(src)
+            self.sizes.append(size)
+        # 用占位符替代 img 元素，便于后续替换
+        placeholder = f"[IMAGE:{len(self.imgs)-1}]"
+        if self.depth:
+            self.last_was_data = False
+            self.segs[-1].append(placeholder)
+        else:
+            self.boundary()
+            self.segs.append([placeholder])
+
+    def open_supsub(self, tag):
+        self.last_was_data = False
+        if self.segs and (self.depth or self.attach):
+            self.segs[-1].append(f"<{tag}>")
+        else:
+            self.segs.append([f"<{tag}>"])
+        self.depth += 1
+
+    def close_supsub(self, tag):
+        self.segs[-1].append(f"</{tag}>")
+        self.depth -= 1
+        self.last_was_data = False
+        if not self.depth:
+            self.tail = self.attach = True
+
+    def result(self):
+        lines = []
+        for seg in self.segs:
+            s = "".join(seg).strip()
+            if s:
+                lines.append(s)
+        return "\n".join(lines), self.imgs, self.sizes
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self, keep_supsub):
+        super().__init__(convert_charrefs=True)
+        self.out = _Lines(keep_supsub)
+        self.stack = []             # 未闭合的非空标签
+
+    def handle_data(self, data):
+        self.out.data(data)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in FALLBACK_TAGS:
+            raise _Fallback(tag)
+        if tag not in VOID_TAGS:
+            self.stack.append(tag)
+        if tag == "img":
+            a = {}
+            for k, v in attrs:
+                a.setdefault(k, v)   # 重复属性以第一个为准（与 lxml 一致）
+            self.out.img(a.get("src"), (a.get("width"), a.get("height")))
+        elif self.out.keep_supsub and tag in SUPSUB_TAGS:
+            self.out.open_supsub(tag)
+        else:
+            self.out.boundary(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag != "img":
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag not in self.stack:
+            # 无对应开标签的结束标签：lxml 直接忽略，不打断文本节点
+            return
+        if self.stack[-1] != tag:
+            # 交错嵌套：lxml 会隐式闭合/重排元素，交给 BeautifulSoup
+            raise _Fallback(f"misnested </{tag}>")
+        self.stack.pop()
+        if self.out.keep_supsub and tag in SUPSUB_TAGS and self.out.depth:
+            self.out.close_supsub(tag)
+        else:
+            self.out.boundary(tag)
+
+    def handle_comment(self, data):
+        self.out.boundary()
+
+    def handle_decl(self, decl):
+        self.out.boundary()
+
+    def handle_pi(self, data):
+        self.out.boundary()
+
+    def unknown_decl(self, data):
+        self.out.boundary()
+
+    def result(self):
+        self.close()
+        if self.out.depth:
+            raise _Fallback("unclosed sup/sub")
+        return self.out.result()
+
+
+def _is_missing(html):
+    return html is None or (isinstance(html, float) and math.isnan(html))
+
+
+def fast_html_to_text(html, keep_supsub=True, with_sizes=False):
+    """快速路径；无法保证结果一致时抛出 _Fallback"""
+    parser = _TextExtractor(keep_supsub)
+    parser.feed(html)
+    text, imgs, sizes = parser.result()
+    return (text, imgs, sizes) if with_sizes else (text, imgs)
+
+
+def _walk(node, out, text_types):
+    """按文档顺序把 BeautifulSoup 树交给 _Lines，与快速路径的事件一一对应"""
+    for child in node.children:
+        name = getattr(child, "name", None)
+        if name is None:
+            # 与 get_text 相同只取普通文本与 CDATA（不含注释、<script> 内容等），其余节点只打断文本
+            if type(child) in text_types:
+                out.data(str(child))
+            else:
+                out.boundary()
+        elif name == "img":
+            out.img(child.get("src"), (child.get("width"), child.get("height")))
+        elif out.keep_supsub and name in SUPSUB_TAGS:
+            out.open_supsub(name)
+            _walk(child, out, text_types)
+            out.close_supsub(name)
+        else:
+            out.boundary(name)
+            _walk(child, out, text_types)
+            out.boundary(name)
+
+
+def soup_html_to_text(html, keep_supsub=True, with_sizes=False):
+    """BeautifulSoup 路径，用于回退与一致性校验；keep_supsub=False 时即原实现（get_text）"""
+    from bs4 import BeautifulSoup, CData, NavigableString
+    soup = BeautifulSoup(html, "lxml")
+    if keep_supsub:
+        out = _Lines(keep_supsub)
+        _walk(soup, out, (NavigableString, CData))
+        text, imgs, sizes = out.result()
+        return (text, imgs, sizes) if with_sizes else (text, imgs)
+    imgs = []
+    sizes = []
+    for img in soup.find_all("img"):
+        src = img.get("src")
+        if src:
+            imgs.append(src)
+            sizes.append((img.get("width"), img.get("height")))
+        # 用占位符替代 img 元素，便于后续替换
+        img.replace_with(f"[IMAGE:{len(imgs)-1}]")
+    text = soup.get_text(separator="\n", strip=True)
+    return (text, imgs, sizes) if with_sizes else (text, imgs)
+
+
+def clean_html_to_text(html, keep_supsub=True, with_sizes=False):
+    """把 HTML 字段转成纯文本，保留 <img> 的 src 列表（with_sizes=True 时另附 width/height 属性）"""
+    if _is_missing(html):
+        return ("", [], []) if with_sizes else ("", [])
+    if isinstance(html, str):
+        try:
+            return fast_html_to_text(html, keep_supsub, with_sizes)
+        except _Fallback:
+            pass
+    return soup_html_to_text(html, keep_supsub, with_sizes)
+
+
+def img_sizes(html):
+    """只用正则取出各 <img> 的 (src, width, height) 原始属性值，不解析整段 HTML；用于预先统计图片的显示尺寸"""
+    if not isinstance(html, str) or "<img" not in html.lower():
+        return []
+    out = []
+    for m in _IMG_TAG_RE.finditer(html):
+        a = {}
+        for name, dq, sq, bare in _ATTR_RE.findall(m.group(1)):
+            a.setdefault(name.lower(), unescape(dq or sq or bare))   # 重复属性以第一个为准
+        if a.get("src"):
+            out.append((a["src"], a.get("width"), a.get("height")))
+    return out
+
+
+def supsub_to_latex(s):
+    """把文本中的 <sup>x</sup>/<sub>x</sub> 标记转为 \\textsuperscript{x}/\\textsubscript{x}"""
+    if "<su" not in s:
+        return s
+
+    def repl(m):
+        cmd = r"\textsuperscript" if m.group(1) == "sup" else r"\textsubscript"
+        return cmd + "{" + supsub_to_latex(m.group(2)) + "}"
+
+    return _SUPSUB_RE.sub(repl, s)
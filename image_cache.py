@@ -0,0 +1,150 @@
+# image_cache.py
+"""按内容寻址的本地图片缓存：文件名为 sha256，索引记录 ETag/Last-Modified、大小与抓取时间。"""
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+
+INDEX_NAME = ".image_index.json"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024   # 缓存总大小上限，超出后按 LRU 淘汰
+DEFAULT_MAX_AGE = 24 * 3600             # 在此时间内的条目直接复用，不发请求
+
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def data_uri_key(src):
+    """data URI 可能很长，索引里用其摘要作为键"""
+    return "data:sha256:" + hashlib.sha256(src.encode("utf-8")).hexdigest()
+
+
+def _clean_ext(ext):
+    ext = re.sub(r"[^0-9a-z]", "", (ext or "").lower())
+    return ext or "png"
+
+
+class ImageCache:
+    """线程安全的图片缓存；同一内容只存一份文件，多个 URL 可指向同一文件"""
+
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.index_path = os.path.join(root, INDEX_NAME)
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self.entries = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data.get("entries", {})
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        tmp = self.index_path + ".tmp"
+        with self._lock:
+            payload = {"version": 1, "entries": self.entries}
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp, self.index_path)
+
+    def path_of(self, entry):
+        return os.path.join(self.root, entry["file"])
+
+    def keys_of(self, paths):
+        """指向 paths 中任一文件的条目键"""
+        files = {os.path.normcase(os.path.abspath(p)) for p in paths}
+        with self._lock:
+            return [k for k, e in self.entries.items()
+                    if os.path.normcase(os.path.abspath(self.path_of(e))) in files]
+
+    def lookup(self, key):
+        """返回仍然有效（文件存在）的索引条目，否则 None"""
+        with self._lock:
+            entry = self.entries.get(key)
+        if entry and os.path.exists(self.path_of(entry)):
+            return entry
+        return None
+
+    def is_fresh(self, entry, now=None):
+        now = time.time() if now is None else now
+        return now - entry.get("fetched_at", 0) < self.max_age
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def touch(self, key, revalidated=False):
+        """标记条目被使用（LRU）；revalidated=True 表示服务器确认未变化（304）"""
+        now = time.time()
+        with self._lock:
+            entry = self.entries[key]
+            entry["used_at"] = now
+            if revalidated:
+                entry["fetched_at"] = now
+        return self.path_of(entry)
+
+    def store(self, key, data, ext="png", etag=None, last_modified=None):
+        """写入内容（已存在相同内容时不重复写文件），返回本地路径"""
+        digest = sha256_bytes(data)
+        fn = f"{digest}.{_clean_ext(ext)}"
+        path = os.path.join(self.root, fn)
+        if not os.path.exists(path):
+            tmp = f"{path}.{threading.get_ident()}.part"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        now = time.time()
+        with self._lock:
+            self.entries[key] = {
+                "file": fn,
+                "sha256": digest,
+                "size": len(data),
+                "etag": etag,
+                "last_modified": last_modified,
+                "fetched_at": now,
+                "used_at": now,
+            }
+        return path
+
+    def evict(self, pinned=()):
+        """按最近使用时间淘汰条目，直到去重后的文件总大小不超过 max_bytes；pinned 中的键不淘汰"""
+        pinned = set(pinned)
+        removed = 0
+        with self._lock:
+            files = {}
+            for e in self.entries.values():
+                files[e["file"]] = e.get("size", 0)
+            total = sum(files.values())
+            if total <= self.max_bytes:
+                return 0
+            refs = {}
+            for e in self.entries.values():
+                refs[e["file"]] = refs.get(e["file"], 0) + 1
+            victims = sorted((k for k in self.entries if k not in pinned),
+                             key=lambda k: self.entries[k].get("used_at", 0))
+            for key in victims:
+                if total <= self.max_bytes:
+                    break
+                entry = self.entries.pop(key)
+                fn = entry["file"]
+                refs[fn] -= 1
+                if refs[fn] == 0:
+                    total -= files[fn]
+                    try:
+                        os.remove(os.path.join(self.root, fn))
+                    except OSError:
+                        pass
+                removed += 1
+        return removed
@@ -0,0 +1,219 @@
+# image_fetcher.py
+"""并发下载题目图片：共享 keep-alive 连接池、有界线程池、按主机限流、失败重试。
+
+下载结果写入 ImageCache（按内容寻址）；重复运行时新鲜条目直接复用，过期条目只发条件 GET。
+失败不再静默丢弃：按原因（timeout / connection / http_<状态码> / bad_data_uri / io / 异常类名）计数，
+记在 ImageFetcher.stats 中。
+流水线中用 ImageFetcher.submit 逐个提交（同一 src 只下载一次），全部结束后 close()。
+"""
+import os
+import re
+import time
+import base64
+import binascii
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, unquote
+
+from image_cache import data_uri_key
+
+# ========== 默认参数 ==========
+DEFAULT_WORKERS = 16      # 全局并发上限
+PER_HOST_LIMIT = 8        # 同一主机的并发上限（OSS 对单连接数较敏感）
+RETRIES = 3               # 失败后的重试次数
+BACKOFF = 0.5             # 重试退避基数（秒），按 2^n 递增
+TIMEOUT = 15
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def unique_srcs(src_lists):
+    """把多个 src 列表合并去重，保持首次出现的顺序"""
+    seen = set()
+    out = []
+    for srcs in src_lists:
+        for s in srcs or []:
+            if s and s not in seen:
+                seen.add(s)
+                out.append(s)
+    return out
+
+
+def make_session(pool_size=DEFAULT_WORKERS):
+    """创建带连接池的 Session，所有下载复用同一组 keep-alive 连接"""
+    # requests 导入较慢（约 0.1 s），只在真正下载时导入，不拖慢只渲染 JSON 的命令与 --help
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _url_ext(src, content_type=None):
+    """优先取 URL 文件名的扩展名，其次取 Content-Type"""
+    ext = os.path.splitext(unquote(urlparse(src).path))[1].lstrip(".")
+    if not ext and content_type and content_type.startswith("image/"):
+        ext = content_type.split("/")[1].split(";")[0]
+    return ext or "png"
+
+
+def failure_reason(exc):
+    """把下载异常归类为简短的原因标签"""
+    import requests
+
+    if isinstance(exc, requests.Timeout):
+        return "timeout"
+    if isinstance(exc, requests.ConnectionError):
+        return "connection"
+    if isinstance(exc, requests.HTTPError):
+        resp = getattr(exc, "response", None)
+        return f"http_{resp.status_code}" if resp is not None else "http"
+    if isinstance(exc, requests.RequestException):   # InvalidURL、MissingSchema 等
+        return type(exc).__name__
+    if isinstance(exc, (binascii.Error, ValueError)):
+        return "bad_data_uri"
+    if isinstance(exc, OSError):
+        return "io"
+    return type(exc).__name__
+
+
+def new_stats():
+    """ImageFetcher 的统计：缓存命中、条件 GET 命中（304）、实际下载、下载字节数、失败数与失败原因"""
+    return {"requested": 0, "cache_hits": 0, "revalidated": 0, "downloaded": 0, "bytes": 0,
+            "failed": 0, "failures": {}}
+
+
+class ImageFetcher:
+    """下载器：submit 逐个提交，close 等待全部结束"""
+
+    def __init__(self, cache, workers=DEFAULT_WORKERS, per_host=PER_HOST_LIMIT, retries=RETRIES,
+                 backoff=BACKOFF, timeout=TIMEOUT, session=None):
+        self.cache = cache
+        self.workers = workers
+        self.per_host = per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = session or make_session(workers)
+        self._host_locks = {}
+        self._lock = threading.Lock()
+        self._pool = None
+        self._futures = {}
+        self.stats = new_stats()
+        self.fetch_s = 0.0   # 各线程下载耗时之和
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+    def _fail(self, exc):
+        reason = failure_reason(exc)
+        with self._lock:
+            self.stats["failed"] += 1
+            self.stats["failures"][reason] = self.stats["failures"].get(reason, 0) + 1
+
+    def _host_slot(self, host):
+        with self._lock:
+            sem = self._host_locks.get(host)
+            if sem is None:
+                sem = self._host_locks[host] = threading.BoundedSemaphore(self.per_host)
+            return sem
+
+    def _get(self, src, headers=None):
+        """带退避重试的 GET，返回响应（200 或 304）；最终失败时抛出最后一次的异常"""
+        import requests
+
+        host = urlparse(src).netloc
+        for attempt in range(self.retries + 1):
+            try:
+                with self._host_slot(host):
+                    resp = self.session.get(src, headers=headers, timeout=self.timeout)
+                if resp.status_code in RETRY_STATUS and attempt < self.retries:
+                    resp.close()
+                    raise requests.HTTPError(f"retryable status {resp.status_code}", response=resp)
+                resp.raise_for_status()
+                return resp
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                resp = getattr(e, "response", None)
+                retryable = resp is None or resp.status_code in RETRY_STATUS
+                if not retryable or attempt >= self.retries:
+                    raise
+                time.sleep(self.backoff * (2 ** attempt))
+
+    def fetch_one(self, src):
+        """获取单个 src（支持 http(s) 与 data URI），返回 (缓存键, 本地路径) 或 (缓存键, None)"""
+        t0 = time.perf_counter()
+        try:
+            return self._fetch_one(src)
+        finally:
+            elapsed = time.perf_counter() - t0
+            with self._lock:
+                self.fetch_s += elapsed
+
+    def _fetch_one(self, src):
+        if src.startswith("data:"):
+            key = data_uri_key(src)
+            try:
+                if self.cache.lookup(key):
+                    self._count("cache_hits")
+                    return key, self.cache.touch(key)
+                header, b64 = src.split(",", 1)
+                ext = "png"
+                m = re.search(r"data:(image/[^;]+);base64", header)
+                if m:
+                    ext = m.group(1).split("/")[1]
+                data = base64.b64decode(b64)
+                path = self.cache.store(key, data, ext)
+                self._count("downloaded")
+                self._count("bytes", len(data))
+                return key, path
+            except Exception as e:
+                self._fail(e)
+                return key, None
+        try:
+            entry = self.cache.lookup(src)
+            if entry and self.cache.is_fresh(entry):
+                self._count("cache_hits")
+                return src, self.cache.touch(src)
+            headers = self.cache.conditional_headers(entry) if entry else None
+            resp = self._get(src, headers)
+            if resp.status_code == 304 and entry:
+                self._count("revalidated")
+                return src, self.cache.touch(src, revalidated=True)
+            path = self.cache.store(
+                src, resp.content,
+                ext=_url_ext(src, resp.headers.get("Content-Type")),
+                etag=resp.headers.get("ETag"),
+                last_modified=resp.headers.get("Last-Modified"),
+            )
+            self._count("downloaded")
+            self._count("bytes", len(resp.content))
+            return src, path
+        except Exception as e:
+            self._fail(e)
+            return src, None
+
+    def submit(self, src):
+        """提交一个 src，返回结果为 (缓存键, 本地路径或 None) 的 Future；重复提交同一 src 返回同一个 Future"""
+        with self._lock:
+            fut = self._futures.get(src)
+            if fut is None:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers)
+                self.stats["requested"] += 1
+                fut = self._futures[src] = self._pool.submit(self.fetch_one, src)
+            return fut
+
+    def close(self, keep=()):
+        """等待已提交的下载结束，淘汰缓存并保存索引。
+
+        本次用到的条目与 keep（输出仍引用的图片路径，如增量模式下复用行的图片）指向的条目不淘汰。
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        pinned = [f.result()[0] for f in self._futures.values()]
+        self.cache.evict(pinned=pinned + self.cache.keys_of(keep))
+        self.cache.save()
@@ -0,0 +1,223 @@
+# image_prep.py
+"""图片预处理：在生成 LaTeX 之前把下载的图片统一转成 PNG/JPEG、按显示宽度限制分辨率、去掉元数据。
+
+- XeLaTeX 不支持或处理很慢的格式（webp、gif、bmp、tiff…）统一转换：有损来源的照片类图片转 JPEG，
+  线稿/公式截图与透明图转 PNG（缩小后重新量化为调色板图）。
+- 分辨率上限 = 显示宽度（HTML width，CSS px）按 PREP_DPI 换算的像素数，且不超过版心宽度。
+- 处理结果不会比 XeLaTeX 可直接读取的原图更大，否则保留原图。
+- 结果按 (源文件 sha256, 分辨率上限) 缓存在 images/prepared/ 下，索引记录像素尺寸与字节数。
+- Pillow 为可选依赖：未安装时跳过预处理，直接使用下载的原图。
+- 流水线中用 prepare_one 在线程中逐张处理（Pillow 编解码时释放 GIL）。
+"""
+import io
+import os
+import json
+import math
+import hashlib
+import threading
+
+PREP_DIR_NAME = "prepared"
+INDEX_NAME = ".prep_index.json"
+PREP_VERSION = 1          # 处理逻辑变化时递增，使旧的预处理结果失效
+PREP_DPI = 300            # 输出分辨率上限（按显示尺寸换算）
+CSS_DPI = 96              # HTML 中 1 英寸 = 96 CSS px
+TEXT_WIDTH_IN = 6.27      # A4、1in 页边距时的版心宽度（英寸）
+MAX_WIDTH_PX = math.ceil(TEXT_WIDTH_IN * PREP_DPI)
+JPEG_QUALITY = 85
+
+PX_TO_BP = 72 / CSS_DPI   # CSS px → TeX bp
+NATIVE_FORMATS = {"PNG", "JPEG"}   # XeLaTeX 可直接读取的位图格式
+LOSSY_FORMATS = {"JPEG", "WEBP"}
+PALETTE_COLORS = 256
+
+
+def parse_px(value):
+    """HTML width/height 属性 → CSS px（"219"、"219px"）；百分比等无法换算的返回 None"""
+    if value is None:
+        return None
+    s = str(value).strip().lower()
+    if s.endswith("px"):
+        s = s[:-2].strip()
+    try:
+        v = float(s)
+    except ValueError:
+        return None
+    return v if v > 0 else None
+
+
+def max_pixels(display_width):
+    """显示宽度（CSS px，可为 None）对应的输出像素宽度上限"""
+    if not display_width:
+        return MAX_WIDTH_PX
+    return min(MAX_WIDTH_PX, math.ceil(display_width * PREP_DPI / CSS_DPI))
+
+
+def display_size(html_size, pixel_size):
+    """补全显示尺寸：HTML 只给了宽或高时按图片实际宽高比推算另一边；都没有时返回 None"""
+    w, h = html_size if html_size else (None, None)
+    if w and h:
+        return [w, h]
+    if pixel_size and (w or h):
+        pw, ph = pixel_size
+        if w:
+            return [w, round(w * ph / pw, 2)]
+        return [round(h * pw / ph, 2), h]
+    return None
+
+
+def graphics_options(size, default=r"width=0.7\linewidth"):
+    """显示尺寸（CSS px）→ \\includegraphics 选项；按 HTML 尺寸排版，但不超过行宽"""
+    if not size:
+        return default
+    return r"width=\linewidth,height=%gbp,keepaspectratio" % round(size[1] * PX_TO_BP, 2)
+
+
+def _encode(im, fmt, palette=False):
+    buf = io.BytesIO()
+    if fmt == "JPEG":
+        if im.mode not in ("RGB", "L"):
+            im = im.convert("RGB")
+        im.save(buf, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    else:
+        if im.mode not in ("1", "L", "LA", "P", "RGB", "RGBA"):
+            im = im.convert("RGBA" if "A" in im.getbands() else "RGB")
+        if palette and im.mode in ("RGB", "RGBA"):
+            # 缩放产生的抗锯齿灰阶会让线稿 PNG 变大，重新量化为调色板图
+            from PIL import Image
+            im = im.quantize(PALETTE_COLORS, method=Image.Quantize.FASTOCTREE)
+        im.save(buf, "PNG", optimize=True)
+    return buf.getvalue()
+
+
+def _prepare_one(job):
+    """处理一张图片，返回索引条目；无法识别的图片返回 None"""
+    src_path, out_dir, cap, key = job
+    from PIL import Image
+    try:
+        with open(src_path, "rb") as f:
+            raw = f.read()
+        with Image.open(io.BytesIO(raw)) as im:
+            src_fmt = im.format
+            im.seek(0)   # 动图只取首帧
+            im.load()
+            if im.mode == "P":
+                im = im.convert("RGBA" if "transparency" in im.info else "RGB")
+            elif im.mode not in ("1", "L", "LA", "RGB", "RGBA"):
+                im = im.convert("RGBA" if "A" in im.getbands() else "RGB")
+            if im.mode in ("RGBA", "LA") and im.getextrema()[-1] == (255, 255):
+                im = im.convert(im.mode[:-1])   # 完全不透明的 alpha 通道没有意义
+            has_alpha = im.mode in ("RGBA", "LA")
+            few_colors = im.getcolors(PALETTE_COLORS) is not None   # 线稿/公式截图
+            w, h = im.size
+            resized = w > cap
+            if resized:
+                im = im.resize((cap, max(1, round(h * cap / w))), Image.LANCZOS)
+            # 有损来源的照片类图片用 JPEG，其余（线稿、透明图）用 PNG
+            fmt = "JPEG" if src_fmt in LOSSY_FORMATS and not has_alpha and not few_colors else "PNG"
+            # 重新编码即去掉 EXIF/文本块等元数据
+            data = _encode(im, fmt, palette=few_colors and resized)
+            size = im.size
+    except Exception:
+        return None
+    if src_fmt in NATIVE_FORMATS and len(data) >= len(raw):
+        # 处理后反而更大时保留原图（XeLaTeX 可直接读取）
+        data, fmt, size, resized = raw, src_fmt, (w, h), False
+    ext = "jpg" if fmt == "JPEG" else "png"
+    fn = f"{key}.{ext}"
+    path = os.path.join(out_dir, fn)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return {"file": fn, "width": size[0], "height": size[1], "src_bytes": len(raw), "bytes": len(data),
+            "converted": src_fmt not in NATIVE_FORMATS, "resized": resized}
+
+
+def new_stats():
+    return {"images": 0, "cached": 0, "converted": 0, "resized": 0, "failed": 0, "src_bytes": 0, "bytes": 0}
+
+
+def tally(stats, entry, cached):
+    """把一张图片的结果计入统计；entry 为 None 表示处理失败（沿用原图）"""
+    stats["images"] += 1
+    if entry is None:
+        stats["failed"] += 1
+        return
+    stats["cached"] += cached
+    stats["converted"] += entry["converted"]
+    stats["resized"] += entry["resized"]
+    stats["src_bytes"] += entry["src_bytes"]
+    stats["bytes"] += entry["bytes"]
+
+
+def _pillow_available():
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ImagePrep:
+    """预处理结果缓存；entries 为 {"<源 sha256>-<像素上限>-v<版本>": 索引条目}"""
+
+    def __init__(self, root):
+        self.root = root
+        self.index_path = os.path.join(root, INDEX_NAME)
+        os.makedirs(root, exist_ok=True)
+        self.entries = self._load_index()
+        self._lock = threading.Lock()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f).get("entries", {})
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        tmp = self.index_path + ".tmp"
+        with self._lock:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "entries": self.entries}, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(tmp, self.index_path)
+
+    def lookup(self, key):
+        entry = self.entries.get(key)
+        if entry and os.path.exists(os.path.join(self.root, entry["file"])):
+            return entry
+        return None
+
+    def _key(self, path, display_width):
+        """(缓存键, 像素上限)；原图不可读时返回 None"""
+        try:
+            with open(path, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return None
+        cap = max_pixels(display_width)
+        return f"{digest}-{cap}-v{PREP_VERSION}", cap
+
+    def prepare_one(self, path, display_width=None):
+        """处理一张图片（可在多个线程中同时调用），返回 ((路径, 像素尺寸或 None), 索引条目或 None, 是否命中缓存)"""
+        found = self._key(path, display_width)
+        if found is None:
+            return (path, None), None, False
+        key, cap = found
+        entry = self.lookup(key)
+        cached = entry is not None
+        if not cached:
+            entry = _prepare_one((path, self.root, cap, key))
+            if entry is None:
+                return (path, None), None, False
+            with self._lock:
+                self.entries[key] = entry
+        return (os.path.join(self.root, entry["file"]), (entry["width"], entry["height"])), entry, cached
+
+
+def open_prep(dst_dir):
+    """返回 dst_dir 下的 ImagePrep；未安装 Pillow 时打印提示并返回 None"""
+    if not _pillow_available():
+        print("[WARN] 未安装 Pillow，跳过图片预处理（pip install Pillow）")
+        return None
+    return ImagePrep(dst_dir)
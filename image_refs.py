@@ -0,0 +1,81 @@
+# image_refs.py
+"""[IMAGE:n] 占位符 → 图片。
+
+clean_html_to_text 在每个字段内从 0 给图片编号，而记录的 images 把题干、选项、解析的图片合在一起（按 src 去重）。
+记录中的 image_refs 为 {字段: [images 下标或 None, ...]}：该字段的第 n 个占位符对应 images[refs[n]]，
+下载失败的图片为 None。生成器据此在一次正则扫描中把占位符替换成图片，不再按 src 查找或重新下载。
+"""
+import re
+
+from image_prep import display_size, graphics_options
+
+PLACEHOLDER_RE = re.compile(r"\[IMAGE:(\d+)\]")
+IMAGE_FIELDS = ("question", "options", "explanation")
+INLINE_MAX_PX = 48   # 显示高度不超过该值（CSS px）的图片视为公式片段，随文排版
+
+
+def collect_images(field_imgs, img_map):
+    """field_imgs 为 {字段: [(src, HTML 尺寸), ...]}，img_map 为 {src: (本地路径, 像素尺寸)}。
+
+    返回 (images, image_sizes, image_refs)。
+    """
+    images, sizes, refs = [], [], {}
+    index = {}
+    for field in IMAGE_FIELDS:
+        row = []
+        for src, html_size in field_imgs.get(field, ()):
+            if src not in img_map:
+                row.append(None)
+                continue
+            i = index.get(src)
+            if i is None:
+                path, pixels = img_map[src]
+                i = index[src] = len(images)
+                images.append(path)
+                sizes.append(display_size(html_size, pixels))
+            row.append(i)
+        if row:
+            refs[field] = row
+    return images, sizes, refs
+
+
+def resolve(text, refs, render, used=None):
+    """把 text 中的 [IMAGE:n] 替换为 render(images 下标)；无对应图片的占位符删除。
+
+    used（可选集合）记录已放置的下标，便于把未被引用的图片附在题末。
+    """
+    if not text or "[IMAGE:" not in text:
+        return text
+
+    def repl(m):
+        n = int(m.group(1))
+        i = refs[n] if refs and n < len(refs) else None
+        if i is None:
+            return ""
+        if used is not None:
+            used.add(i)
+        return render(i)
+
+    return PLACEHOLDER_RE.sub(repl, text)
+
+
+def tex_graphic(name, size):
+    """一张图片的 LaTeX：公式片段随文排版（垂直居中于基线附近），其余单独占一行居中"""
+    inc = r"\includegraphics[" + graphics_options(size) + "]{" + name + "}"
+    if size and size[1] <= INLINE_MAX_PX:
+        return r"\raisebox{-0.3\height}{" + inc + "}"
+    return r"\makebox[\linewidth]{" + inc + "}"
+
+
+def unplaced(refs, used):
+    """refs 中还没有被占位符放置的图片下标（去重，保持顺序）"""
+    out = []
+    for i in refs or ():
+        if i is not None and i not in used and i not in out:
+            out.append(i)
+    return out
+
+
+def legacy_refs(images):
+    """没有 image_refs 的旧记录：题干的 [IMAGE:n] 对应 images[n]，其余图片附在题干后"""
+    return {"question": list(range(len(images)))}
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+json2html.py - Render the pipeline's questions (JSON / JSON Lines / SQLite store) as HTML pages.
+由 python_20250825_MRKfRn.py 的 generate_html 演示脚本改写：
+- ✅ 读取 excel_to_pdf_fixed.py 输出的题目记录，支持与 json2pdf.py 相同的筛选参数
+- ✅ [IMAGE:n] 按 image_refs 原位替换为 <img>（loading="lazy"，带宽高，避免排版跳动）
+- ✅ 每页 N 道题分成多个文件，另写一个目录页；题块写入 StringIO 后整页写出
+- ✅ 正则、模板全部预先编译
+"""
+
+import io
+import os
+import re
+import html
+import argparse
+from pathlib import Path
+
+from question_io import record_key
+from question_store import SearchError, add_query_arguments, load_questions, query_from_args
+from image_refs import INLINE_MAX_PX, legacy_refs, resolve, unplaced
+from metrics import Metrics, add_profile_argument
+
+# --------------------------
+# 配置项
+# --------------------------
+
+PER_PAGE = 100   # 每个 HTML 文件的题数（0 = 全部写在一个文件）
+
+STYLE = """
+body { font-family: 'PingFang SC', 'Microsoft YaHei', sans-serif; line-height: 1.6; margin: 20px; background-color: #f9f9f9; }
+.container { max-width: 800px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 0 10px rgba(0,0,0,0.1); }
+h1 { text-align: center; color: #2c3e50; margin-bottom: 30px; border-bottom: 2px solid #3498db; padding-bottom: 10px; }
+.question { margin-bottom: 40px; padding: 20px; border: 1px solid #ddd; border-radius: 8px; background: #fff; }
+.question-number { font-size: 18px; font-weight: bold; color: #e74c3c; margin-bottom: 15px; }
+.info-table { width: 100%; border-collapse: collapse; margin-bottom: 15px; }
+.info-table th, .info-table td { border: 1px solid #ddd; padding: 8px 12px; text-align: left; }
+.info-table th { background-color: #f2f2f2; font-weight: bold; width: 100px; }
+.section-title { font-weight: bold; color: #2c3e50; margin: 15px 0 8px 0; }
+.options { margin-left: 20px; }
+.option { margin: 5px 0; }
+.answer { font-weight: bold; color: #27ae60; font-size: 16px; margin-top: 15px; padding: 10px; background-color: #ecf0f1; border-radius: 5px; }
+img { max-width: 100%; height: auto; }
+img.inline { vertical-align: middle; }
+.formula { display: block; margin: 10px 0; text-align: center; }
+.nav { display: flex; justify-content: space-between; margin: 20px 0; }
+"""
+
+PAGE_HEAD = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>%(title)s</title>
+<style>%(style)s</style>
+</head>
+<body>
+<div class="container">
+<h1>%(title)s</h1>
+"""
+
+PAGE_TAIL = """</div>
+</body>
+</html>
+"""
+
+INFO_FIELDS = (("题目类型", "type"), ("试卷类型", "paper_type"), ("难度", "difficulty"), ("年份", "year"),
+               ("来源", "source"))
+
+_SUPSUB_RE = re.compile(r"&lt;(/?)(sup|sub)&gt;")
+_NEWLINES_RE = re.compile(r"\n{2,}")
+_PLACEHOLDER_NL_RE = re.compile(r"[ \t]*\n?(\[IMAGE:\d+\])\n?[ \t]*")
+
+# --------------------------
+# 核心逻辑
+# --------------------------
+
+
+def text_to_html(text: str) -> str:
+    """清洗后的纯文本 → HTML：转义，保留 <sup>/<sub>，换行转 <br>，空行分段。
+
+    清洗器把图片前后的文字拆成单独的行；图片占位符两侧的换行改为空格，公式图片随文显示。
+    """
+    if not text:
+        return ""
+    if "[IMAGE:" in text:
+        text = _PLACEHOLDER_NL_RE.sub(r" \1 ", text)
+    s = html.escape(text, quote=False)
+    if "&lt;su" in s:
+        s = _SUPSUB_RE.sub(r"<\1\2>", s)
+    if "\n" in s:
+        s = _NEWLINES_RE.sub("<br><br>", s).replace("\n", "<br>")
+    return s
+
+
+def _cell(value) -> str:
+    if value is None or value != value or value == "":   # None / NaN / 空
+        return "未指定"
+    return html.escape(str(value).strip())
+
+
+class ImageRenderer:
+    """images 下标 → <img>；路径相对于输出目录，懒加载并写明显示尺寸"""
+
+    def __init__(self, outdir: Path):
+        self.outdir = outdir
+        self._rel = {}   # 多页共用：同一图片只计算一次相对路径
+
+    def rel(self, path: str) -> str:
+        r = self._rel.get(path)
+        if r is None:
+            r = self._rel[path] = html.escape(os.path.relpath(path, self.outdir).replace("\\", "/"))
+        return r
+
+    def tag(self, path: str, size) -> str:
+        attrs = f'src="{self.rel(path)}" loading="lazy" decoding="async" alt=""'
+        if size:
+            attrs += ' width="%d" height="%d"' % (round(size[0]), round(size[1]))
+            if size[1] <= INLINE_MAX_PX:
+                return f'<img class="inline" {attrs}>'
+        return f'<div class="formula"><img {attrs}></div>'
+
+
+def render_question(item: dict, number: int, images: ImageRenderer, answers: bool = True) -> str:
+    """一道题的 HTML 片段"""
+    paths = item.get("images") or []
+    sizes = item.get("image_sizes") or [None] * len(paths)
+    refs = item.get("image_refs") or legacy_refs(paths)
+    used = set()
+
+    def render(i):
+        return images.tag(paths[i], sizes[i])
+
+    def field(name, text):
+        # 没有占位符位置的图片附在字段末尾
+        body = resolve(text_to_html(text), refs.get(name), render, used)
+        rest = unplaced(refs.get(name), used)
+        used.update(rest)
+        return body + "".join(render(i) for i in rest)
+
+    out = ['<div class="question" id="q%d">\n<div class="question-number">题目 %d</div>\n'
+           '<table class="info-table">\n' % (number, number)]
+    for label, key in INFO_FIELDS:
+        if key in item:
+            out.append(f"<tr><th>{label}</th><td>{_cell(item.get(key))}</td></tr>\n")
+    out.append('</table>\n<div class="section-title">题目:</div>\n<div>')
+    out.append(field("question", item.get("question", "")))
+    out.append("</div>\n")
+    options = item.get("options") or {}
+    option_html = [resolve(text_to_html(options[k]), refs.get("options"), render, used) for k in sorted(options)]
+    leftover = field("options", "")
+    if options or leftover:
+        out.append('<div class="section-title">选项:</div>\n<div class="options">\n')
+        for k, v in zip(sorted(options), option_html):
+            out.append(f'<div class="option">{html.escape(k)}. {v}</div>\n')
+        out.append(leftover + "</div>\n")
+    if answers:
+        if item.get("explanation"):
+            out.append('<div class="section-title">解题思路:</div>\n<div>')
+            out.append(field("explanation", item["explanation"]))
+            out.append("</div>\n")
+        out.append(f'<div class="answer">答案: {html.escape(str(item.get("answer") or ""))}</div>\n')
+    out.append("</div>\n")
+    return "".join(out)
+
+
+def _page_name(stem: str, page: int) -> str:
+    return f"{stem}-{page:03d}.html"
+
+
+def _nav(stem: str, page: int, last: bool) -> str:
+    prev = f'<a href="{_page_name(stem, page - 1)}">← 上一页</a>' if page > 1 else "<span></span>"
+    index = f'<a href="{stem}.html">目录</a>'
+    nxt = "<span></span>" if last else f'<a href="{_page_name(stem, page + 1)}">下一页 →</a>'
+    return f'<div class="nav">{prev}{index}{nxt}</div>\n'
+
+
+def write_html(questions, outdir: Path, title: str, per_page: int = PER_PAGE, answers: bool = True,
+               stem: str = "questions", fragments: dict = None) -> list:
+    """流式写出 HTML：per_page > 0 时每页一个文件并写目录页 <stem>.html，否则只写 <stem>.html。
+
+    每页的题块先写进 StringIO；下一页的第一题出现后才写出本页（此时才知道是否还有下一页）。返回各页文件路径。
+    fragments 为跨次构建保留的 {(记录键, 题号): 题块} 缓存（watch 模式），结束时只留下本次用到的条目。
+    """
+    outdir.mkdir(parents=True, exist_ok=True)
+    images = ImageRenderer(outdir)
+    head = PAGE_HEAD % {"title": html.escape(title), "style": STYLE}
+    pages, ranges = [], []
+    buf, first, count = io.StringIO(), 1, 0
+
+    def flush(last):
+        page = len(pages) + 1
+        path = outdir / (_page_name(stem, page) if per_page else f"{stem}.html")
+        nav = _nav(stem, page, last) if per_page else ""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(head)
+            f.write(nav)
+            f.write(buf.getvalue())
+            f.write(nav)
+            f.write(PAGE_TAIL)
+        pages.append(path)
+        ranges.append((first, count))
+
+    used = {}
+    for number, item in enumerate(questions, start=1):
+        if per_page and count and count % per_page == 0:
+            flush(last=False)
+            buf, first = io.StringIO(), number
+        if fragments is None:
+            buf.write(render_question(item, number, images, answers))
+        else:
+            key = (record_key(item), number)
+            block = used[key] = fragments.get(key) or render_question(item, number, images, answers)
+            buf.write(block)
+        count = number
+    if fragments is not None:
+        fragments.clear()
+        fragments.update(used)
+    if count or not pages:
+        flush(last=True)
+
+    if per_page:
+        with open(outdir / f"{stem}.html", "w", encoding="utf-8") as f:
+            f.write(head)
+            f.write(f"<p>共 {count} 题，{len(pages)} 页</p>\n<ul>\n")
+            for path, (a, b) in zip(pages, ranges):
+                f.write(f'<li><a href="{path.name}">题目 {a}–{b}</a></li>\n')
+            f.write("</ul>\n")
+            f.write(PAGE_TAIL)
+    return pages
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Convert JSON questions to paginated HTML")
+    parser.add_argument("-i", "--input", required=True,
+                        help="Path to JSON, JSON Lines (.jsonl) or SQLite store (.db)")
+    parser.add_argument("-o", "--outdir", default="output", help="Output directory (image paths are made relative to it)")
+    parser.add_argument("-t", "--title", default="物理题目集", help="Page title")
+    parser.add_argument("--per-page", type=int, default=PER_PAGE,
+                        help="Questions per HTML file, with an index page (0 = a single file)")
+    parser.add_argument("--no-answers", action="store_true", help="Leave out answers and explanations")
+    add_query_arguments(parser)
+    add_profile_argument(parser)
+
+    args = parser.parse_args(argv)
+    metrics = Metrics("json2html", args.profile)
+    query = query_from_args(args)
+    outdir = Path(args.outdir)
+    try:
+        with metrics.stage("html_emit") as st:
+            pages = write_html(load_questions(Path(args.input), query), outdir, args.title, args.per_page,
+                               not args.no_answers)
+            st.update({"items": len(pages), "bytes": sum(p.stat().st_size for p in pages)})
+    except SearchError as e:
+        print(f"[FAIL] {e}")
+        raise SystemExit(1)
+    entry = outdir / "questions.html"
+    print(f"[OK] HTML written to: {entry} ({len(pages)} page{'s' if len(pages) != 1 else ''})")
+    metrics.meta.update({"input": args.input, "filters": not query.is_empty()})
+    metrics.finish(outdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,15 +12,25 @@ json2pdf.py - Convert a structured JSON with questions into a PDF (via LaTeX).
 import os
 import json
 import shutil
+import hashlib
 import argparse
 from pathlib import Path
-import subprocess
+import time
 import re
 
+from tex_escape import escape_latex_math
+from question_store import QuestionQuery, SearchError, add_query_arguments, load_questions, query_from_args
+from tex_shards import LATEX_ENGINE, compile_digest, compile_sharded, latex_output, report_errors
+from tex_format import run_latex
+from build_manifest import BuildManifest
+from image_refs import legacy_refs, resolve, tex_graphic, unplaced
+from metrics import Metrics, add_profile_argument
+
 # --------------------------
 # 配置项
 # --------------------------
 
+# \csname endofdump\endcsname 之前为稳定的导言区，编译时转储为格式复用（见 tex_format.py）；字体与标题每次执行
 LATEX_TEMPLATE = r"""
 \documentclass[12pt]{article}
 \usepackage{xeCJK}
@@ -32,6 +42,7 @@ LATEX_TEMPLATE = r"""
 \usepackage{titlesec}
 \usepackage{enumitem}
 \usepackage{caption}
+\csname endofdump\endcsname
 
 \setCJKmainfont{SimSun}
 \setmainfont{Times New Roman}
@@ -76,123 +87,250 @@ IMAGE_BLOCK = r"""
 \end{center}
 """
 
+WRITE_BUFFER = 1 << 20   # .tex 输出缓冲区大小
+BUILD_VERSION = 2        # 渲染/转义逻辑变化时递增，使构建清单中的旧记录全部失效
+QUESTION_START_RE = re.compile(r"\\noindent\s*$")   # 分片编译时每个题块的起始行
+
 # --------------------------
-# 核心逻辑
+# 预编译模板
 # --------------------------
 
+_FIELD_RE = re.compile(r"%(?:\((\w+)\)([sd])|%)")
+
 
-def escape_latex_math(text: str) -> str:
-    """把 JSON 中的数学符号替换为 LaTeX 语法"""
-    if not text:
-        return ""
+class CompiledTemplate:
+    """把 %(name)s 风格的模板预先拆成字面量与字段，渲染时不再解析格式串"""
 
-    replacements = {
-        "⋅": r"\cdot ",
-        "∙": r"\cdot ",
-        "·": r"\cdot ",
-        "√": r"\sqrt{}",
-        "∣": r"|",
-        "∘": r"\circ ",
-        "≤": r"\leq ",
-        "≥": r"\geq ",
-        "≠": r"\neq ",
-        "⟹": r"\implies ",
-        "→": r"\to ",
-        "∞": r"\infty ",
-    }
+    def __init__(self, template: str):
+        self.parts = []   # (字面量, 字段名, 转换符)；最后一项字段名为 None
+        pos = 0
+        lit = []
+        for m in _FIELD_RE.finditer(template):
+            lit.append(template[pos:m.start()])
+            pos = m.end()
+            if m.group(1) is None:   # "%%"
+                lit.append("%")
+                continue
+            self.parts.append(("".join(lit), m.group(1), m.group(2)))
+            lit = []
+        lit.append(template[pos:])
+        self.parts.append(("".join(lit), None, None))
 
-    # 替换特殊符号
-    for k, v in replacements.items():
-        text = text.replace(k, v)
+    def pieces(self, values: dict):
+        for lit, name, conv in self.parts:
+            yield lit
+            if name is not None:
+                v = values[name]
+                yield "%d" % v if conv == "d" else str(v)
 
-    # 替换 Unicode 数学斜体字母 (𝑎..𝑧, 𝐴..𝑍)
-    text = re.sub(r"[𝑎-𝑧𝐴-𝑍]", lambda m: f"${m.group(0)}$", text)
+    def render(self, values: dict) -> str:
+        return "".join(self.pieces(values))
 
-    # 确保 a^2, m_0 这种公式被包裹
-    text = re.sub(r"([A-Za-z0-9]+[\^_][A-Za-z0-9]+)", r"$\1$", text)
+    def write(self, f, values: dict):
+        f.writelines(self.pieces(values))
 
-    return text
 
+def _split_template(template: str, field: str):
+    """按 %(field)s 把整页模板拆成前后两段，分别预编译"""
+    head, tail = template.split("%%(%s)s" % field, 1)
+    return CompiledTemplate(head), CompiledTemplate(tail)
 
-def json_to_latex(input_path: Path, outdir: Path, title: str) -> Path:
-    """读取 JSON 文件并生成 LaTeX 文件"""
-    with open(input_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
 
-    if isinstance(data, list):
-        questions = data
-    else:
-        questions = data.get("questions", [])
+PREAMBLE, POSTAMBLE = _split_template(LATEX_TEMPLATE, "body")
+QUESTION_TPL = CompiledTemplate(QUESTION_BLOCK)
+IMAGE_TPL = CompiledTemplate(IMAGE_BLOCK)
+
+# --------------------------
+# 核心逻辑
+# --------------------------
+
 
-    body_parts = []
+def _image_sources(item):
+    """题目引用的全部图片：images 列表，以及旧格式的单个 image 字段"""
+    srcs = [Path(p) for p in item.get("images") or []]
+    if item.get("image"):
+        srcs.append(Path(item["image"]))
+    return srcs
+
+
+def _copy_image(src: Path, image_dir: Path):
+    """把图片复制到 images/（\\graphicspath）下，返回文件名；源文件不存在时返回 None"""
+    if not src.exists():
+        print(f"[WARN] Image not found: {src}")
+        return None
+    shutil.copy(src, image_dir / src.name)
+    return src.name
+
+
+def input_digest(input_path: Path, title: str, manifest: BuildManifest, query: QuestionQuery = None) -> str:
+    """questions.tex 全部输入的摘要：模板、标题、选中的题目记录与引用图片的内容"""
+    h = hashlib.sha256()
+    for part in (str(BUILD_VERSION), LATEX_TEMPLATE, QUESTION_BLOCK, IMAGE_BLOCK, title or "Questions"):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    for item in load_questions(input_path, query):
+        h.update(json.dumps(item, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+        for src in _image_sources(item):
+            h.update(b"\0" + (manifest.file_digest(src) or "missing").encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def write_latex(questions, tex_path: Path, title: str, image_dir: Path, start: int = 1) -> int:
+    """把题目流式写成 LaTeX：先写导言区，再逐题写出题块，最后写结尾；返回题目数"""
+    count = 0
+    with open(tex_path, "w", encoding="utf-8", buffering=WRITE_BUFFER) as f:
+        PREAMBLE.write(f, {"title": title or "Questions"})
+        for idx, item in enumerate(questions, start=start):
+            # [IMAGE:n] 按 image_refs 原位替换；没有占位符位置的图片放在题干后的图片块
+            images = item.get("images") or []
+            sizes = item.get("image_sizes") or [None] * len(images)
+            refs = item.get("image_refs") or legacy_refs(images)
+            names = {}
+
+            def name_of(i):
+                if i not in names:
+                    names[i] = _copy_image(Path(images[i]), image_dir)
+                return names[i]
+
+            def render(i):
+                name = name_of(i)
+                return tex_graphic(name, sizes[i]) if name else ""
+
+            used = set()
+            options = item.get("options", {})
+            fields = {"question": resolve(escape_latex_math(item.get("question", "")), refs.get("question"), render, used)}
+            for k in "ABCD":
+                fields[k] = resolve(escape_latex_math(options.get(k, "")), refs.get("options"), render, used)
+            fields["explanation"] = resolve(escape_latex_math(item.get("explanation", "")),
+                                            refs.get("explanation"), render, used)
+
+            image_block = ""
+            for field in ("question", "options", "explanation"):
+                for i in unplaced(refs.get(field), used):
+                    used.add(i)
+                    if name_of(i):
+                        image_block += IMAGE_TPL.render({"filename": name_of(i)})
+            if item.get("image"):
+                name = _copy_image(Path(item["image"]), image_dir)
+                if name:
+                    image_block += IMAGE_TPL.render({"filename": name})
+
+            if count:
+                f.write("\n")
+            QUESTION_TPL.write(f, {
+                "id": idx,
+                "question": fields["question"],
+                "A": fields["A"],
+                "B": fields["B"],
+                "C": fields["C"],
+                "D": fields["D"],
+                "answer": escape_latex_math(item.get("answer", "")),
+                "explanation": fields["explanation"],
+
+                "image_block": image_block
+            })
+            count += 1
+        POSTAMBLE.write(f, {})
+    return count
+
+
+def json_to_latex(input_path: Path, outdir: Path, title: str, manifest: BuildManifest = None,
+                  query: QuestionQuery = None, metrics: Metrics = None) -> Path:
+    """读取 JSON / JSON Lines 文件或 SQLite 题库（逐题流式读取，按 query 筛选）并生成 LaTeX 文件；输入未变化时沿用已有文件"""
     image_dir = outdir / "images"
     image_dir.mkdir(exist_ok=True)
 
-    for idx, item in enumerate(questions, start=1):
-        image_block = ""
-        if "image" in item and item["image"]:
-            src = Path(item["image"])
-            if src.exists():
-                dst = image_dir / src.name
-                shutil.copy(src, dst)
-                image_block = IMAGE_BLOCK % {"filename": src.name}
-            else:
-                print(f"[WARN] Image not found: {src}")
-
-        body_parts.append(QUESTION_BLOCK % {
-            "id": idx,
-            "question": escape_latex_math(item.get("question", "")),
-            "A": escape_latex_math(item.get("options", {}).get("A", "")),
-            "B": escape_latex_math(item.get("options", {}).get("B", "")),
-            "C": escape_latex_math(item.get("options", {}).get("C", "")),
-            "D": escape_latex_math(item.get("options", {}).get("D", "")),
-            "answer": escape_latex_math(item.get("answer", "")),
-            "explanation": escape_latex_math(item.get("explanation", "")),
-
-            "image_block": image_block
-        })
-
-    latex_code = LATEX_TEMPLATE % {
-        "title": title or "Questions",
-        "body": "\n".join(body_parts)
-    }
-
     tex_path = outdir / "questions.tex"
-    with open(tex_path, "w", encoding="utf-8") as f:
-        f.write(latex_code)
+    if manifest is not None:
+        digest = input_digest(input_path, title, manifest, query)
+        if manifest.up_to_date(tex_path.name, digest, [tex_path]):
+            print(f"[OK] Inputs unchanged, reusing: {tex_path}")
+            if metrics is not None:
+                metrics.record("latex_emit", cache_hits=1)
+            return tex_path
+    n = write_latex(load_questions(input_path, query), tex_path, title, image_dir)
+    if metrics is not None:
+        metrics.record("latex_emit", items=n, bytes=tex_path.stat().st_size, cache_misses=1)
+    if query is not None and not query.is_empty():
+        print(f"[OK] {n} questions matched the filters")
+    if manifest is not None:
+        manifest.record(tex_path.name, digest)
+        manifest.save()
 
     print(f"[OK] LaTeX file written to: {tex_path}")
     return tex_path
 
 
-def compile_latex(tex_path: Path):
-    """调用 XeLaTeX 编译 LaTeX 文件"""
-    try:
-        subprocess.run(
-            ["xelatex", "-interaction=nonstopmode", "-output-directory", str(tex_path.parent), str(tex_path)],
-            check=True
-        )
-        print(f"[OK] PDF generated at: {tex_path.with_suffix('.pdf')}")
-    except subprocess.CalledProcessError as e:
-        print(f"[FAIL] XeLaTeX compilation failed: {e}")
-
-
-def main():
-    parser = argparse.ArgumentParser(description="Convert JSON questions to PDF via LaTeX")
-    parser.add_argument("-i", "--input", required=True, help="Path to JSON input file")
+def compile_latex(tex_path: Path, manifest: BuildManifest = None) -> str:
+    """调用 XeLaTeX 编译 LaTeX 文件；源码与图片都未变化且 PDF 仍在时跳过；返回 reused / compiled / failed。
+
+    写出了新的 PDF 即为成功（可恢复的 LaTeX 错误只报警告，见 tex_shards.latex_output），此时记入构建清单。
+    """
+    pdf_path = tex_path.with_suffix(".pdf")
+    if manifest is not None:
+        digest = compile_digest(tex_path, 1, tex_path.parent, LATEX_ENGINE, manifest)
+        if manifest.up_to_date(pdf_path.name, digest, [pdf_path]):
+            print(f"[OK] PDF up to date: {pdf_path}")
+            return "reused"
+    started = time.time()
+    proc = run_latex(LATEX_ENGINE, ["-interaction=nonstopmode", "-output-directory", str(tex_path.parent),
+                                    str(tex_path)], tex_path, tex_path.parent)
+    pages, errors = latex_output(tex_path, started)
+    if pages is None:
+        print(f"[FAIL] XeLaTeX compilation failed (exit status {proc.returncode}), see {tex_path.with_suffix('.log')}")
+        return "failed"
+    report_errors(tex_path, errors)
+    print(f"[OK] PDF generated at: {pdf_path} ({pages} pages)")
+    if manifest is not None:
+        manifest.record(pdf_path.name, digest)
+        manifest.save()
+    return "compiled"
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Convert JSON questions to PDF via LaTeX")
+    parser.add_argument("-i", "--input", required=True,
+                        help="Path to JSON, JSON Lines (.jsonl) or SQLite store (.db, see excel_to_pdf_fixed.py --store)")
     parser.add_argument("-o", "--outdir", default="output", help="Output directory")
     parser.add_argument("-t", "--title", default="Questions", help="Title of the PDF")
     parser.add_argument("--no-compile", action="store_true", help="Only generate .tex, do not compile PDF")
-
-    args = parser.parse_args()
+    parser.add_argument("--shards", type=int, default=1,
+                        help="Split the document into N shards, compile them concurrently and merge the PDFs")
+    parser.add_argument("--force", action="store_true",
+                        help="Ignore the build manifest and regenerate/recompile everything")
+    add_query_arguments(parser)
+    add_profile_argument(parser)
+
+    args = parser.parse_args(argv)
+    metrics = Metrics("json2pdf", args.profile)
     input_path = Path(args.input)
     outdir = Path(args.outdir)
     outdir.mkdir(exist_ok=True)
 
-    tex_path = json_to_latex(input_path, outdir, args.title)
+    # 构建清单记录各产物的输入摘要，未变化的 .tex / 分片 / PDF 直接复用
+    manifest = None if args.force else BuildManifest(outdir)
+    query = query_from_args(args)
+    try:
+        with metrics.stage("latex_emit"):
+            tex_path = json_to_latex(input_path, outdir, args.title, manifest, query, metrics)
+    except SearchError as e:
+        print(f"[FAIL] {e}")
+        raise SystemExit(1)
 
     if not args.no_compile:
-        compile_latex(tex_path)
+        # xelatex 是子进程，其 CPU 时间记入 child_cpu_s
+        with metrics.stage("xelatex") as st:
+            if args.shards > 1:
+                ok = compile_sharded(tex_path, args.shards, QUESTION_START_RE, manifest=manifest)
+                st.add("failed", int(ok is None))
+            else:
+                status = compile_latex(tex_path, manifest)
+                st.update({"cache_hits": int(status == "reused"), "cache_misses": int(status != "reused"),
+                           "failed": int(status == "failed")})
+
+    metrics.meta.update({"input": str(input_path), "filters": not query.is_empty()})
+    metrics.finish(outdir)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,191 @@
+# metrics.py
+"""各阶段耗时与计数：墙钟时间、本进程 CPU 时间、子进程（进程池、xelatex）CPU 时间，以及条目数、字节数、
+缓存命中/未命中、失败原因等计数；内存记录进程 RSS 峰值（max_rss_mb，截至该阶段结束），
+以 PYTHONTRACEMALLOC=1 运行时另记各阶段内 Python 已分配内存的峰值（py_peak_mb，含之前阶段仍存活的对象；
+阶段不嵌套时准确）。
+
+脚本加 --profile 时，每次运行把一份 JSON 报告追加到输出目录的 metrics.jsonl（每行一次运行，便于比较不同
+题库规模、不同版本之间的变化）；--profile cprofile 另外把 cProfile 结果写到 <脚本名>.prof。
+不加 --profile 时只做计时，不写文件。
+"""
+import os
+import sys
+import json
+import time
+import platform
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+METRICS_NAME = "metrics.jsonl"
+REPORT_VERSION = 1
+PROFILE_MODES = ("json", "cprofile")
+
+
+def add_profile_argument(parser):
+    parser.add_argument("--profile", nargs="?", const="json", choices=PROFILE_MODES,
+                        help=f"Append a per-stage timing/counter report to <outdir>/{METRICS_NAME}; "
+                             "'--profile cprofile' also writes a cProfile dump (<script>.prof)")
+
+
+def _cpu():
+    """(本进程 CPU 秒, 已回收子进程 CPU 秒)"""
+    t = os.times()
+    return t.user + t.system, t.children_user + t.children_system
+
+
+def max_rss_mb(who="self"):
+    """本进程（或已回收子进程中最大者，who="children"）的 RSS 峰值（MB）；不支持的平台返回 None"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN)
+    # Linux 以 KB 计，macOS 以字节计
+    return round(usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class Stage:
+    """一个阶段的累计结果；同名阶段多次进入时累加"""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.child_cpu_s = 0.0
+        self.max_rss_mb = None
+        self.py_peak_mb = None
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add(self, key, n=1):
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def update(self, counters):
+        """累加一组计数；值为 dict 时（如失败原因）逐项累加"""
+        for key, value in counters.items():
+            if isinstance(value, dict):
+                with self._lock:
+                    sub = self.counters.setdefault(key, {})
+                    for k, v in value.items():
+                        sub[k] = sub.get(k, 0) + v
+            elif value is not None:
+                self.add(key, value)
+
+    def as_dict(self):
+        out = {"name": self.name, "calls": self.calls, "wall_s": round(self.wall_s, 4),
+               "cpu_s": round(self.cpu_s, 4), "child_cpu_s": round(self.child_cpu_s, 4)}
+        if self.max_rss_mb is not None:
+            out["max_rss_mb"] = self.max_rss_mb
+        if self.py_peak_mb is not None:
+            out["py_peak_mb"] = self.py_peak_mb
+        out.update(self.counters)
+        return out
+
+
+class Metrics:
+    """一次运行的阶段记录；profile 为 None / "json" / "cprofile"（后者同时启用 cProfile）"""
+
+    def __init__(self, script, profile=None):
+        self.script = script
+        self.profile = profile
+        self.stages = {}
+        self.meta = {}
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+        self._cpu0 = _cpu()
+        self._started = datetime.now(timezone.utc)
+        self._profiler = None
+        if profile == "cprofile":
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def _stage(self, name):
+        with self._lock:
+            st = self.stages.get(name)
+            if st is None:
+                st = self.stages[name] = Stage(name)
+            return st
+
+    @contextmanager
+    def stage(self, name, **counters):
+        """计时一个阶段，产出 Stage 以便记录计数：with metrics.stage("json_write") as st: st.add("items", n)"""
+        st = self._stage(name)
+        st.update(counters)
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        t0, (cpu0, child0) = time.perf_counter(), _cpu()
+        try:
+            yield st
+        finally:
+            cpu1, child1 = _cpu()
+            peak = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1) if tracing else None
+            rss = max_rss_mb()
+            with st._lock:
+                st.calls += 1
+                st.wall_s += time.perf_counter() - t0
+                st.cpu_s += cpu1 - cpu0
+                st.child_cpu_s += child1 - child0
+                if rss is not None:
+                    st.max_rss_mb = max(st.max_rss_mb or 0.0, rss)
+                if peak is not None:
+                    st.py_peak_mb = max(st.py_peak_mb or 0.0, peak)
+
+    def record(self, name, wall_s=0.0, cpu_s=0.0, **counters):
+        """不经 stage() 直接累加计数与耗时（例如在子进程中测得、各进程求和的时间）"""
+        st = self._stage(name)
+        st.update(counters)
+        with st._lock:
+            st.wall_s += wall_s
+            st.cpu_s += cpu_s
+
+    def report(self):
+        cpu1, child1 = _cpu()
+        return {
+            "version": REPORT_VERSION,
+            "script": self.script,
+            "started": self._started.isoformat(timespec="seconds"),
+            "argv": sys.argv[1:],
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "meta": self.meta,
+            "total": {"wall_s": round(time.perf_counter() - self._t0, 4),
+                      "cpu_s": round(cpu1 - self._cpu0[0], 4),
+                      "child_cpu_s": round(child1 - self._cpu0[1], 4),
+                      "max_rss_mb": max_rss_mb(), "child_max_rss_mb": max_rss_mb("children")},
+            "stages": [st.as_dict() for st in self.stages.values()],
+        }
+
+    def finish(self, outdir):
+        """--profile 时写出报告（与 cProfile 结果）并打印各阶段耗时；返回报告，未启用时返回 None"""
+        if not self.profile:
+            return None
+        if self._profiler is not None:
+            self._profiler.disable()
+        report = self.report()
+        os.makedirs(outdir, exist_ok=True)
+        path = os.path.join(outdir, METRICS_NAME)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(report, ensure_ascii=False) + "\n")
+        print(f"{'stage':<16}{'wall s':>9}{'cpu s':>9}{'child s':>9}  counters")
+        for st in report["stages"]:
+            extra = {k: v for k, v in st.items() if k not in ("name", "calls", "wall_s", "cpu_s", "child_cpu_s")}
+            print(f"{st['name']:<16}{st['wall_s']:>9.3f}{st['cpu_s']:>9.3f}{st['child_cpu_s']:>9.3f}  "
+                  + json.dumps(extra, ensure_ascii=False))
+        total = report["total"]
+        print(f"{'total':<16}{total['wall_s']:>9.3f}{total['cpu_s']:>9.3f}{total['child_cpu_s']:>9.3f}")
+        print(f"[OK] metrics appended to {path}")
+        if self._profiler is not None:
+            prof = os.path.join(outdir, f"{self.script}.prof")
+            self._profiler.dump_stats(prof)
+            print(f"[OK] cProfile dump: {prof} (python -m pstats {prof})")
+        return report
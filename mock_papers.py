@@ -0,0 +1,194 @@
+# mock_papers.py
+"""模拟卷生成：按 paper_type × 难度分层抽题，一次生成一组互不重复的试卷（练习卷 + 答案卷）。
+
+- 第一遍只读取各题的 paper_type / 难度，按分层预先建好下标数组；抽题用带种子的 NumPy RNG，
+  已用过的题记在布尔掩码里，同一组试卷之间不重复（--exclude 可排除以前生成过的试卷中的题）。
+- 第二遍只取出被抽中的题目，全部试卷在同一进程内经 TexWriter 渲染（试卷与答案卷一次写出）；--compile 时各卷并发编译，
+  构建清单中未变化的试卷直接复用上次的 PDF。
+- 抽题结果写入 papers.json（各卷题目的原 id），可作为下一组试卷的 --exclude。
+"""
+import os
+import json
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from question_store import load_questions
+from excel_to_pdf_fixed import TexWriter
+from tex_shards import LATEX_ENGINE, compile_digest, compile_shard
+from build_manifest import BuildManifest
+
+PAPERS_NAME = "papers.json"
+ANY = "*"
+
+
+def stratum_key(q):
+    """(paper_type, 难度)，去掉首尾空白，缺失为空串"""
+    return tuple(str(q.get(k) or "").strip() for k in ("paper_type", "difficulty"))
+
+
+def parse_take(text):
+    """"Mechanics=10" / "Mechanics:适中=5" / "*:较难=3" → (paper_type, 难度, 题数)；* 表示不限"""
+    spec, sep, count = text.rpartition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected PAPER_TYPE[:DIFFICULTY]=N, got {text!r}")
+    paper_type, _, difficulty = spec.partition(":")
+    try:
+        n = int(count)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid question count in {text!r}")
+    return paper_type.strip() or ANY, difficulty.strip() or ANY, n
+
+
+class PaperSampler:
+    """分层抽题：strata 为 {(paper_type, 难度): 题目下标数组}，used 为跨试卷共享的已用掩码"""
+
+    def __init__(self, keys, seed=None, exclude=()):
+        self.rng = np.random.default_rng(seed)
+        codes = {}
+        labels = np.fromiter((codes.setdefault(k, len(codes)) for k in keys), dtype=np.int64)
+        order = np.argsort(labels, kind="stable")
+        bounds = np.searchsorted(labels[order], np.arange(len(codes) + 1))
+        self.strata = {k: order[bounds[c]:bounds[c + 1]] for k, c in codes.items()}
+        self.used = np.zeros(len(labels), dtype=bool)
+        if len(exclude):
+            self.used[np.asarray(list(exclude), dtype=np.int64)] = True
+
+    def pool(self, paper_type=ANY, difficulty=ANY):
+        """满足条件的全部题目下标（升序）"""
+        parts = [idx for (p, d), idx in self.strata.items()
+                 if paper_type in (ANY, p) and difficulty in (ANY, d)]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+    def draw(self, blueprint):
+        """按 blueprint [(paper_type, 难度, 题数)] 抽一套题，返回下标数组（按 blueprint 顺序，组内保持原顺序）"""
+        picked = []
+        for paper_type, difficulty, n in blueprint:
+            pool = self.pool(paper_type, difficulty)
+            free = pool[~self.used[pool]]
+            if len(free) < n:
+                raise ValueError(f"{paper_type}:{difficulty} 只剩 {len(free)} 道未用过的题，不够抽 {n} 道")
+            choice = np.sort(self.rng.choice(free, size=n, replace=False))
+            self.used[choice] = True
+            picked.append(choice)
+        return np.concatenate(picked) if picked else np.empty(0, dtype=np.int64)
+
+
+def load_excluded(paths):
+    """读取以前生成的 papers.json（或每行一个 id 的文本文件）中的题目 id"""
+    ids = set()
+    for path in paths or ():
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        try:
+            data = json.loads(text)
+        except ValueError:
+            ids.update(line.strip() for line in text.splitlines() if line.strip())
+            continue
+        for paper in data.get("papers", []):
+            ids.update(paper["ids"])
+    return ids
+
+
+def number_questions(records):
+    """按 TexWriter 的分组顺序（paper_type 首次出现的顺序）排列并编号 Q1, Q2, …"""
+    groups = {}
+    for q in records:
+        groups.setdefault(q.get("paper_type") or "General", []).append(q)
+    ordered = [q for g in groups.values() for q in g]
+    return [dict(q, id=f"Q{n}") for n, q in enumerate(ordered, start=1)], [q.get("id") for q in ordered]
+
+
+def compile_papers(tex_files, workers, manifest):
+    """并发编译各试卷；输入未变化且 PDF 仍在的直接复用。写出了新的 PDF 即为成功（可恢复的 LaTeX 错误只报警告）"""
+    def run(tex):
+        tex = Path(tex)
+        pdf = tex.with_suffix(".pdf")
+        digest = compile_digest(tex, 1, tex.parent, LATEX_ENGINE, manifest)
+        if manifest.up_to_date(pdf.name, digest, [pdf]):
+            return "reused", tex
+        _, _, pages = compile_shard(tex, 1, tex.parent)
+        if pages is not None:
+            manifest.record(pdf.name, digest)
+            return "compiled", tex
+        return "failed", tex
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(run, tex_files))
+    manifest.save()
+    for status, tex in results:
+        if status == "failed":
+            print(f"[FAIL] 编译失败，详见 {tex.with_suffix('.log')}")
+    counts = {s: sum(r[0] == s for r in results) for s in ("compiled", "reused", "failed")}
+    print(f"[OK] 编译 {counts['compiled']} 份，复用 {counts['reused']} 份，失败 {counts['failed']} 份")
+    return counts["failed"] == 0
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Assemble randomised mock papers by paper type and difficulty")
+    parser.add_argument("-i", "--input", required=True, help="questions.json / .jsonl or SQLite store (.db)")
+    parser.add_argument("-o", "--outdir", default="output/mocks", help="Output directory")
+    parser.add_argument("-n", "--papers", type=int, default=1, help="Number of papers to generate")
+    parser.add_argument("--take", type=parse_take, action="append", default=[],
+                        help="PAPER_TYPE[:DIFFICULTY]=N questions per paper; repeatable, * matches any")
+    parser.add_argument("--per-stratum", type=int, default=0,
+                        help="N questions from every paper type × difficulty stratum (used when --take is absent)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed (same seed and bank = same papers)")
+    parser.add_argument("--exclude", action="append",
+                        help="papers.json from an earlier series (or a file of ids) whose questions must not reappear")
+    parser.add_argument("--prefix", default="mock", help="File name prefix of the papers")
+    parser.add_argument("--compile", action="store_true", help="Compile the papers with xelatex")
+    parser.add_argument("-w", "--workers", type=int, default=0, help="Concurrent xelatex runs (0 = CPU count)")
+    args = parser.parse_args(argv)
+
+    # 第一遍：只保留分层键与 id
+    keys, ids = [], []
+    for q in load_questions(args.input):
+        keys.append(stratum_key(q))
+        ids.append(q.get("id"))
+    excluded = load_excluded(args.exclude)
+    sampler = PaperSampler(keys, args.seed, [i for i, qid in enumerate(ids) if qid in excluded])
+    blueprint = args.take or [(p, d, args.per_stratum) for p, d in sampler.strata if args.per_stratum]
+    if not blueprint:
+        parser.error("give --take PAPER_TYPE[:DIFFICULTY]=N or --per-stratum N")
+    print(f"题库 {len(keys)} 题，{len(sampler.strata)} 个分层，排除 {int(sampler.used.sum())} 题；"
+          f"每卷 {sum(n for _, _, n in blueprint)} 题，共 {args.papers} 卷")
+
+    try:
+        papers = [sampler.draw(blueprint) for _ in range(args.papers)]
+    except ValueError as e:
+        print(f"[FAIL] {e}")
+        raise SystemExit(1)
+
+    # 第二遍：只取出被抽中的题目
+    wanted = {int(i) for p in papers for i in p}
+    records = {i: q for i, q in enumerate(load_questions(args.input)) if i in wanted}
+
+    outdir = Path(args.outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    index, tex_files = [], []
+    for k, picked in enumerate(papers, start=1):
+        name = f"{args.prefix}_{k:02d}"
+        numbered, source_ids = number_questions([records[int(i)] for i in picked])
+        paths = {"practice": outdir / f"{name}.tex", "answers": outdir / f"{name}_answers.tex"}
+        # 试卷与答案卷由同一份逐题中间表示一次写出
+        with TexWriter({v: str(p) for v, p in paths.items()}) as w:
+            for q in numbered:
+                w.add(q)
+        tex_files.extend(paths.values())
+        index.append({"name": name, "ids": source_ids})
+
+    with open(outdir / PAPERS_NAME, "w", encoding="utf-8") as f:
+        json.dump({"input": str(args.input), "seed": args.seed, "blueprint": blueprint, "papers": index},
+                  f, ensure_ascii=False, indent=2)
+    print(f"[DONE] 已生成 {len(papers)} 套试卷（含答案卷），抽题记录: {outdir / PAPERS_NAME}")
+
+    if args.compile:
+        ok = compile_papers(tex_files, args.workers or os.cpu_count() or 1, BuildManifest(outdir))
+        raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+# question_dedup.py
+"""题目去重与内容 id：多个题库合并时，同一道题只保留一份。
+
+- 完全重复：题干、选项、答案经规范化（NFKC、忽略大小写与空白、去掉 [IMAGE:n]）后，连同图片地址一起取 sha256，
+  摘要相同即视为同一道题。内容 id 取自该摘要，与题目在哪个工作簿、第几行无关，重新导出后保持不变。
+- 近似重复：对字符 k-gram（加上图片地址）做 MinHash 签名，按 LSH 分桶只比较同桶的候选对，
+  Jaccard 相似度不低于阈值、答案相同且文中数字完全一致才算重复（改了数据的变式题不算），不做 O(n²) 的两两比较。
+- 重复的题目保留最先出现的一条（按输入工作簿顺序、行顺序）。
+"""
+import re
+import json
+import zlib
+import hashlib
+import unicodedata
+
+ID_PREFIX = "Q"
+ID_HEX = 10               # 内容 id 的十六进制位数（40 bit）
+SHINGLE_K = 5             # 字符 k-gram 长度
+NUM_PERM = 128            # MinHash 签名长度
+LSH_BANDS = 32            # LSH 分段数，每段 NUM_PERM // LSH_BANDS 行；候选阈值约 (1/32)^(1/4) ≈ 0.42
+NEAR_DUP_THRESHOLD = 0.9  # 近似重复的 Jaccard 阈值
+MINHASH_SEED = 20250825
+
+_IMG_SRC_RE = re.compile(r"""<img\b[^>]*?\bsrc\s*=\s*["']?([^"'\s>]+)""", re.I)
+_PLACEHOLDER_RE = re.compile(r"\[IMAGE:\d+\]")
+_SPACE_RE = re.compile(r"\s+")
+_ANSWER_SEP_RE = re.compile(r"[\s,，、;；/]+")
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+def normalize_text(s):
+    """比较用的文本：NFKC、忽略大小写、去掉图片占位符与全部空白"""
+    if not isinstance(s, str) or not s:
+        return ""
+    s = unicodedata.normalize("NFKC", s).casefold()
+    return _SPACE_RE.sub("", _PLACEHOLDER_RE.sub("", s))
+
+
+def normalize_answer(s):
+    """"A, B" / "a、b" / "AB" 视为同一答案"""
+    if not isinstance(s, str):
+        s = "" if s is None else str(s)
+    return _ANSWER_SEP_RE.sub("", unicodedata.normalize("NFKC", s)).upper()
+
+
+def image_keys(*raw_cells):
+    """单元格 HTML 中图片地址的列表（去掉查询串），作为题目内容的一部分"""
+    out = []
+    for raw in raw_cells:
+        if isinstance(raw, str) and "<img" in raw.lower():
+            out.extend(m.split("?", 1)[0] for m in _IMG_SRC_RE.findall(raw))
+    return out
+
+
+def _options_text(options):
+    return "".join(f"{k}:{normalize_text(v)};" for k, v in sorted((options or {}).items()))
+
+
+def exact_key(question, options, answer, images=()):
+    """规范化内容的 sha256"""
+    payload = [normalize_text(question), _options_text(options), normalize_answer(answer), list(images)]
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def content_id(key):
+    """由 exact_key 得到的稳定题目 id，如 Q3fa9c2e17b"""
+    return ID_PREFIX + key[:ID_HEX]
+
+
+class IdAssigner:
+    """逐个分配内容 id（assign_ids 的流式版本）：assign = IdAssigner(); assign(key)"""
+
+    def __init__(self):
+        self.seen = {}
+
+    def __call__(self, key):
+        base = content_id(key)
+        n = self.seen[base] = self.seen.get(base, 0) + 1
+        return base if n == 1 else f"{base}-{n}"
+
+
+def assign_ids(keys):
+    """按顺序为 exact_key 列表分配内容 id；未去重时完全相同的题目依次加 -2、-3 后缀"""
+    assign = IdAssigner()
+    return [assign(key) for key in keys]
+
+
+# ========== MinHash + LSH ==========
+def shingles(text, images=(), k=SHINGLE_K):
+    """字符 k-gram 的 64 位哈希（去重后排序），图片地址各作为一个元素"""
+    import numpy as np   # 只有近似去重用到，不在导入模块时加载
+
+    parts = []
+    if len(text) >= k:
+        cp = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        h = np.zeros(len(cp) - k + 1, dtype=np.uint64)
+        for j in range(k):
+            # 多项式滚动哈希，uint64 溢出即取模 2^64
+            h = h * np.uint64(1000003) + cp[j:len(cp) - k + 1 + j]
+        parts.append(h)
+    elif text:
+        parts.append(np.array([zlib.crc32(text.encode("utf-8"))], dtype=np.uint64))
+    if images:
+        parts.append(np.array([zlib.crc32(("img:" + s).encode("utf-8")) | (1 << 40) for s in images],
+                              dtype=np.uint64))
+    if not parts:
+        return np.empty(0, dtype=np.uint64)
+    return np.unique(np.concatenate(parts))
+
+
+class MinHasher:
+    """multiply-shift 哈希族 h(x) = ((a·x + b) mod 2^64) >> 32，取各哈希下的最小值"""
+
+    def __init__(self, num_perm=NUM_PERM, seed=MINHASH_SEED):
+        import numpy as np
+
+        rng = np.random.default_rng(seed)
+        top = np.iinfo(np.uint64).max
+        self.a = rng.integers(0, top, size=num_perm, dtype=np.uint64, endpoint=True)
+        self.b = rng.integers(0, top, size=num_perm, dtype=np.uint64, endpoint=True)
+
+    def signature(self, sh):
+        import numpy as np
+
+        x = (sh ^ (sh >> np.uint64(32))) & np.uint64(0xFFFFFFFF)   # 折成 32 位输入
+        return ((np.outer(self.a, x) + self.b[:, None]) >> np.uint64(32)).min(axis=1)
+
+
+def _jaccard(a, b):
+    import numpy as np
+
+    inter = len(np.intersect1d(a, b, assume_unique=True))
+    return inter / (len(a) + len(b) - inter)
+
+
+def near_duplicate_pairs(docs, threshold=NEAR_DUP_THRESHOLD, bands=LSH_BANDS):
+    """docs 为 [(shingles, 比较前提)]，比较前提不同的两项不算重复；返回 [(i, j, 相似度)]（i < j），只比较 LSH 同桶的候选对"""
+    hasher = MinHasher()
+    rows = hasher.a.size // bands
+    buckets = {}
+    for i, (sh, _) in enumerate(docs):
+        if not sh.size:
+            continue
+        sig = hasher.signature(sh)
+        for band in range(bands):
+            key = (band, sig[band * rows:(band + 1) * rows].tobytes())
+            buckets.setdefault(key, []).append(i)
+
+    checked, pairs = set(), []
+    for members in buckets.values():
+        for x in range(1, len(members)):
+            for y in range(x):
+                i, j = members[y], members[x]
+                if (i, j) in checked:
+                    continue
+                checked.add((i, j))
+                (si, ai), (sj, aj) = docs[i], docs[j]
+                if ai != aj:
+                    continue
+                sim = _jaccard(si, sj)
+                if sim >= threshold:
+                    pairs.append((i, j, sim))
+    return pairs
+
+
+# ========== 去重 ==========
+def find_duplicates(items, near=NEAR_DUP_THRESHOLD):
+    """items 为 [(题干, 选项 dict, 答案, 图片地址列表)]，按出现顺序排列。
+
+    返回 (keys, dup_of)：keys[i] 为 exact_key；dup_of 为 {重复项下标: (保留项下标, "exact" | "near", 相似度)}。
+    near 为 None 或 0 时只去除完全重复。
+    """
+    keys = [exact_key(q, o, a, imgs) for q, o, a, imgs in items]
+    dup_of = {}
+    first = {}
+    reps = []
+    for i, key in enumerate(keys):
+        j = first.setdefault(key, i)
+        if j != i:
+            dup_of[i] = (j, "exact", 1.0)
+        else:
+            reps.append(i)
+    if not near:
+        return keys, dup_of
+
+    docs = []
+    for i in reps:
+        q, o, a, imgs = items[i]
+        text = normalize_text(q) + _options_text(o)
+        docs.append((shingles(text, imgs), (normalize_answer(a), tuple(_NUMBER_RE.findall(text)))))
+    # 并查集：近似重复具有传递性，每组保留最先出现的一条
+    parent = list(range(len(reps)))
+
+    def root(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    best = {}
+    for i, j, sim in near_duplicate_pairs(docs, near):
+        ri, rj = root(i), root(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+        best[j] = max(best.get(j, 0.0), sim)
+    for x in range(len(reps)):
+        r = root(x)
+        if r != x:
+            dup_of[reps[x]] = (reps[r], "near", round(best.get(x, near), 4))
+    # 完全重复项指向的保留项若又被判为近似重复，改为指向最终保留项
+    for i, (j, kind, sim) in list(dup_of.items()):
+        if kind == "exact" and j in dup_of:
+            dup_of[i] = (dup_of[j][0], kind, sim)
+    return keys, dup_of
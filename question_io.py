@@ -0,0 +1,133 @@
+# question_io.py
+"""题目记录的流式读写：JSON Lines（每行一题）与兼容的缩进 JSON 数组。
+
+写入端逐题写出，读取端逐题产出，整个流程不需要把全部题目放进内存。
+"""
+import re
+import json
+
+FORMATS = ("json", "jsonl")
+JSON_INDENT = 2
+READ_CHUNK = 1 << 16
+
+_NUMBER_END = re.compile(r"[\s,\]]")
+
+
+def detect_format(path):
+    """按扩展名判断格式：.jsonl/.ndjson 为 JSON Lines，其余按 JSON 处理"""
+    p = str(path).lower()
+    return "jsonl" if p.endswith((".jsonl", ".ndjson")) else "json"
+
+
+class QuestionWriter:
+    """逐题写出；json 格式的输出与 json.dump(questions, indent=2) 逐字节一致"""
+
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.fmt = fmt or detect_format(path)
+        if self.fmt not in FORMATS:
+            raise ValueError(f"unknown format: {self.fmt}")
+        self.count = 0
+        self._f = None
+
+    def __enter__(self):
+        self._f = open(self.path, "w", encoding="utf-8")
+        return self
+
+    def write(self, q):
+        f = self._f
+        if self.fmt == "jsonl":
+            f.write(json.dumps(q, ensure_ascii=False))
+            f.write("\n")
+        else:
+            f.write(",\n" if self.count else "[\n")
+            body = json.dumps(q, ensure_ascii=False, indent=JSON_INDENT)
+            pad = " " * JSON_INDENT
+            f.write(pad + body.replace("\n", "\n" + pad))
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self.fmt == "json":
+                self._f.write("\n]" if self.count else "[]")
+        finally:
+            self._f.close()
+        return False
+
+
+def record_key(q):
+    """记录内容的键，用于缓存按题渲染的结果（watch 模式）：字段顺序固定，直接取紧凑 JSON"""
+    return json.dumps(q, ensure_ascii=False, separators=(",", ":"))
+
+
+def write_questions(questions, path, fmt=None):
+    """把可迭代的题目写入 path，返回题目数"""
+    with QuestionWriter(path, fmt) as w:
+        for q in questions:
+            w.write(q)
+    return w.count
+
+
+def _iter_jsonl(f):
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def _iter_json_array(f, first_chunk):
+    """增量解析顶层数组，每次只保留当前元素附近的缓冲区"""
+    decoder = json.JSONDecoder()
+    buf = first_chunk
+    pos = buf.index("[") + 1
+    eof = False
+    while True:
+        # 跳过空白与逗号
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf, pos = f.read(READ_CHUNK), 0
+            eof = not buf
+        if pos >= len(buf) or buf[pos] == "]":
+            return
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            more = f.read(READ_CHUNK)
+            eof = not more
+            buf, pos = buf[pos:] + more, 0
+            continue
+        # 数字可能在块边界被截断（如 "-4e|10"）：未到 EOF 且后面还没有分隔符时补读后重试
+        if (not eof and isinstance(obj, (int, float)) and not isinstance(obj, bool)
+                and not _NUMBER_END.search(buf, end)):
+            more = f.read(READ_CHUNK)
+            eof = not more
+            buf, pos = buf[pos:] + more, 0
+            continue
+        yield obj
+        buf, pos = buf[end:], 0
+
+
+def iter_questions(path):
+    """逐题读取 JSON Lines、JSON 数组或 {"questions": [...]} 文件"""
+    with open(path, "r", encoding="utf-8") as f:
+        if detect_format(path) == "jsonl":
+            yield from _iter_jsonl(f)
+            return
+        chunk = f.read(READ_CHUNK)
+        head = chunk.lstrip()
+        while not head and chunk:
+            chunk = f.read(READ_CHUNK)
+            head = chunk.lstrip()
+        if not head:
+            return
+        if head[0] == "[":
+            yield from _iter_json_array(f, chunk)
+        else:
+            # 对象包装格式只能整体解析
+            data = json.loads(chunk + f.read())
+            yield from data.get("questions", [])
@@ -0,0 +1,290 @@
+# question_store.py
+"""SQLite 题库：type / paper_type / difficulty / year 建索引，题干与解析建 FTS5 全文索引。
+
+- questions 表每行一道题，rowid 即原顺序，record 列保存完整记录（JSON）；筛选列去掉首尾空白，比较时不区分大小写。
+- questions_fts 为 FTS5 表（rowid 与 questions 相同）。优先使用 trigram 分词，中英文都能按子串检索；
+  SQLite 不支持时退回 unicode61。检索词按空白切分，各自作为 FTS5 字符串（不解析查询语法）匹配，
+  trigram 索引不了的短词（不足 3 个字符）以及 unicode61 题库改用 LIKE，结果与 JSON 输入的子串匹配一致。
+- images 表记录每道题引用的图片路径与显示尺寸（图片本身仍在 images/ 目录）。
+- select_questions 把筛选条件翻译成 SQL，游标逐行产出记录，生成专题小册子时不必加载整个题库。
+"""
+import os
+import json
+import math
+import sqlite3
+
+from question_io import iter_questions
+
+STORE_NAME = "questions.db"
+STORE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+SCHEMA_VERSION = 1
+INSERT_BATCH = 500
+FTS_TOKENIZERS = ("trigram", "unicode61 remove_diacritics 2")
+TRIGRAM_MIN = 3   # trigram 分词能检索的最短子串
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE questions (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL,
+    source TEXT,
+    type TEXT COLLATE NOCASE,
+    paper_type TEXT COLLATE NOCASE,
+    difficulty TEXT COLLATE NOCASE,
+    year INTEGER,
+    answer TEXT,
+    record TEXT NOT NULL
+);
+CREATE TABLE images (
+    question INTEGER NOT NULL REFERENCES questions (rowid),
+    idx INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    width REAL,
+    height REAL,
+    PRIMARY KEY (question, idx)
+) WITHOUT ROWID;
+"""
+# 索引在批量写入之后再建
+INDEXES = """
+CREATE INDEX questions_id ON questions (id);
+CREATE INDEX questions_paper_type ON questions (paper_type, difficulty, year);
+CREATE INDEX questions_difficulty ON questions (difficulty, year);
+CREATE INDEX questions_year ON questions (year);
+CREATE INDEX questions_type ON questions (type);
+CREATE INDEX images_path ON images (path);
+"""
+
+
+def is_store(path):
+    return str(path).lower().endswith(STORE_SUFFIXES)
+
+
+def _clean(value):
+    """筛选列的取值：去掉首尾空白；缺失（None / NaN / 空串）为 None"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    s = str(value).strip()
+    return s or None
+
+
+class SearchError(ValueError):
+    """--search 检索词无法在题库中执行"""
+
+
+def search_terms(text):
+    """检索词按空白切分，去掉两端的双引号；空词丢弃"""
+    return [t for t in (t.strip('"') for t in (text or "").split()) if t]
+
+
+def _fts_string(term):
+    """FTS5 字符串：整体作为一个短语匹配，= - : * 等不当作查询语法"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _like_pattern(term):
+    return "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _year(value):
+    try:
+        y = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(y) if math.isfinite(y) else None
+
+
+def parse_years(text):
+    """"2021" → (2021, 2021)；"2019-2023" → (2019, 2023)；"2019-" / "-2020" 为单侧不限"""
+    lo, sep, hi = str(text).partition("-")
+    try:
+        lo = int(lo) if lo.strip() else None
+        hi = int(hi) if hi.strip() else None
+    except ValueError:
+        raise ValueError(f"invalid year range: {text!r}")
+    return (lo, hi) if sep else (lo, lo)
+
+
+# ========== 写入 ==========
+def _create_fts(conn):
+    for tokenizer in FTS_TOKENIZERS:
+        try:
+            conn.execute(f"CREATE VIRTUAL TABLE questions_fts USING fts5(question, explanation, tokenize='{tokenizer}')")
+            return tokenizer
+        except sqlite3.OperationalError:
+            continue
+    raise RuntimeError("当前 SQLite 不支持 FTS5")
+
+
+def _flush(conn, rows, fts, images):
+    conn.executemany("INSERT INTO questions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.executemany("INSERT INTO questions_fts (rowid, question, explanation) VALUES (?, ?, ?)", fts)
+    conn.executemany("INSERT INTO images VALUES (?, ?, ?, ?, ?)", images)
+    rows.clear()
+    fts.clear()
+    images.clear()
+
+
+def build_store(questions, db_path):
+    """把题目流写成新的 SQLite 题库（先写临时文件再替换），返回题目数"""
+    tmp = f"{db_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    conn = sqlite3.connect(tmp)
+    try:
+        # 临时文件写完才替换正式文件，不需要日志
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.executescript(SCHEMA)
+        tokenizer = _create_fts(conn)
+        rows, fts, images = [], [], []
+        n = 0
+        for n, q in enumerate(questions, start=1):
+            rows.append((n, str(q.get("id", n)), _clean(q.get("source")), _clean(q.get("type")),
+                         _clean(q.get("paper_type")), _clean(q.get("difficulty")), _year(q.get("year")),
+                         _clean(q.get("answer")), json.dumps(q, ensure_ascii=False)))
+            fts.append((n, q.get("question") or "", q.get("explanation") or ""))
+            paths = q.get("images") or []
+            sizes = q.get("image_sizes") or [None] * len(paths)
+            for i, (path, size) in enumerate(zip(paths, sizes)):
+                w, h = size if size else (None, None)
+                images.append((n, i, path, w, h))
+            if len(rows) >= INSERT_BATCH:
+                _flush(conn, rows, fts, images)
+        _flush(conn, rows, fts, images)
+        conn.executescript(INDEXES)
+        conn.executemany("INSERT INTO meta VALUES (?, ?)",
+                         [("schema_version", str(SCHEMA_VERSION)), ("tokenizer", tokenizer), ("count", str(n))])
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, db_path)
+    return n
+
+
+# ========== 查询 ==========
+class QuestionQuery:
+    """筛选条件：同一字段的多个取值为“或”，不同字段之间为“且”；None 表示不限。
+
+    years 为 (起, 止) 闭区间，任一端可为 None；search 为全文检索词（题干 + 解析）；limit 为最多题数。
+    """
+
+    def __init__(self, types=None, paper_types=None, difficulties=None, years=None, search=None, limit=None):
+        self.types = [_clean(v) for v in types or []]
+        self.paper_types = [_clean(v) for v in paper_types or []]
+        self.difficulties = [_clean(v) for v in difficulties or []]
+        self.years = years
+        self.search = search.strip() if search and search.strip() else None
+        self.limit = limit
+        self._folded = {col: {v.casefold() for v in values if v} for col, values in self._columns()}
+
+    def is_empty(self):
+        return not (self.types or self.paper_types or self.difficulties or self.years or self.search
+                    or self.limit is not None)
+
+    def _columns(self):
+        return (("type", self.types), ("paper_type", self.paper_types), ("difficulty", self.difficulties))
+
+    def to_sql(self, tokenizer=FTS_TOKENIZERS[0]):
+        """返回 (SQL, 参数)；结果按原顺序排列。tokenizer 为题库 FTS5 表的分词器（meta 表记录）"""
+        where, params = [], []
+        for col, values in self._columns():
+            if values:
+                where.append(f"{col} IN ({', '.join('?' * len(values))})")
+                params += values
+        if self.years:
+            lo, hi = self.years
+            if lo is not None:
+                where.append("year >= ?")
+                params.append(lo)
+            if hi is not None:
+                where.append("year <= ?")
+                params.append(hi)
+        if self.search:
+            terms = search_terms(self.search)
+            indexed = [t for t in terms if tokenizer.startswith("trigram") and len(t) >= TRIGRAM_MIN]
+            if indexed:
+                where.append("rowid IN (SELECT rowid FROM questions_fts WHERE questions_fts MATCH ?)")
+                params.append(" AND ".join(_fts_string(t) for t in indexed))
+            for t in terms:
+                if t not in indexed:
+                    where.append("rowid IN (SELECT rowid FROM questions_fts "
+                                 "WHERE question LIKE ? ESCAPE '\\' OR explanation LIKE ? ESCAPE '\\')")
+                    params += [_like_pattern(t)] * 2
+        sql = "SELECT record FROM questions"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY rowid"
+        if self.limit is not None:
+            sql += " LIMIT ?"
+            params.append(self.limit)
+        return sql, params
+
+    def matches(self, record):
+        """JSON / JSON Lines 输入时逐条判断（不含 limit）；检索词按空白切分，全部作为子串出现才算命中"""
+        for col, values in self._columns():
+            if values:
+                v = _clean(record.get(col))
+                if v is None or v.casefold() not in self._folded[col]:
+                    return False
+        if self.years:
+            y = _year(record.get("year"))
+            lo, hi = self.years
+            if y is None or (lo is not None and y < lo) or (hi is not None and y > hi):
+                return False
+        if self.search:
+            text = f"{record.get('question') or ''}\n{record.get('explanation') or ''}".casefold()
+            if not all(t.casefold() in text for t in search_terms(self.search)):
+                return False
+        return True
+
+
+def select_questions(db_path, query=None):
+    """逐条产出题库中满足 query 的记录（按原顺序）"""
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(db_path)
+    query = query or QuestionQuery()
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'tokenizer'").fetchone()
+        sql, params = query.to_sql(row[0] if row else FTS_TOKENIZERS[0])
+        try:
+            cursor = conn.execute(sql, params)
+        except sqlite3.OperationalError as e:
+            if not query.search:
+                raise
+            raise SearchError(f"无法在题库中检索 {query.search!r}：{e}") from e
+        for (record,) in cursor:
+            yield json.loads(record)
+    finally:
+        conn.close()
+
+
+def add_query_arguments(parser):
+    """json2pdf.py / json2html.py 共用的筛选参数"""
+    filters = parser.add_argument_group("filters", "Select a subset of questions (repeat a flag to allow several values)")
+    filters.add_argument("--type", action="append", help="Question type, e.g. 单选")
+    filters.add_argument("--paper-type", action="append", help="Paper type / topic, e.g. Mechanics")
+    filters.add_argument("--difficulty", action="append", help="Difficulty, e.g. 适中")
+    filters.add_argument("--year", type=parse_years, help="Year or inclusive range, e.g. 2021 or 2019-2023")
+    filters.add_argument("--search", help="Search question and explanation: every whitespace-separated term "
+                                          "must occur as a substring (uses the FTS5 index on a .db store)")
+    filters.add_argument("--limit", type=int, help="At most N questions (in source order)")
+    return filters
+
+
+def query_from_args(args):
+    return QuestionQuery(args.type, args.paper_type, args.difficulty, args.year, args.search, args.limit)
+
+
+def load_questions(path, query=None):
+    """逐题读取输入：SQLite 题库按 query 查询，JSON / JSON Lines 逐条筛选"""
+    if is_store(path):
+        yield from select_questions(str(path), query)
+        return
+    n = 0
+    for item in iter_questions(path):
+        if query is not None and query.limit is not None and n >= query.limit:
+            return
+        if query is None or query.matches(item):
+            n += 1
+            yield item
@@ -0,0 +1,88 @@
+# tex_escape.py
+"""两个脚本共用的 LaTeX 转义引擎。
+
+- latex_escape：excel_to_pdf_fixed.py 的正文转义。一条预编译字符类正则处理特殊字符
+  （无特殊字符时直接跳过），换行只在出现时处理（空行 -> \\medskip）。逐字符映射，不会再把
+  \\textbackslash{} 中新插入的花括号二次转义。
+- escape_latex_math：json2pdf.py 的转义。一条预编译交替正则单遍扫描，同时完成
+  数学符号替换、数学片段（a^2、m_0、𝑥）包裹 $...$，以及数学片段之外的特殊字符转义。
+  交替正则在每个位置都要逐个尝试分支，扫描全文很慢；绝大多数字段不含任何需要处理的字符，
+  先用一条字符类正则检查，命中才做替换。
+"""
+import re
+
+from html_text import supsub_to_latex
+
+TEXT_SPECIALS = {
+    "\\": r"\textbackslash{}",
+    "&": r"\&", "%": r"\%", "$": r"\$",
+    "#": r"\#", "_": r"\_", "{": r"\{", "}": r"\}",
+    "~": r"\textasciitilde{}", "^": r"\^{}",
+}
+
+MATH_SYMBOLS = {
+    "⋅": r"\cdot ",
+    "∙": r"\cdot ",
+    "·": r"\cdot ",
+    "√": r"\sqrt{}",
+    "∣": r"|",
+    "∘": r"\circ ",
+    "≤": r"\leq ",
+    "≥": r"\geq ",
+    "≠": r"\neq ",
+    "⟹": r"\implies ",
+    "→": r"\to ",
+    "∞": r"\infty ",
+}
+
+PAR_BREAK = "\\\\\n\\medskip\\\\\n"   # 空行
+LINE_BREAK = "\\\\\n"                 # 单个换行
+
+# 没有用 str.translate：单字符映射表含多字符替换，translate 逐字符查 dict，在含特殊字符的字段上比 sub 慢约 4 倍、
+# 中文为主的长题干上慢约 1.4 倍；同样先 search 跳过无特殊字符的字段，整库仍较慢（见 benchmarks/bench_escape.py）
+_TEXT_RE = re.compile("[" + re.escape("".join(TEXT_SPECIALS)) + "]")
+
+_MATH_TABLE = dict(TEXT_SPECIALS)
+_MATH_TABLE.update(MATH_SYMBOLS)
+# Unicode 数学斜体字母 (𝑎..𝑧, 𝐴..𝑍) 与 a^2 / m_0 这类片段包裹为 $...$；其余单字符查表。
+# 片段只从字母数字串的开头尝试（后顾断言），否则串内每个位置都要回溯一遍；匹配结果不变，
+# 因为从串内开始的匹配向左延伸到串首同样成立，而扫描总是先试串首
+_MATH_RE = re.compile(
+    r"(?P<math>[𝑎-𝑧𝐴-𝑍]|(?<![A-Za-z0-9])[A-Za-z0-9]+[\^_][A-Za-z0-9]+)"
+    "|[" + re.escape("".join(_MATH_TABLE)) + "]"
+)
+# 含下列任一字符的字段才可能被 _MATH_RE 改写（^ 与 _ 在查表字符中）
+_MATH_TRIGGER_RE = re.compile("[𝑎-𝑧𝐴-𝑍" + re.escape("".join(_MATH_TABLE)) + "]")
+
+
+def _text_token(m):
+    return TEXT_SPECIALS[m.group(0)]
+
+
+def _math_token(m):
+    if m.group("math"):
+        return "$" + m.group("math") + "$"
+    return _MATH_TABLE[m.group(0)]
+
+
+def latex_escape(s):
+    """对常见 LaTeX 特殊字符做转义，保留换行处理"""
+    if not s:
+        return ""
+    if _TEXT_RE.search(s):
+        s = _TEXT_RE.sub(_text_token, s)
+    if "\r" in s:
+        s = s.replace("\r\n", "\n").replace("\r", "\n")
+    if "\n" in s:
+        # 先把空行换成 \n\medskip\n，再统一把换行换成 \\ —— 空行即得到 PAR_BREAK
+        s = s.replace("\n\n", "\n\\medskip\n").replace("\n", LINE_BREAK)
+    return supsub_to_latex(s)
+
+
+def escape_latex_math(text):
+    """把 JSON 中的数学符号替换为 LaTeX 语法，并转义数学片段之外的特殊字符"""
+    if not text:
+        return ""
+    if _MATH_TRIGGER_RE.search(text):
+        text = _MATH_RE.sub(_math_token, text)
+    return supsub_to_latex(text)
@@ -0,0 +1,175 @@
+# tex_format.py
+"""预编译导言区：把 .tex 中稳定的导言区（\\documentclass 与各 \\usepackage）用 mylatexformat 转储为格式文件（.fmt），
+之后的编译用 -fmt 直接载入，不再逐个加载宏包。
+
+- 导言区以 DUMP_MARKER 行分为两段：之前的内容转储进格式；之后的字体设置（fontspec / xeCJK 的字体不能转储）、
+  标题等每次编译照常执行。没有格式时 \\csname endofdump\\endcsname 等于 \\relax，文档照常编译。
+- 格式按 (引擎, 引擎可执行文件的大小与修改时间, 转储段内容) 的哈希命名，放在输出目录的 .formats/ 下；
+  同一模板的练习册、答案册、各分片与模拟卷共用一个格式，只在第一次编译时生成。
+- 无法生成格式（没有 mylatexformat、引擎不支持 -ini 等）时记下失败并改用普通编译；
+  格式没能载入（日志中有格式文件的错误，或本次编译没有写出日志）时改用普通编译重试，重试成功则该格式标记为
+  不可用，以后不再使用。成败按写出的 PDF 判断（见 tex_shards.latex_output）：文档本身的错误（可恢复的错误
+  使退出码为 1 但照常写出 PDF）不触发重试。
+- 环境变量 XELATEX_FORMAT=0 关闭此功能。没有 TeX 时可用 benchmarks/stub_xelatex.py 测试。
+"""
+import os
+import shutil
+import hashlib
+import threading
+import subprocess
+import time
+from pathlib import Path
+
+FORMAT_DIR_NAME = ".formats"
+DUMP_MARKER = "\\csname endofdump\\endcsname"
+DUMP_DRIVER = "mylatexformat.ltx"
+FAILED_SUFFIX = ".failed"
+FORMAT_ERRORS = ("can't find the format file", "Fatal format file error")   # 格式载入失败时日志中的提示
+ENABLED = os.environ.get("XELATEX_FORMAT", "1") != "0"
+
+
+def stable_preamble(tex_path):
+    """DUMP_MARKER 行之前的导言区（含该行）；没有标记时返回 None"""
+    lines = []
+    with open(tex_path, "r", encoding="utf-8") as f:
+        for line in f:
+            lines.append(line)
+            if line.strip() == DUMP_MARKER:
+                return "".join(lines)
+            if line.lstrip().startswith("\\begin{document}"):
+                return None
+    return None
+
+
+def engine_id(engine):
+    """引擎可执行文件的路径、大小与修改时间；TeX 升级后旧格式自然失效。找不到引擎时返回 None"""
+    path = shutil.which(engine)
+    if path is None:
+        return None
+    st = os.stat(path)
+    return f"{os.path.realpath(path)}\0{st.st_size}\0{st.st_mtime_ns}"
+
+
+class FormatCache:
+    """一个输出目录下的格式文件；线程安全，同一格式并发请求时只生成一次"""
+
+    def __init__(self, root, engine):
+        self.dir = Path(root).resolve() / FORMAT_DIR_NAME
+        self.engine = engine
+        self.engine_id = engine_id(engine)
+        self._lock = threading.Lock()
+        self._locks = {}
+        self.stats = {"built": 0, "dump_s": 0.0, "used": 0, "fallback": 0}
+
+    def name_for(self, preamble):
+        h = hashlib.sha256(f"{self.engine_id}\0{preamble}".encode("utf-8"))
+        return "esat-" + h.hexdigest()[:16]
+
+    def get(self, tex_path):
+        """tex_path 可用的格式名；没有可转储的导言区或无法生成格式时返回 None"""
+        if self.engine_id is None:
+            return None
+        preamble = stable_preamble(tex_path)
+        if preamble is None:
+            return None
+        name = self.name_for(preamble)
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if (self.dir / (name + FAILED_SUFFIX)).exists():
+                return None
+            if not (self.dir / (name + ".fmt")).exists() and not self._dump(name, preamble):
+                return None
+        self._count("used")
+        return name
+
+    def _dump(self, name, preamble):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        (self.dir / (name + ".tex")).write_text(preamble + "\\begin{document}\n\\end{document}\n", encoding="utf-8")
+        base = os.path.splitext(os.path.basename(self.engine))[0]
+        cmd = [self.engine, "-ini", "-interaction=nonstopmode", "-jobname", name,
+               "&" + base, DUMP_DRIVER, f'"{name}.tex"']
+        t0 = time.perf_counter()
+        try:
+            rc = subprocess.run(cmd, cwd=self.dir, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT).returncode
+        except OSError:
+            rc = 1
+        elapsed = time.perf_counter() - t0
+        if rc != 0 or not (self.dir / (name + ".fmt")).exists():
+            self.mark_failed(name)
+            print(f"[WARN] 无法生成预编译导言区（详见 {self.dir / (name + '.log')}），改用普通编译")
+            return False
+        self._count("built")
+        self._count("dump_s", elapsed)
+        print(f"[OK] 已生成预编译导言区 {name}.fmt（{elapsed:.2f} s），之后的编译直接载入")
+        return True
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+    def mark_failed(self, name):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        (self.dir / (name + FAILED_SUFFIX)).touch()
+        try:
+            os.remove(self.dir / (name + ".fmt"))
+        except OSError:
+            pass
+
+    def env(self):
+        """子进程环境：TEXFORMATS 先查 .formats/，末尾的分隔符保留 TeX 默认的搜索路径"""
+        env = dict(os.environ)
+        env["TEXFORMATS"] = str(self.dir) + os.pathsep + env.get("TEXFORMATS", "")
+        return env
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def format_cache(root, engine):
+    """root 目录的 FormatCache（每个进程一个）；XELATEX_FORMAT=0 时返回 None"""
+    if not ENABLED:
+        return None
+    key = (str(Path(root).resolve()), engine)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = FormatCache(root, engine)
+        return _caches[key]
+
+
+def _format_failed(tex_path, since):
+    """用格式的编译没有写出 PDF 时，是否因为格式本身没能载入：日志中有格式文件的错误，或本次没有写出日志"""
+    from tex_shards import MTIME_SLACK   # tex_shards 导入本模块，延迟导入
+    log = Path(tex_path).with_suffix(".log")
+    try:
+        if log.stat().st_mtime < since - MTIME_SLACK:
+            return True
+        text = log.read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return True
+    return any(e in text for e in FORMAT_ERRORS)
+
+
+def run_latex(engine, args, tex_path, root, **kwargs):
+    """运行 engine args（kwargs 传给 subprocess.run），返回 CompletedProcess。.pdf / .log 须与 tex_path 同目录同名。
+
+    root 目录下有 tex_path 可用的格式时加上 -fmt；格式没能载入时不带格式重试一次，
+    重试成功说明问题出在格式上，以后不再使用它。退出码不作判断（见 tex_shards.latex_output）。
+    """
+    from tex_shards import latex_output
+    formats = format_cache(root, engine)
+    name = formats.get(tex_path) if formats is not None else None
+    if name is None:
+        return subprocess.run([engine] + list(args), **kwargs)
+    started = time.time()
+    proc = subprocess.run([engine, "-fmt=" + name] + list(args), env=formats.env(), **kwargs)
+    if latex_output(tex_path, started)[0] is not None or not _format_failed(tex_path, started):
+        return proc
+    started = time.time()
+    retry = subprocess.run([engine] + list(args), **kwargs)
+    if latex_output(tex_path, started)[0] is not None:
+        formats.mark_failed(name)
+        formats._count("fallback")
+        print(f"[WARN] 用预编译导言区 {name} 编译失败，普通编译成功；以后不再使用该格式")
+    return retry
@@ -0,0 +1,316 @@
+# tex_shards.py
+"""分片并行编译：把整份 .tex 在题目边界处切成若干分片，各分片在独立目录中并发运行 xelatex，再合并 PDF。
+
+- 分片共用原文档的导言区；\\maketitle 等只保留在第一个分片。
+- 题号、标题已写在 .tex 中，切分不改变它们；页码通过命令行传入的 \\ShardFirstPage 接续。
+  分片的页数与起始页码无关，因此起始页码猜错时只需重编一次受影响的分片；
+  各分片页数记录在 <stem>.shards/pages.json，下次构建直接用它推算起始页码。
+- 各分片用同一个预编译导言区格式（见 tex_format.py），只在第一次编译时生成。
+- 成败不看退出码：nonstopmode 下可恢复的错误（如 Missing $ inserted）也使 xelatex 退出码为 1，但 PDF 照常写出。
+  本次编译写出了新的 PDF、且 .log 中有 "Output written on ... (N pages)" 即为成功，日志中的错误数作为警告报告。
+- 没有安装 TeX 时可用环境变量 XELATEX 指向替身程序（见 benchmarks/stub_xelatex.py）。
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from tex_format import run_latex
+
+LATEX_ENGINE = os.environ.get("XELATEX", "xelatex")
+SHARD_SUFFIX = ".shards"
+PAGES_NAME = "pages.json"
+SNAP_FRACTION = 4   # 切分点向分组边界吸附的最大距离 = 每片题数 / SNAP_FRACTION
+
+BEGIN_DOCUMENT = "\\begin{document}"
+END_DOCUMENT = "\\end{document}"
+FIRST_SHARD_ONLY = ("\\maketitle",)
+PAGE_HOOK = "\\ifdefined\\ShardFirstPage\\setcounter{page}{\\ShardFirstPage}\\fi\n"
+
+_PAGES_RE = re.compile(r"Output written on .*?\((\d+) pages?")
+_ERROR_RE = re.compile(r"^! ", re.M)
+MTIME_SLACK = 2.0   # 文件系统时间戳精度有限（FAT 为 2 秒），判断 PDF 是否为本次写出时留出余量
+_GRAPHICS_RE = re.compile(r"\\includegraphics(?:\[[^\]]*\])?\{([^}]*)\}")
+_GRAPHICSPATH_RE = re.compile(r"\\graphicspath\{((?:\{[^}]*\})+)\}")
+
+
+# ========== 切分 ==========
+def _scan(tex_path, question_re, group_re):
+    """返回 (\\begin{document} 所在行, 候选切分点列表, \\end{document} 所在行)。
+
+    候选切分点 = 每道题的起始行；若该题是分组的第一题，则取分组标题行，并标记为分组边界。
+    """
+    begin = end = None
+    cuts = []          # (行号, 是否分组边界)
+    pending_group = None
+    with open(tex_path, "r", encoding="utf-8") as f:
+        for no, line in enumerate(f):
+            if begin is None:
+                if line.lstrip().startswith(BEGIN_DOCUMENT):
+                    begin = no
+                continue
+            if line.lstrip().startswith(END_DOCUMENT):
+                end = no
+            elif group_re is not None and group_re.match(line):
+                pending_group = no
+            elif question_re.match(line):
+                if pending_group is not None:
+                    cuts.append((pending_group, True))
+                    pending_group = None
+                else:
+                    cuts.append((no, False))
+    if begin is None or end is None:
+        raise ValueError(f"{tex_path}: 找不到 \\begin{{document}} / \\end{{document}}")
+    return begin, cuts, end
+
+
+def plan_cuts(cuts, shards):
+    """在 len(cuts) 道题中选出 shards-1 个切分点（题目下标），尽量落在分组边界上"""
+    n = len(cuts)
+    shards = max(1, min(shards, n))
+    size = n / shards
+    slack = int(size // SNAP_FRACTION)
+    chosen = []
+    for k in range(1, shards):
+        ideal = round(k * size)
+        best = ideal
+        for d in range(slack + 1):
+            hit = [i for i in (ideal - d, ideal + d) if 0 < i < n and cuts[i][1]]
+            if hit:
+                best = hit[0]
+                break
+        if (not chosen or best > chosen[-1]) and best < n:
+            chosen.append(best)
+    return chosen
+
+
+def shard_root(tex_path):
+    tex_path = Path(tex_path)
+    return tex_path.parent / (tex_path.stem + SHARD_SUFFIX)
+
+
+def split_tex(tex_path, shards, question_re, group_re=None):
+    """把 tex_path 切成至多 shards 个可独立编译的分片，返回分片 .tex 路径列表。
+
+    question_re 匹配每道题的起始行，group_re（可选）匹配分组标题行；均为已编译的正则，按行首匹配。
+    """
+    tex_path = Path(tex_path)
+    begin, cuts, end = _scan(tex_path, question_re, group_re)
+    bounds = [cuts[i][0] for i in plan_cuts(cuts, shards)] if cuts else []
+    first_block = cuts[0][0] if cuts else end
+    root = shard_root(tex_path)
+    paths = []
+    for i in range(len(bounds) + 1):
+        d = root / f"{i + 1:02d}"
+        d.mkdir(parents=True, exist_ok=True)
+        paths.append(d / f"{tex_path.stem}-{i + 1:02d}.tex")
+
+    preamble, tail = [], []
+    outs = [open(p, "w", encoding="utf-8") for p in paths]
+    try:
+        shard = 0
+        with open(tex_path, "r", encoding="utf-8") as f:
+            for no, line in enumerate(f):
+                if no <= begin:
+                    preamble.append(line)
+                    if no == begin:
+                        for out in outs:
+                            out.writelines(preamble)
+                            out.write(PAGE_HOOK)
+                elif no < first_block:
+                    for i, out in enumerate(outs):
+                        if i == 0 or line.strip() not in FIRST_SHARD_ONLY:
+                            out.write(line)
+                elif no < end:
+                    while shard < len(bounds) and no >= bounds[shard]:
+                        shard += 1
+                    outs[shard].write(line)
+                else:
+                    tail.append(line)
+        if not tail[-1].endswith("\n"):
+            tail[-1] += "\n"
+        for out in outs:
+            out.writelines(tail)
+    finally:
+        for out in outs:
+            out.close()
+    return paths
+
+
+# ========== 编译 ==========
+def latex_output(tex, since):
+    """检查 tex 的一次编译（.pdf / .log 与 tex 同目录同名）：返回 (页数, 日志中的错误数)。
+
+    PDF 不是 since（time.time()）之后写出的、或日志中没有 "Output written on" 时页数为 None。
+    """
+    tex = Path(tex)
+    try:
+        text = tex.with_suffix(".log").read_text(encoding="utf-8", errors="replace")
+        fresh = tex.with_suffix(".pdf").stat().st_mtime >= since - MTIME_SLACK
+    except OSError:
+        return None, 0
+    found = _PAGES_RE.findall(text.replace("\n", ""))   # 日志按 79 列折行
+    return (int(found[-1]) if fresh and found else None), len(_ERROR_RE.findall(text))
+
+
+def report_errors(tex, errors):
+    if errors:
+        print(f"[WARN] {Path(tex).name}：日志中有 {errors} 处 LaTeX 错误，PDF 已生成，"
+              f"详见 {Path(tex).with_suffix('.log')}")
+
+
+def compile_shard(tex, first_page, cwd, engine=LATEX_ENGINE):
+    """在 tex 所在目录中编译一个分片（图片等相对路径按 cwd 解析），返回 (返回码, pdf 路径, 页数)。
+
+    成败以页数是否为 None 判断（见 latex_output），返回码仅供参考。
+    """
+    tex = Path(tex)
+    rel = os.path.relpath(tex, cwd).replace("\\", "/")
+    outdir = os.path.dirname(rel)
+    args = ["-interaction=nonstopmode", "-output-directory", outdir, "-jobname", tex.stem,
+            "\\def\\ShardFirstPage{%d}\\input{%s}" % (first_page, rel)]
+    # 并发编译时各进程的控制台输出会交错，只保留各自的 .log；导言区格式放在 cwd（输出目录）下
+    started = time.time()
+    proc = run_latex(engine, args, tex, cwd, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    pages, errors = latex_output(tex, started)
+    if pages is not None:
+        report_errors(tex, errors)
+    return proc.returncode, tex.with_suffix(".pdf"), pages
+
+
+def _first_pages(pages):
+    starts = [1]
+    for p in pages[:-1]:
+        starts.append(starts[-1] + p)
+    return starts
+
+
+def _load_pages(root, n):
+    try:
+        with open(root / PAGES_NAME, "r", encoding="utf-8") as f:
+            pages = json.load(f).get("pages", [])
+        return pages if len(pages) == n else None
+    except (OSError, ValueError):
+        return None
+
+
+def _pdf_reader():
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        from PyPDF2 import PdfReader
+    return PdfReader
+
+
+def merge_pdfs(pdfs, out_pdf):
+    """按顺序合并 PDF（需要 pypdf 或 PyPDF2）"""
+    try:
+        from pypdf import PdfWriter
+    except ImportError:
+        try:
+            from PyPDF2 import PdfMerger as PdfWriter
+        except ImportError:
+            raise RuntimeError("合并 PDF 需要 pypdf 或 PyPDF2：pip install pypdf")
+    writer = PdfWriter()
+    for p in pdfs:
+        writer.append(str(p))
+    tmp = str(out_pdf) + ".part"
+    with open(tmp, "wb") as f:
+        writer.write(f)
+    writer.close()
+    os.replace(tmp, out_pdf)
+    return out_pdf
+
+
+def compile_digest(tex, first_page, cwd, engine, manifest):
+    """一次编译的全部输入：源码、起始页码、引擎，以及引用图片的内容"""
+    data = Path(tex).read_bytes()
+    h = hashlib.sha256(data)
+    h.update(f"\0{first_page}\0{engine}\0".encode("utf-8"))
+    text = data.decode("utf-8")
+    dirs = [""]
+    m = _GRAPHICSPATH_RE.search(text)
+    if m:
+        dirs += re.findall(r"\{([^}]*)\}", m.group(1))
+    for name in _GRAPHICS_RE.findall(text):
+        digest = None
+        for d in dirs:
+            digest = manifest.file_digest(os.path.join(cwd, d, name))
+            if digest:
+                break
+        h.update(f"{name}\0{digest}\0".encode("utf-8"))
+    return h.hexdigest()
+
+
+def compile_sharded(tex_path, shards, question_re, group_re=None, workers=None, engine=LATEX_ENGINE,
+                    manifest=None):
+    """切分 tex_path 并行编译，合并为 tex_path 同名 PDF；任一分片失败时返回 None。
+
+    传入 manifest（BuildManifest）时，输入摘要未变化的分片直接复用上次的 PDF。
+    """
+    tex_path = Path(tex_path)
+    cwd = tex_path.parent
+    parts = split_tex(tex_path, shards, question_re, group_re)
+    root = shard_root(tex_path)
+    known = _load_pages(root, len(parts))
+    starts = _first_pages(known) if known else [1] * len(parts)
+    workers = max(1, min(len(parts), workers or os.cpu_count() or 1))
+    print(f"分片编译 {tex_path.name}：{len(parts)} 个分片，{workers} 个并发")
+    digests = [None] * len(parts)
+    reused = set()
+
+    def run(i):
+        if manifest is not None:
+            name = f"{tex_path.name}#{i + 1:02d}"
+            digests[i] = compile_digest(parts[i], starts[i], cwd, engine, manifest)
+            pdf = parts[i].with_suffix(".pdf")
+            if manifest.up_to_date(name, digests[i], [pdf]):
+                reused.add(i)
+                return 0, pdf, manifest.get(name)["pages"]
+            reused.discard(i)
+            result = compile_shard(parts[i], starts[i], cwd, engine)
+            if result[2] is not None:
+                manifest.record(name, digests[i], pages=result[2])
+            return result
+        return compile_shard(parts[i], starts[i], cwd, engine)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(run, range(len(parts))))
+        failed = [parts[i] for i, r in enumerate(results) if r[2] is None]
+        if not failed:
+            pages = [r[2] for r in results]
+            redo = [i for i, s in enumerate(_first_pages(pages)) if s != starts[i]]
+            if redo:
+                # 分片页数与起始页码无关，重编一次即可得到连续页码
+                starts = _first_pages(pages)
+                print(f"起始页码变化，重新编译 {len(redo)} 个分片")
+                for i, r in zip(redo, pool.map(run, redo)):
+                    results[i] = r
+                failed = [parts[i] for i in redo if results[i][2] is None]
+    if failed:
+        for p in failed:
+            print(f"[FAIL] 分片编译失败，详见 {p.with_suffix('.log')}")
+        return None
+
+    with open(root / PAGES_NAME, "w", encoding="utf-8") as f:
+        json.dump({"pages": [r[2] for r in results]}, f)
+    out_pdf = tex_path.with_suffix(".pdf")
+    total = sum(r[2] for r in results)
+    if manifest is not None:
+        if reused:
+            print(f"复用 {len(reused)} 个未变化的分片，重新编译 {len(parts) - len(reused)} 个")
+        merged = hashlib.sha256("\0".join(digests).encode("utf-8")).hexdigest()
+        if manifest.up_to_date(out_pdf.name, merged, [out_pdf]):
+            manifest.save()
+            print(f"[OK] 分片均未变化，沿用 {out_pdf}")
+            return out_pdf
+    merge_pdfs([r[1] for r in results], out_pdf)
+    if manifest is not None:
+        manifest.record(out_pdf.name, merged)
+        manifest.save()
+    print(f"[OK] 已合并 {len(parts)} 个分片，共 {total} 页: {out_pdf}")
+    return out_pdf
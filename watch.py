@@ -0,0 +1,157 @@
+# watch.py
+"""watch 模式：常驻进程监视输入文件，保存后只重建受影响的部分。
+
+- 输入为 .xlsx 时按 excel_to_pdf_fixed.py 转换（参数相同，自动增量）；为 .json / .jsonl 时只重新渲染三份 .tex。
+  --html 另外写出分页 HTML（同 json2html.py），--compile 编译 .tex（--shards N 时只重编内容变化的分片）。
+- 进程常驻：pandas / bs4 / 转义表只加载一次；上次构建的行记录、图片缓存与预处理的索引、HTTP 连接池，以及每道题的
+  .tex 中间表示与 HTML 题块都留在内存（excel_to_pdf_fixed.WarmState）。改动几行后，未改动的行不再解析、不再下载图片，
+  未改动的题目直接取用上次的题块；仍需重新读取整个工作簿（openpyxl），这是大题库重建的主要耗时。
+- 轮询文件的修改时间与大小（不依赖 inotify，网络盘与 Windows 上同样可用）；发现变化后等文件连续 --debounce 秒
+  不再变化才重建（Excel 保存时会先写临时文件再替换）。
+- 构建出错（如文件保存到一半）时打印错误并继续监视。
+
+用法: python esat.py watch -i PracticeQuestions.xlsx -o output [--html] [--compile --shards 4]
+     python esat.py watch -i output/questions.json -o output/preview --html
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+from excel_to_pdf_fixed import TEX_VARIANTS, TexWriter, WarmState, build_parser, compile_booklets, run
+from build_manifest import BuildManifest
+from json2html import PER_PAGE, write_html
+from question_io import iter_questions
+
+POLL_INTERVAL = 1.0   # 轮询间隔（秒）
+DEBOUNCE = 0.5        # 文件连续这么久不变才开始重建（秒）
+JSON_SUFFIXES = (".json", ".jsonl", ".ndjson")
+
+
+def file_state(path):
+    """(修改时间 ns, 字节数)；文件不存在（如正被替换）时为 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class Poller:
+    """轮询一组文件；changes() 在有文件变化、且所有变化的文件都已稳定 debounce 秒后产出这些文件"""
+
+    def __init__(self, paths, interval=POLL_INTERVAL, debounce=DEBOUNCE):
+        self.paths = list(paths)
+        self.interval = interval
+        self.debounce = debounce
+        self.states = {p: file_state(p) for p in self.paths}
+
+    def poll(self):
+        """返回状态与上次不同的文件"""
+        changed = []
+        for p in self.paths:
+            state = file_state(p)
+            if state != self.states[p]:
+                self.states[p] = state
+                changed.append(p)
+        return changed
+
+    def changes(self):
+        while True:
+            time.sleep(self.interval)
+            pending = set(self.poll())
+            if not pending:
+                continue
+            quiet_since = time.monotonic()
+            while True:
+                time.sleep(min(self.interval, self.debounce) / 2)
+                more = self.poll()
+                if more:
+                    pending.update(more)
+                    quiet_since = time.monotonic()
+                elif (time.monotonic() - quiet_since >= self.debounce
+                      and all(self.states[p] is not None for p in pending)):
+                    break
+            yield sorted(pending)
+
+
+class WatchBuild:
+    """一次次重建之间共享 WarmState"""
+
+    def __init__(self, args):
+        args.incremental = True   # 首次构建复用上次运行留下的行缓存
+        self.args = args
+        self.warm = WarmState()
+        self.json_input = all(p.lower().endswith(JSON_SUFFIXES) for p in args.input)
+        if self.json_input and len(args.input) != 1:
+            raise SystemExit("watch: give a single .json/.jsonl input (or one or more .xlsx workbooks)")
+
+    def build(self):
+        args = self.args
+        if self.json_input:
+            self._render_tex()
+        else:
+            run(args, self.warm)
+        if args.html:
+            outdir = Path(args.outdir)
+            pages = write_html(self.warm.questions, outdir, args.html_title, args.per_page,
+                               fragments=self.warm.fragments.setdefault("html", {}))
+            print(f"[OK] HTML written to: {outdir / 'questions.html'} ({len(pages)} pages)")
+
+    def _render_tex(self):
+        """JSON 输入：重新读取题目并一次渲染三份 .tex（未改动的题目取用缓存的中间表示）"""
+        args = self.args
+        os.makedirs(args.outdir, exist_ok=True)
+        self.warm.questions = list(iter_questions(args.input[0]))
+        tex_paths = {v: os.path.join(args.outdir, f"questions_{v}.tex") for v in TEX_VARIANTS}
+        with TexWriter(tex_paths, self.warm.fragments.setdefault("tex", {})) as w:
+            for q in self.warm.questions:
+                w.add(q)
+        if args.compile:
+            manifest = self.warm.keep("manifest", lambda: BuildManifest(args.outdir))
+            compile_booklets(tex_paths.values(), args.outdir, args.shards, args.workers or None, manifest)
+
+    def rebuild(self):
+        """构建一次，返回是否成功；出错时打印原因（继续监视）"""
+        t0 = time.perf_counter()
+        try:
+            self.build()
+        except (Exception, SystemExit) as e:
+            print(f"[FAIL] 重建失败：{type(e).__name__}: {e}")
+            return False
+        print(f"[DONE] 用时 {time.perf_counter() - t0:.2f} s")
+        return True
+
+
+def build_watch_parser(prog=None):
+    parser = build_parser(prog)
+    parser.description = "Watch the input workbook(s) or questions JSON and rebuild the outputs on every save"
+    parser.add_argument("--html", action="store_true", help="Also write the paginated HTML booklet")
+    parser.add_argument("--html-title", default="物理题目集", help="Page title of the HTML booklet")
+    parser.add_argument("--per-page", type=int, default=PER_PAGE, help="Questions per HTML page (0 = a single file)")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="Seconds between polls")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE,
+                        help="Wait until the inputs have been unchanged this long before rebuilding")
+    parser.add_argument("--once", action="store_true", help="Build once and exit (no watching)")
+    return parser
+
+
+def main(argv=None, prog=None):
+    args = build_watch_parser(prog).parse_args(argv)
+    builder = WatchBuild(args)
+    ok = builder.rebuild()
+    if args.once:
+        return 0 if ok else 1
+    poller = Poller(args.input, args.interval, args.debounce)
+    print(f"[watch] 监视 {', '.join(args.input)}（每 {args.interval:g} s 轮询），Ctrl+C 退出")
+    try:
+        for changed in poller.changes():
+            print(f"[watch] 已修改: {', '.join(os.path.basename(p) for p in changed)}")
+            builder.rebuild()
+    except KeyboardInterrupt:
+        print("[watch] 已停止")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+# xlsx_snapshot.py
+"""Excel 题库的列式快照：工作簿只解析一次，之后按内容摘要直接加载 pickle 快照。
+
+- 工作簿只打开一次（pd.ExcelFile），按名字在 sheet 列表中查找目标 sheet，找不到时用第一个 sheet，
+  不再靠异常重试第二次解析。
+- 有多个工作簿的快照未命中时，用 read_workbooks 在进程池中并行解析（openpyxl 解析持有 GIL）。
+- 只保留需要的列。快照键 = 源文件 sha256（经 BuildManifest 按大小 + mtime 缓存）+ sheet + 列 + pandas 版本，
+  源文件或读取参数变化时自动重建；同一工作簿只保留最新的一份快照。
+"""
+import os
+import glob
+import json
+import pickle
+import hashlib
+import threading
+
+SNAPSHOT_DIR = ".snapshots"
+SNAPSHOT_VERSION = 1
+
+
+def resolve_sheet(sheet_names, wanted):
+    """按名字（或下标）选择 sheet；找不到时回退到第一个"""
+    if wanted in sheet_names:
+        return wanted
+    if isinstance(wanted, int) and 0 <= wanted < len(sheet_names):
+        return sheet_names[wanted]
+    print(f"[WARN] 找不到 sheet `{wanted}`，改用第一个 sheet `{sheet_names[0]}`。")
+    return sheet_names[0]
+
+
+def read_workbook(path, sheet_name, columns=None):
+    """打开一次工作簿并读取目标 sheet（columns 给定时只读取其中存在的列），返回 (DataFrame, 实际 sheet 名)"""
+    import pandas as pd
+    try:
+        with pd.ExcelFile(path) as xls:
+            sheet = resolve_sheet(xls.sheet_names, sheet_name)
+            usecols = (lambda c: c in columns) if columns else None
+            return xls.parse(sheet, usecols=usecols), sheet
+    except Exception as e:
+        raise RuntimeError(f"读取 Excel 失败：{e}")
+
+
+def _snapshot_key(digest, sheet_name, columns):
+    import pandas as pd
+    payload = [SNAPSHOT_VERSION, digest, str(sheet_name), sorted(columns or []), pd.__version__]
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _snapshot_path(path, sheet_name, cache_dir, manifest, columns):
+    digest = manifest.file_digest(path)
+    if digest is None:
+        raise RuntimeError(f"读取 Excel 失败：找不到文件 {path}")
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, SNAPSHOT_DIR, f"{stem}-{_snapshot_key(digest, sheet_name, columns)[:16]}.pkl")
+
+
+def load_snapshot(path, sheet_name, cache_dir, manifest, columns=None):
+    """快照有效时返回 (DataFrame, sheet 名)，否则 None"""
+    snap = _snapshot_path(path, sheet_name, cache_dir, manifest, columns)
+    try:
+        with open(snap, "rb") as f:
+            data = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, KeyError, AttributeError, ImportError):
+        return None
+    manifest.save()
+    return data["df"], data["sheet"]
+
+
+def save_snapshot(path, sheet_name, cache_dir, manifest, columns, df, sheet):
+    """写出 read_workbook 的结果，替换该工作簿的旧快照"""
+    snap = _snapshot_path(path, sheet_name, cache_dir, manifest, columns)
+    snap_dir = os.path.dirname(snap)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    os.makedirs(snap_dir, exist_ok=True)
+    for old in glob.glob(os.path.join(glob.escape(snap_dir), glob.escape(stem) + "-*.pkl")):
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+    # 临时文件名区分进程与线程，同时写同一快照时互不覆盖
+    tmp = f"{snap}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump({"sheet": sheet, "df": df}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, snap)
+    manifest.save()
+
+
+def read_workbooks(paths, sheet_name, columns=None, workers=None):
+    """解析多个工作簿，返回与 paths 对应的 [(DataFrame, sheet 名)]。
+
+    openpyxl 是纯 Python 解析，线程之间受 GIL 限制无法并行；多个工作簿在进程池中各自解析，
+    DataFrame 经 pickle 传回。只有一个工作簿或只有一个 CPU 时直接在本进程解析。
+    """
+    workers = min(len(paths), workers or os.cpu_count() or 1)
+    if workers <= 1:
+        return [read_workbook(p, sheet_name, columns) for p in paths]
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+
+    n = len(paths)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(read_workbook, paths, [sheet_name] * n, [columns] * n))
+    except (OSError, BrokenProcessPool) as e:
+        print(f"[WARN] 多进程读取 Excel 不可用（{e}），回退为串行读取。")
+        return [read_workbook(p, sheet_name, columns) for p in paths]
+
+
+def load_workbook(path, sheet_name, cache_dir, manifest, columns=None):
+    """读取题库：快照有效时直接加载，否则解析工作簿并写出快照。返回 (DataFrame, sheet 名, 是否命中快照)"""
+    found = load_snapshot(path, sheet_name, cache_dir, manifest, columns)
+    if found is not None:
+        return found[0], found[1], True
+    df, sheet = read_workbook(path, sheet_name, columns)
+    save_snapshot(path, sheet_name, cache_dir, manifest, columns, df, sheet)
+    return df, sheet, False